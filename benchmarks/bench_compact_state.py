@@ -0,0 +1,105 @@
+"""Memory and serialization cost of a GameState against its compact_state packing.
+
+Plays random games to a range of points (lobby to the final round), then
+measures per-game memory of live GameStates, CompactGameState objects and
+packed bytes, and the time to serialize and restore each way. Every unpacked
+game is checked against the original.
+
+Usage: python benchmarks/bench_compact_state.py [games]
+"""
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import live_map
+import simulator
+import compact_state
+from compact_state import CompactGameState
+from game import GameState
+from history import Seated, Moved
+
+
+def play(seed):
+    """Play a random game through GameState.apply and stop at a random move."""
+    rng = random.Random(seed)
+    policy = simulator.RandomPolicy(seed)
+    game = GameState()
+    players = [10**17 + i for i in range(5)]  # Discord-sized ids
+    locations = tuple((player_id, rng.choice(live_map.get_all_nodes())) for player_id in players)
+    turn_order = players.copy()
+    rng.shuffle(turn_order)
+    roles = tuple((player_id, "Mr. X" if i == 0 else "Detective") for i, player_id in enumerate(players))
+    game.apply(Seated(roles, players[0], locations, tuple(turn_order)))
+    for _ in range(rng.randrange(120)):
+        player_id = game.get_current_player()
+        move = policy.choose(game, player_id)
+        if move is None or game.apply(Moved(player_id, *move)):
+            break
+    return game
+
+
+def comparable(game, history):
+    """to_dict with [id, value] pairs turned back into dicts, so insertion order does not matter."""
+    data = game.to_dict(history)
+    for field in ("roles", "player_tickets", "player_locations", "trap_warnings"):
+        data[field] = dict(data[field])
+    return data
+
+
+def allocated(build):
+    """Return (result, bytes allocated by build() that are still alive)."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def timed(fn, items):
+    start = time.perf_counter()
+    results = [fn(item) for item in items]
+    return results, (time.perf_counter() - start) / len(items)
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    played = [play(seed) for seed in range(games)]
+    print(f"{games} games, {statistics.mean(len(game.history) for game in played):.0f} events on average")
+
+    print(f"{'':<26}{'memory/game':>12}{'size':>8}{'save us':>9}{'load us':>9}")
+    for history in (True, False):
+        texts, dumps = timed(lambda game: json.dumps(game.to_dict(history), separators=(",", ":")), played)
+        blobs, packs = timed(lambda game: compact_state.pack(game, history), played)
+        _, loads = timed(lambda text: GameState.from_dict(json.loads(text)), texts)
+        unpacked, unpacks = timed(compact_state.unpack, blobs)
+        mismatched = sum(comparable(a, history) != comparable(b, history) for a, b in zip(played, unpacked))
+
+        label = "with history" if history else "state only"
+        if history:
+            _, live_bytes = allocated(lambda: [play(seed) for seed in range(games)])
+            _, compact_bytes = allocated(lambda: [CompactGameState.from_bytes(blob) for blob in blobs])
+            _, blob_bytes = allocated(lambda: [bytes(bytearray(blob)) for blob in blobs])
+            memory = (f"{live_bytes / games:>12.0f}", f"{compact_bytes / games:>12.0f}")
+        else:
+            memory = ("", "")
+        print(f"{'GameState, JSON':<26}{memory[0]:>12}{statistics.mean(map(len, texts)):>8.0f}"
+              f"{dumps * 1e6:>9.1f}{loads * 1e6:>9.1f}  {label}")
+        print(f"{'CompactGameState, bytes':<26}{memory[1]:>12}{statistics.mean(map(len, blobs)):>8.0f}"
+              f"{packs * 1e6:>9.1f}{unpacks * 1e6:>9.1f}  {label}, {mismatched} mismatched")
+        if history:
+            print(f"{'bytes only (parked)':<26}{blob_bytes / games:>12.0f}")
+    print(f"packed with history: smallest {min(map(len, blobs))} bytes, largest {max(map(len, blobs))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Per-turn planning time of four bot detectives, vectorized versus scoring each joint move in Python.
+
+Usage: python benchmarks/bench_detective_ai.py [states] [budget_ms]
+"""
+import itertools
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import live_map
+import detective_ai
+from game import GameState
+
+TEAM = detective_ai.AI_DETECTIVE_IDS
+
+
+def random_state(rng, budget_ms):
+    game = GameState()
+    game.mr_x_id = -1
+    game.turn_order = [game.mr_x_id, *TEAM]
+    game.player_locations = dict(zip(game.turn_order, rng.sample(live_map.GRAPH.nodes, len(game.turn_order))))
+    game.round_counter = rng.randint(1, game.MAX_ROUNDS)
+    game.suspects.start(game.detective_locations())
+    game.suspects.reveal(game.player_locations[game.mr_x_id])
+    for _ in range(rng.randint(0, 4)):
+        game.suspects.mr_x_moved(rng.choice(("taxi", "bus", "black")), game.detective_locations())
+    for player_id in TEAM:
+        game.player_tickets[player_id] = {mode: rng.randint(0, limit) for mode, limit in game.ticket_limits.items()}
+    return detective_ai.snapshot(game, TEAM[0], budget_ms)
+
+
+def nested_loops(planner):
+    """The same scores, one joint move at a time."""
+    team = planner.team_options()
+    best, best_score = None, float("inf")
+    weights = planner.weights.tolist()
+    rows = {}
+    for joint in itertools.product(*[options or [None] for options in team]):
+        dests = [option[0] for option in joint if option]
+        if len(set(dests)) < len(dests):
+            continue
+        score = sum(option[2] for option in joint if option)
+        for s, weight in enumerate(weights):
+            cover = planner.base[s]
+            for dest in dests:
+                row = rows.get(dest)
+                if row is None:
+                    row = rows[dest] = planner.rows[planner.tables.index[dest]].tolist()
+                cover = min(cover, row[s])
+            score += weight * cover
+        if joint[0] and score < best_score:
+            best, best_score = joint[0][:2], score
+    return best
+
+
+def main():
+    states = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    budget_ms = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rng = random.Random(0)
+    snapshots = [random_state(rng, budget_ms) for _ in range(states)]
+
+    vectorized, loops, joint, agree = [], [], [], 0
+    for state in snapshots:
+        start = time.perf_counter()
+        planner = detective_ai._Planner(state, random.Random(0))
+        move, scored = planner.run(start + budget_ms / 1000)
+        vectorized.append(time.perf_counter() - start)
+        joint.append(scored)
+
+        start = time.perf_counter()
+        reference = nested_loops(detective_ai._Planner(state, random.Random(0)))
+        loops.append(time.perf_counter() - start)
+        agree += move == reference
+
+    def ms(samples):
+        samples = sorted(samples)
+        return f"median {statistics.median(samples) * 1000:7.2f} ms, max {samples[-1] * 1000:7.2f} ms"
+
+    print(f"{states} states, {len(TEAM)} bot detectives, median {statistics.median(joint):.0f} joint moves")
+    print(f"vectorized   {ms(vectorized)}")
+    print(f"nested loops {ms(loops)}")
+    print(f"same move in {agree}/{states} states")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Build/load time of the all-pairs distance tables and lookup throughput versus a per-query BFS."""
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import graph_index
+import distances
+import map_data
+
+QUERIES = 200000
+
+
+def bfs_distance(graph, a, b, mode=None):
+    seen = {a: 0}
+    queue = deque([a])
+    while queue:
+        node = queue.popleft()
+        if node == b:
+            return seen[node]
+        for dest in graph.neighbors(node, mode):
+            if dest not in seen:
+                seen[dest] = seen[node] + 1
+                queue.append(dest)
+    return None
+
+
+def main():
+    graph = graph_index.load_graph_index()
+    checksum = map_data.load().checksum
+
+    start = time.perf_counter()
+    tables = distances.DistanceTables.build(graph, checksum)
+    print(f"build            {(time.perf_counter() - start) * 1000:8.1f} ms  "
+          f"({tables.dist.nbytes + tables.hop.nbytes} bytes of tables)")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        path = os.path.join(cache_dir, "distances.npz")
+        start = time.perf_counter()
+        tables.save(path)
+        print(f"save             {(time.perf_counter() - start) * 1000:8.1f} ms")
+        start = time.perf_counter()
+        distances.DistanceTables.load(path, checksum)
+        print(f"load             {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+    random.seed(1)
+    pairs = [(random.choice(graph.nodes), random.choice(graph.nodes)) for _ in range(QUERIES)]
+    for mode in distances.TABLE_MODES:
+        start = time.perf_counter()
+        for a, b in pairs:
+            tables.lookup(a, b, mode)
+        elapsed = time.perf_counter() - start
+        print(f"lookup {str(mode):<9} {QUERIES / elapsed / 1e6:8.2f} M lookups/s")
+
+    sample = pairs[:2000]
+    start = time.perf_counter()
+    for a, b in sample:
+        bfs_distance(graph, a, b)
+    elapsed = time.perf_counter() - start
+    print(f"bfs per query    {len(sample) / elapsed / 1e3:8.2f} k queries/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Encode time and size per format for the full map and a zoomed turn map, and budget hits."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+import live_map
+from map_encoding import FORMATS, MapEncoder
+
+ROLES = {1: {"role": "Mr. X", "location": 45}, 2: {"role": "Detective", "location": 13}}
+RUNS = 5
+
+
+def full_map():
+    image = live_map.ASSET_CACHE.copy_base_map()
+    for location, role, color_key in live_map.get_visible_tokens(ROLES, 3, None, 1):
+        live_map.draw_token(image, location, role, color_key)
+    return image
+
+
+def zoom_map():
+    tokens = live_map.get_visible_tokens(ROLES, 3, 2, 1)
+    return live_map.render_viewport(tokens, ROLES[2]["location"])
+
+
+def bench(label, image, encoder):
+    for _ in range(RUNS):
+        encoder.encode(image)
+    stats = encoder.stats()
+    print(f"{label:<6} {encoder.fmt:<5} {stats['avg_encode_ms']:8.1f} ms/render  {stats['avg_bytes'] / 1024:8.1f} KiB  "
+          f"{stats['encodes'] / stats['renders']:.2f} encodes/render")
+
+
+def main():
+    full, zoom = full_map(), zoom_map()
+    for fmt in FORMATS:
+        bench("full", full, MapEncoder(fmt))
+        bench("zoom", zoom, MapEncoder(fmt))
+
+    # A tight budget: the first render learns the ratio, later ones should fit first time
+    for fmt in FORMATS:
+        bench("1MiB", full, MapEncoder(fmt, max_bytes=1024 * 1024))
+
+
+if __name__ == "__main__":
+    main()
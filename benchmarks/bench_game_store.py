@@ -0,0 +1,103 @@
+"""Write amplification and recovery time of the game store with thousands of games in progress.
+
+Plays random moves round-robin across many games, logging them like bot.py does,
+then rebuilds every game from a fresh store and checks it matches the live one.
+
+Usage: python benchmarks/bench_game_store.py [games] [moves_per_game] [snapshot_every]
+"""
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import simulator
+from game import GameState
+from game_store import GameStore, apply_move
+from history import Moved
+from sessions import SessionRegistry
+
+
+def disk_writes():
+    """Bytes this process has caused to be written to storage (Linux only)."""
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("write_bytes:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    moves_per_game = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    snapshot_every = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "games.sqlite3")
+        store = GameStore(path, snapshot_every=snapshot_every)
+        store.load()
+        rng = random.Random(0)
+        live = {}
+        for i in range(games):
+            game = GameState()
+            simulator.setup_game(game, 5, rng, simulator.MethodTimer())
+            live[(1, i)] = (game, simulator.RandomPolicy(seed=i))
+            store.save((1, i), game)
+
+        written_before = disk_writes()
+        enqueue = []
+        start = time.perf_counter()
+        for _ in range(moves_per_game):
+            for key, (game, policy) in list(live.items()):
+                player_id = game.get_current_player()
+                dest, ticket = policy.choose(game, player_id)
+                if game.apply(Moved(player_id, dest, ticket)):
+                    del live[key]
+                    store.drop(key)
+                    continue
+                begin = time.perf_counter()
+                store.record_move(key, game, player_id, dest, ticket)
+                enqueue.append(time.perf_counter() - begin)
+        played = time.perf_counter() - start
+        store.flush()
+        committed = time.perf_counter() - start
+        written = disk_writes()
+        stats = store.stats()
+        store.close()
+
+        print(f"{games} games, {stats['moves']} moves logged, {len(live)} games still in progress, "
+              f"snapshot every {snapshot_every} moves")
+        enqueue.sort()
+        print(f"record_move    median {statistics.median(enqueue) * 1e6:6.1f} us, "
+              f"p99 {enqueue[int(len(enqueue) * 0.99)] * 1e6:6.1f} us (caller side)")
+        print(f"writer         {stats['batches']} transactions, all committed {committed - played:.2f}s after the "
+              f"last move ({played:.2f}s of play)")
+        print(f"bytes          {stats['move_bytes']} of moves, {stats['snapshot_bytes']} of snapshots: "
+              f"write amplification {stats['write_amplification']:.1f}x")
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        if written_before is not None:
+            physical = written - written_before
+            print(f"disk           {physical / 2**20:.1f} MiB written ({physical / stats['move_bytes']:.0f}x the move bytes, "
+                  f"SQLite pages and WAL), store is {size / 2**20:.1f} MiB")
+
+        registry = SessionRegistry(max_sessions=games, store=GameStore(path))
+        start = time.perf_counter()
+        recovered = registry.recover(apply_move)
+        elapsed = time.perf_counter() - start
+        mismatched = sum(
+            json.dumps(registry.get(*key).state.to_dict()) != json.dumps(game.to_dict())
+            for key, (game, _) in live.items()
+        )
+        print(f"recovery       {recovered} games in {elapsed:.3f}s "
+              f"({elapsed / max(recovered, 1) * 1e6:.0f} us per game), {mismatched} mismatched")
+
+
+if __name__ == "__main__":
+    main()
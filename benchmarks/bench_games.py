@@ -0,0 +1,32 @@
+"""Headless self-play throughput of the GameState rule engine, with per-method latency percentiles.
+
+Usage: python benchmarks/bench_games.py [games] [workers] [policy]
+policy is "random" (default) or "bots" (the built-in searches, much slower).
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import simulator
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    policy = sys.argv[3] if len(sys.argv) > 3 else "random"
+
+    report = simulator.simulate(games, policy, workers=workers)
+    print(f"{report['games']} {policy} games on {workers} worker(s) in {report['seconds']:.2f}s: "
+          f"{report['games_per_second']:.0f} games/s, {report['moves_per_second']:.0f} moves/s, "
+          f"{report['invalid_moves']} invalid moves")
+    for outcome, count in sorted(report["outcomes"].items(), key=lambda item: -item[1]):
+        print(f"  {count:6d}  {outcome}")
+    print(f"{'method':<22}{'calls':>9}{'p50 us':>9}{'p90 us':>9}{'p99 us':>9}{'max us':>10}")
+    for name, stats in report["methods"].items():
+        print(f"{name:<22}{stats['calls']:>9}{stats['p50_us']:>9.1f}{stats['p90_us']:>9.1f}"
+              f"{stats['p99_us']:>9.1f}{stats['max_us']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Adjacency lookups: per-mode list scans (old) vs graph_index.GraphIndex."""
+import os
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import graph_index
+
+
+def list_maps(index):
+    """Rebuild the old dict-of-lists maps full_code.py used to parse."""
+    maps = {mode: defaultdict(list) for mode in graph_index.MODES}
+    for node in index.nodes:
+        for mode in graph_index.MODES:
+            maps[mode][node] = list(index.neighbors(node, mode))
+    return maps
+
+
+def timed(label, fn, queries):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {queries / elapsed / 1e6:7.2f} M lookups/s")
+
+
+def main():
+    start = time.perf_counter()
+    index = graph_index.load_graph_index()
+    print(f"build: {(time.perf_counter() - start) * 1000:.1f} ms")
+    maps = list_maps(index)
+    pairs = [(a, b) for a in index.nodes for b in range(1, 201)]
+
+    def scan():
+        for a, b in pairs:
+            [m for m in graph_index.MODES if b in maps[m][a]]
+
+    def indexed():
+        for a, b in pairs:
+            index.modes_between(a, b)
+
+    def neighbours_old():
+        for a in index.nodes:
+            sorted(set(d for m in graph_index.MODES for d in maps[m][a]))
+
+    def neighbours_new():
+        for a in index.nodes:
+            index.neighbors(a)
+
+    timed("modes(a, b): list scan", scan, len(pairs))
+    timed("modes(a, b): bitmask index", indexed, len(pairs))
+    timed("neighbours(a): sorted(set(...))", neighbours_old, len(index.nodes))
+    timed("neighbours(a): precomputed", neighbours_new, len(index.nodes))
+
+
+if __name__ == "__main__":
+    main()
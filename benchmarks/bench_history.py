@@ -0,0 +1,78 @@
+"""Cost of rebuilding past game states from the event log, with and without checkpoints, and of /undo.
+
+Every rebuilt state is checked against the live state recorded after the same event.
+
+Usage: python benchmarks/bench_history.py [games]
+"""
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import live_map
+import simulator
+from game import GameState
+from history import EventLog, Seated, Moved
+
+
+def play(seed):
+    """Play a random game through GameState.apply; returns (game, [state after each event])."""
+    rng = random.Random(seed)
+    policy = simulator.RandomPolicy(seed)
+    game = GameState()
+    players = list(range(1, 6))
+    locations = tuple((player_id, rng.choice(live_map.get_all_nodes())) for player_id in players)
+    turn_order = players.copy()
+    rng.shuffle(turn_order)
+    roles = tuple((player_id, "Mr. X" if player_id == 1 else "Detective") for player_id in players)
+    game.apply(Seated(roles, 1, locations, tuple(turn_order)))
+    states = [json.dumps(game.to_dict(history=False))]
+    while True:
+        player_id = game.get_current_player()
+        move = policy.choose(game, player_id)
+        if move is None or game.apply(Moved(player_id, *move)):
+            break
+        states.append(json.dumps(game.to_dict(history=False)))
+    return game, states
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    played = [play(seed) for seed in range(games)]
+    print(f"{games} games, {statistics.mean(len(game.history) for game, _ in played):.0f} events on average")
+
+    for label, every in (("checkpoints", None), ("no checkpoints", 10**9)):
+        timings, mismatched, folds = [], 0, 0
+        for game, states in played:
+            log = EventLog(game.history.events[:len(states)], every)
+            for index, expected in enumerate(states, 1):
+                start = time.perf_counter()
+                state = log.state_at(index, GameState)
+                timings.append(time.perf_counter() - start)
+                mismatched += json.dumps(state.to_dict(history=False)) != expected
+            folds += log.folds
+        timings.sort()
+        print(f"{label:<15} state_at median {statistics.median(timings) * 1e6:7.1f} us, "
+              f"max {timings[-1] * 1e6:8.1f} us, {folds / len(timings):5.1f} events folded per call, "
+              f"{mismatched} mismatched")
+
+    timings, mismatched = [], 0
+    for game, states in played:
+        # Undo back to the start of the game, checking each step
+        while len(game.history) > 1 and isinstance(game.history.events[-1], Moved):
+            index = len(game.history) - 1
+            start = time.perf_counter()
+            game.undo()
+            timings.append(time.perf_counter() - start)
+            mismatched += json.dumps(game.to_dict(history=False)) != states[index - 1]
+    timings.sort()
+    print(f"undo            median {statistics.median(timings) * 1e6:7.1f} us, "
+          f"max {timings[-1] * 1e6:8.1f} us, {mismatched} mismatched")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Token drawing cost per move: full redraw on a fresh copy vs LayeredMapRenderer."""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import live_map
+import map_layers
+
+
+def full_draw(tokens):
+    canvas = live_map.ASSET_CACHE.copy_base_map()
+    for location, role, color_key in tokens:
+        live_map.draw_token(canvas, location, role, color_key)
+    return canvas
+
+
+def moves(count, players=5, seed=7):
+    """Yield the visible token list after each random single-player move."""
+    rng = random.Random(seed)
+    roles = {uid: {"role": "Mr. X" if uid == 1 else "Detective", "location": rng.choice(live_map.get_all_nodes())}
+             for uid in range(1, players + 1)}
+    for _ in range(count):
+        uid = rng.choice(list(roles))
+        roles[uid]["location"] = rng.choice(live_map.get_connected_nodes(roles[uid]["location"]))
+        yield live_map.get_visible_tokens(roles, 3, None, 1)
+
+
+def main(count=200):
+    sequence = list(moves(count))
+    live_map.ASSET_CACHE.get_base_map()
+
+    start = time.perf_counter()
+    for tokens in sequence:
+        full_draw(tokens)
+    full = (time.perf_counter() - start) / count
+
+    renderer = map_layers.LayeredMapRenderer()
+    start = time.perf_counter()
+    for tokens in sequence:
+        renderer.draw(tokens)
+    layered = (time.perf_counter() - start) / count
+
+    print(f"full redraw     {full * 1000:7.3f} ms/move")
+    print(f"layered redraw  {layered * 1000:7.3f} ms/move  "
+          f"({renderer.tokens_drawn / count:.2f} tokens drawn per move, {full / layered:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
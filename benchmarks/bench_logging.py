@@ -0,0 +1,112 @@
+"""Per-move CPU cost of full_code.py's game helpers under different logging setups.
+
+Each move runs what a turn in full_code.py runs outside Discord calls:
+get_current_player, get_available_transports, the location and suspect
+updates, check_end_conditions and advance_turn. "every message, synchronous"
+writes every debug message on the calling thread, which is what the print
+calls did before; the other setups are the LogConfig options. CPU time
+is split into the calling thread (the event loop, in the bot) and the
+whole process including the listener thread; queued records are written out
+before the clock stops. Output goes to a temporary file. full_code.py is loaded without
+its trailing client.run() call.
+
+Usage: python benchmarks/bench_logging.py [moves]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import live_map
+from game import GameState
+from logs import LogConfig
+
+SETUPS = [
+    ("every message, synchronous", dict(level="DEBUG", queue_size=0)),
+    ("every message, queued", dict(level="DEBUG")),
+    ("debug sampled 1 in 100", dict(level="DEBUG", sample={"game": 100, "maps": 100})),
+    ("INFO (default)", dict(level="INFO")),
+]
+
+
+def load_full_code(path=None):
+    """Import full_code.py (or another version of it) as a module, skipping the client.run() line."""
+    path = path or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "full_code.py")
+    with open(path) as f:
+        source = "".join(line for line in f if not line.startswith("client.run("))
+    module = types.ModuleType("full_code")
+    module.__file__ = path
+    exec(compile(source, path, "exec"), module.__dict__)
+    return module
+
+
+full_code = load_full_code()
+
+
+def new_game(rng):
+    """Seat five players the way full_code.py's /join and /begin do."""
+    game = GameState()
+    nodes = rng.sample(live_map.get_all_nodes(), 5)
+    game.mr_x_id = 1
+    game.roles[1] = {"role": "Mr. X", "location": nodes[0], "tickets": {"taxi": 999, "bus": 999, "metro": 999},
+                     "black_tickets": full_code.black_ticket_limit}
+    for player_id, node in enumerate(nodes[1:], 2):
+        game.roles[player_id] = {"role": "Detective", "location": node, "tickets": full_code.ticket_limits.copy()}
+    game.turn_order = list(game.roles)
+    game.suspects.start(full_code.detective_locations(game))
+    return game
+
+
+def play(moves, seed=0):
+    """Play random moves, starting a new game whenever one ends."""
+    rng = random.Random(seed)
+    game = new_game(rng)
+    for _ in range(moves):
+        player_id = full_code.get_current_player(game)
+        info = game.roles[player_id]
+        options = [(dest, transports) for dest in live_map.GRAPH.neighbors(info["location"])
+                   if (transports := full_code.get_available_transports(game, player_id, info["location"], dest))]
+        if not options:
+            game = new_game(rng)
+            continue
+        dest, transports = rng.choice(options)
+        transport = rng.choice(transports)
+        if info["role"] == "Detective":
+            info["tickets"][transport.lower()] -= 1
+        live_map.update_player_location(player_id, dest, game.roles)
+        if info["role"] == "Detective":
+            game.suspects.detectives_at([dest])
+        else:
+            game.suspects.mr_x_moved(transport, full_code.detective_locations(game))
+        if full_code.check_end_conditions(game):
+            game = new_game(rng)
+            continue
+        full_code.advance_turn(game)
+
+
+def main():
+    moves = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    full_code.log_config.uninstall()
+    print(f"{moves} moves")
+    print(f"{'us per move':<30}{'caller CPU':>11}{'total CPU':>11}{'lines':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for label, options in SETUPS:
+            path = os.path.join(directory, "log.txt")
+            with open(path, "w") as stream:
+                config = LogConfig(stream=stream, **options).install()
+                cpu, caller = time.process_time(), time.thread_time()
+                play(moves)
+                caller = time.thread_time() - caller
+                config.uninstall()
+                cpu = time.process_time() - cpu
+            with open(path) as f:
+                lines = sum(1 for _ in f)
+            print(f"{label:<30}{caller / moves * 1e6:>11.1f}{cpu / moves * 1e6:>11.1f}{lines:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Time to load the board: parsing the text files, as the loaders did, against the compiled map package.
+
+"text parse" is what live_map and graph_index did at every start before
+the package: nodes.txt, connections.txt and the three map files read line
+by line. "compile" is map_data.compile_sources, the same parse plus the
+build step's validation. "package" is map_data.load on text_files/map.bin,
+one memory-mapped read. Building the GraphIndex from the edges is timed
+separately; every loader pays it.
+
+Usage: python benchmarks/bench_map_data.py [runs]
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import graph_index
+import map_data
+
+
+def text_parse():
+    """The old loaders: coordinates from nodes.txt, then edges from connections.txt and the per-mode files."""
+    coords = {}
+    with open(map_data.NODES_PATH) as f:
+        for line in f:
+            parts = line.strip().split(',')
+            if len(parts) == 3:
+                node, x, y = map(int, parts)
+                coords[node] = (x, y)
+    edges = set()
+    for path, mode in graph_index.source_files():
+        with open(path) as f:
+            for line in f:
+                parts = line.strip().split(',')
+                if mode is None and len(parts) == 3:
+                    a, b, edge_mode = int(parts[0]), int(parts[1]), graph_index.normalize_mode(parts[2])
+                elif mode is not None and len(parts) == 2:
+                    a, b, edge_mode = int(parts[0]), int(parts[1]), mode
+                else:
+                    continue
+                edges.add((min(a, b), max(a, b), edge_mode))
+    return coords, edges
+
+
+def timed(fn, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    data = map_data.load()
+    coords, edges = text_parse()
+    assert coords == data.coords and edges == set(data.edges), "package differs from the text files"
+
+    print(f"{len(data.coords)} nodes, {len(data.edges)} edges, "
+          f"{os.path.getsize(map_data.MAP_DATA_PATH)} byte package (median of {runs})")
+    rows = [
+        ("text parse", text_parse),
+        ("compile (parse + validate)", map_data.compile_sources),
+        ("package (mmap)", map_data.load),
+        ("GraphIndex from edges", data.graph),
+    ]
+    for label, fn in rows:
+        print(f"{label:<28} {timed(fn, runs):8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
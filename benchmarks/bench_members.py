@@ -0,0 +1,123 @@
+"""Member lookups and turn latency in full_code.py's play_turn, with and without the per-game MemberCache.
+
+Uses the stand-in Discord API from bench_outbox.py: fetch_member is one
+simulated REST round trip. Setups:
+
+- "fetch every turn": ttl=0, so every lookup goes to REST, as the turn
+  code did before.
+- "gateway only": nothing filled at /join, and guild.get_member answers
+  from the gateway's member cache.
+- "MemberCache": players cached at /join, as the /join command does now.
+
+Turn latency is the time from the button click to the last message sent,
+reported unscaled like bench_outbox.py. Players take THINK seconds between
+moves, so the channel's rate limit has refilled and the latency is round
+trips rather than waiting.
+
+Usage: python benchmarks/bench_members.py [moves]
+"""
+import asyncio
+import io
+import os
+import random
+import statistics
+import sys
+import time
+import types
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import live_map
+import bench_outbox
+from bench_outbox import FakeAPI, FakeMessageable, fake_interaction, TIME_SCALE
+from bench_logging import full_code, new_game
+from members import MemberCache, member_stats
+
+THINK = 5.0  # seconds between moves
+
+SETUPS = [
+    ("fetch every turn", dict(ttl=0, prefill=False, gateway=False)),
+    ("gateway only", dict(ttl=600, prefill=False, gateway=True)),
+    ("MemberCache", dict(ttl=600, prefill=True, gateway=False)),
+]
+
+
+async def run(moves, ttl, prefill, gateway, seed=0):
+    api = FakeAPI()
+    channel = FakeMessageable(api, "channel", "channel", id=1000)
+    members = {}
+
+    def member(member_id):
+        if member_id not in members:
+            members[member_id] = FakeMessageable(api, "dm", f"dm-{member_id}", id=member_id,
+                                                 mention=f"<@{member_id}>")
+        return members[member_id]
+
+    async def fetch_member(member_id):
+        await api.request("fetch_member", "guild")
+        return member(member_id)
+
+    guild = channel.guild = types.SimpleNamespace(
+        fetch_member=fetch_member, get_member=member if gateway else lambda member_id: None)
+
+    async def render_map(game, game_key, zoom_player=None, heat=None):
+        return io.BytesIO(b"\x89PNG map")
+
+    full_code.render_map = render_map
+    full_code.send_limiter = full_code.SendLimiter(5, 5.0 * TIME_SCALE)
+
+    class button_class(full_code.TransportSelectView.TransportButton):
+        parent = None  # discord.py 2.6+ has a read-only Item.parent; the button only needs an attribute
+
+    counts = Counter()
+    rng = random.Random(seed)
+    turn_times = []
+    session = None
+    played = 0
+    while played < moves:
+        if session is None:
+            game = new_game(rng)
+            session = types.SimpleNamespace(key=(1, 1), lock=asyncio.Lock(), touch=lambda: None,
+                                            members=MemberCache(ttl * TIME_SCALE, counts))
+            if prefill:
+                for player_id in game.roles:
+                    session.members.put(member(player_id))
+        player_id = full_code.get_current_player(game)
+        info = game.roles[player_id]
+        options = [(dest, transport) for dest in live_map.GRAPH.neighbors(info["location"])
+                   for transport in full_code.get_available_transports(game, player_id, info["location"], dest)]
+        if not options:
+            session = None
+            continue
+        dest, transport = rng.choice(options)
+        await asyncio.sleep(THINK * TIME_SCALE)
+        user = types.SimpleNamespace(id=player_id, mention=f"<@{player_id}>")
+        interaction = fake_interaction(api, channel, guild)
+        parent = types.SimpleNamespace(game=game, session=session, stop=lambda: None)
+        button = button_class(transport, user, dest, interaction, parent)
+        start = time.perf_counter()
+        await button.play_turn(interaction)
+        turn_times.append((time.perf_counter() - start) / TIME_SCALE)
+        played += 1
+        if not game.turn_order:
+            session = None
+    return api, counts, turn_times
+
+
+def main():
+    moves = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    full_code.log_config.uninstall()
+    print(f"{moves} moves, {bench_outbox.LATENCY * 1000:.0f} ms per round trip, {THINK:.0f} s between moves")
+    print(f"{'per move':<20}{'REST fetches':>13}{'hit rate':>10}{'turn p50 ms':>13}{'turn p95 ms':>13}")
+    for label, options in SETUPS:
+        api, counts, turn_times = asyncio.run(run(moves, **options))
+        cuts = statistics.quantiles(turn_times, n=20)
+        hit_rate = member_stats(counts)["hit_rate"] or 0
+        print(f"{label:<20}{api.calls.get('fetch_member', 0) / moves:>13.2f}{hit_rate:>10.2f}"
+              f"{cuts[9] * 1000:>13.0f}{cuts[18] * 1000:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
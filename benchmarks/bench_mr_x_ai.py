@@ -0,0 +1,82 @@
+"""Rollout throughput of the Mr. X search, and rounds survived against chasing detectives versus a greedy Mr. X.
+
+Usage: python benchmarks/bench_mr_x_ai.py [games] [budget_ms]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import live_map
+import mr_x_ai
+from game import GameState
+
+DETECTIVES = (1, 2, 3, 4)
+
+
+def new_game(rng):
+    game = GameState()
+    game.mr_x_id = mr_x_ai.AI_MR_X_ID
+    locations = rng.sample(live_map.GRAPH.nodes, len(DETECTIVES) + 1)
+    game.player_locations = dict(zip((game.mr_x_id,) + DETECTIVES, locations))
+    game.suspects.start(game.detective_locations())
+    return game
+
+
+def detective_move(game, player_id, rng):
+    """Detectives head for the nearest suspect node, as a human team would."""
+    location, tickets = game.player_locations[player_id], game.player_tickets[player_id]
+    taken = set(game.detective_locations())
+    options = [(dest, mode) for dest, modes in live_map.GRAPH.edges(location) for mode in modes
+               if tickets[mode] > 0 and dest not in taken]
+    if not options:
+        return None
+    suspects = game.suspects.candidates()
+    return min(options, key=lambda o: (live_map.DISTANCES.nearest(o[0], suspects)[0] or 99, rng.random()))
+
+
+def play(policy, seed, budget_ms):
+    """Return the number of rounds Mr. X survived (25 = escaped)."""
+    rng = random.Random(seed)
+    game = new_game(rng)
+    for round_number in range(1, game.MAX_ROUNDS + 1):
+        game.round_counter = round_number
+        state = mr_x_ai.snapshot(game, budget_ms, seed=rng.random())
+        move = mr_x_ai.choose_move(state) if policy == "search" else mr_x_ai.fallback_move(state)
+        if move is None:
+            return round_number
+        game.execute_move(game.mr_x_id, *move)
+        for player_id in DETECTIVES:
+            move = detective_move(game, player_id, rng)
+            if move is None:
+                continue
+            game.execute_move(player_id, *move)
+            if move[0] == game.player_locations[game.mr_x_id]:
+                return round_number
+    return game.MAX_ROUNDS + 1
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    budget_ms = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    rng = random.Random(0)
+    game = new_game(rng)
+    search = mr_x_ai._Search(mr_x_ai.snapshot(game, budget_ms), rng)
+    start = time.perf_counter()
+    _, arms = search.run(start + 1.0)
+    rollouts = sum(count for count, _ in arms.values())
+    print(f"{rollouts / (time.perf_counter() - start):.0f} rollouts/s over {len(arms)} root moves")
+
+    for policy in ("greedy", "search"):
+        start = time.perf_counter()
+        survived = [play(policy, seed, budget_ms) for seed in range(games)]
+        escaped = sum(rounds > game.MAX_ROUNDS for rounds in survived)
+        print(f"{policy:<7} escaped {escaped}/{games}, mean rounds {sum(survived) / games:5.2f}, "
+              f"{time.perf_counter() - start:6.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Discord round trips per move in full_code.py's TransportButton.play_turn, one call per message against Outbox batching.
+
+play_turn runs unchanged against a local stand-in for the Discord HTTP
+API: every call (edit, send, fetch_member) takes one simulated round trip
+of LATENCY seconds and draws on a per-route bucket of 5 requests per 5
+seconds, the way Discord limits messages per channel. A request to an
+empty bucket is answered with a 429 and retried after the bucket refills,
+as discord.py does, so rejected requests count as round trips too.
+Moves follow each other with no pause for players, which is the worst case
+for the rate limit. All times are scaled down by TIME_SCALE while running
+and reported unscaled. Map rendering is replaced by a fixed image so only
+the API traffic is measured.
+
+"one call per message" is Outbox(merge=False) without a limiter, which
+makes the same calls in the same order as the sequential sends it
+replaced; pass the path of an older full_code.py to measure that as well.
+
+Usage: python benchmarks/bench_outbox.py [moves] [old full_code.py]
+"""
+import asyncio
+import io
+import os
+import random
+import sys
+import time
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import live_map
+import bench_logging
+from bench_logging import load_full_code, new_game
+from members import MemberCache
+from outbox import Outbox, SendLimiter
+
+LATENCY = 0.08       # seconds per round trip
+BUCKET = (5, 5.0)    # requests per seconds, per channel
+TIME_SCALE = 0.02
+
+
+class FakeAPI:
+    """Counts round trips and applies latency and per-route buckets."""
+
+    def __init__(self):
+        self.calls = {}
+        self.rejected = 0
+        self.buckets = {}
+
+    async def request(self, kind, route):
+        rate, per = BUCKET
+        while True:
+            await asyncio.sleep(LATENCY * TIME_SCALE)
+            self.calls[kind] = self.calls.get(kind, 0) + 1
+            now = time.monotonic()
+            tokens, updated = self.buckets.get(route, (rate, now))
+            tokens = min(rate, tokens + (now - updated) * rate / (per * TIME_SCALE))
+            if tokens >= 1:
+                self.buckets[route] = (tokens - 1, now)
+                return
+            self.buckets[route] = (tokens, now)
+            self.rejected += 1
+            await asyncio.sleep((1 - tokens) * per * TIME_SCALE / rate)
+
+
+class FakeMessageable:
+    def __init__(self, api, kind, route, **attributes):
+        self.api, self.kind, self.route = api, kind, route
+        self.__dict__.update(attributes)
+
+    async def send(self, content=None, **kwargs):
+        for file in kwargs.get("files", [kwargs.get("file")]):
+            if file is not None:
+                file.fp.read()
+        await self.api.request(self.kind, self.route)
+
+
+def fake_interaction(api, channel, guild):
+    """A button interaction: its response edit and followups are their own routes, as on Discord."""
+    async def edit_message(**kwargs):
+        await api.request("edit", "interaction")
+
+    token = f"token-{random.random()}"
+    return types.SimpleNamespace(
+        channel=channel, guild=guild,
+        response=types.SimpleNamespace(edit_message=edit_message),
+        followup=FakeMessageable(api, "followup", token, id=0, token=token),
+    )
+
+
+async def run(full_code, moves, merge, seed=0):
+    api = FakeAPI()
+    channel = FakeMessageable(api, "channel", "channel", id=1000)
+    members = {}
+
+    async def fetch_member(member_id):
+        await api.request("fetch_member", "guild")
+        if member_id not in members:
+            members[member_id] = FakeMessageable(api, "dm", f"dm-{member_id}", id=member_id,
+                                                 mention=f"<@{member_id}>")
+        return members[member_id]
+
+    guild = channel.guild = types.SimpleNamespace(fetch_member=fetch_member, get_member=lambda member_id: None)
+
+    async def render_map(game, game_key, zoom_player=None, heat=None):
+        return io.BytesIO(b"\x89PNG map")
+
+    full_code.render_map = render_map
+    if hasattr(full_code, "Outbox"):
+        rate, per = BUCKET
+        full_code.send_limiter = SendLimiter(rate, per * TIME_SCALE)
+        full_code.Outbox = (lambda limiter=None: Outbox(limiter)) if merge else (lambda limiter=None: Outbox(merge=False))
+
+    class button_class(full_code.TransportSelectView.TransportButton):
+        parent = None  # discord.py 2.6+ has a read-only Item.parent; the button only needs an attribute
+
+    rng = random.Random(seed)
+    game = new_game(rng)
+    played = 0
+    start = time.perf_counter()
+    while played < moves:
+        player_id = full_code.get_current_player(game)
+        info = game.roles[player_id]
+        options = [(dest, transport) for dest in live_map.GRAPH.neighbors(info["location"])
+                   for transport in full_code.get_available_transports(game, player_id, info["location"], dest)]
+        if not options:
+            game = new_game(rng)
+            continue
+        dest, transport = rng.choice(options)
+        user = types.SimpleNamespace(id=player_id, mention=f"<@{player_id}>")
+        interaction = fake_interaction(api, channel, guild)
+        # A zero TTL fetches the next player on every turn, as before the member cache
+        session = types.SimpleNamespace(key=(1, 1), members=MemberCache(ttl=0))
+        parent = types.SimpleNamespace(game=game, session=session, stop=lambda: None)
+        button = button_class(transport, user, dest, interaction, parent)
+        await button.play_turn(interaction)
+        played += 1
+        if not game.turn_order:
+            game = new_game(rng)
+    elapsed = (time.perf_counter() - start) / TIME_SCALE
+    return api, elapsed
+
+
+def main():
+    moves = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    runs = [("one call per message", load_full_code(), False), ("Outbox batching", load_full_code(), True)]
+    if len(sys.argv) > 2:
+        runs.insert(0, (f"old {os.path.basename(sys.argv[2])}", load_full_code(sys.argv[2]), False))
+    print(f"{moves} moves, {LATENCY * 1000:.0f} ms per round trip, {BUCKET[0]} requests per {BUCKET[1]:.0f} s per route")
+    print(f"{'per move':<24}{'round trips':>12}{'429s':>7}{'seconds':>9}   calls by kind")
+    for full_code in [bench_logging.full_code] + [module for _, module, _ in runs]:
+        full_code.log_config.uninstall()
+    for label, full_code, merge in runs:
+        api, elapsed = asyncio.run(run(full_code, moves, merge))
+        kinds = ", ".join(f"{kind} {count / moves:.2f}" for kind, count in sorted(api.calls.items()))
+        print(f"{label:<24}{sum(api.calls.values()) / moves:>12.2f}{api.rejected / moves:>7.2f}"
+              f"{elapsed / moves:>9.2f}   {kinds}")
+
+
+if __name__ == "__main__":
+    main()
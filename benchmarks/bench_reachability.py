@@ -0,0 +1,45 @@
+"""Cost of ticket-constrained reachability, trap look-ahead and plans, first call and repeated (memoized) call."""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import graph_index
+from reachability import ReachabilityEngine
+
+SAMPLES = 500
+
+
+def timed(label, engine, queries, call):
+    engine._memo.clear()
+    start = time.perf_counter()
+    for query in queries:
+        call(*query)
+    cold = (time.perf_counter() - start) / len(queries)
+    start = time.perf_counter()
+    for query in queries:
+        call(*query)
+    warm = (time.perf_counter() - start) / len(queries)
+    print(f"{label:<22} first {cold * 1e6:9.1f} us  repeat {warm * 1e6:7.2f} us")
+
+
+def main():
+    random.seed(5)
+    graph = graph_index.load_graph_index()
+    engine = ReachabilityEngine(graph)
+    states = [(random.choice(graph.nodes),
+               {"taxi": random.randint(0, 10), "bus": random.randint(0, 8), "metro": random.randint(0, 4)})
+              for _ in range(SAMPLES)]
+    for k in (2, 3, 4, 5):
+        timed(f"reachable k={k}", engine, states, lambda node, tickets, k=k: engine.reachable(node, tickets, k))
+    timed("moves_left horizon=3", engine, states, lambda node, tickets: engine.moves_left(node, tickets, 3))
+    targets = [random.sample(graph.nodes, 10) for _ in range(SAMPLES)]
+    plans = [(node, tickets, target) for (node, tickets), target in zip(states, targets)]
+    timed("plan k=4 (10 targets)", engine, plans, lambda node, tickets, target: engine.plan(node, tickets, target, 4))
+    print(engine.stats())
+
+
+if __name__ == "__main__":
+    main()
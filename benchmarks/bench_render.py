@@ -0,0 +1,44 @@
+"""Renders per second of live_map.generate_map with a cold and a warm asset cache."""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import live_map
+
+ROLES = {
+    1: {"role": "Mr. X", "location": 45},
+    2: {"role": "Detective", "location": 13},
+    3: {"role": "Detective", "location": 91},
+    4: {"role": "Detective", "location": 138},
+}
+
+
+def run(label, renders, before_each=None, **kwargs):
+    start = time.perf_counter()
+    for _ in range(renders):
+        if before_each:
+            before_each()
+        live_map.generate_map(ROLES, 3, mr_x_id=1, **kwargs)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {renders / elapsed:8.2f} renders/s  {elapsed / renders * 1000:8.1f} ms/render")
+
+
+def main(renders=20):
+    # "uncached" reproduces the old behaviour by forcing a decode on every render
+    run("full map, uncached", renders, before_each=live_map.ASSET_CACHE.invalidate)
+    run("full map, cached", renders)
+    run("zoom map, uncached", renders, before_each=live_map.ASSET_CACHE.invalidate, zoom_player=2)
+    run("zoom map, cached", renders, zoom_player=2)
+    start = time.perf_counter()
+    tokens = live_map.get_visible_tokens(ROLES, 3, 2, 1)
+    for _ in range(renders):
+        live_map.render_viewport(tokens, ROLES[2]["location"])
+    elapsed = time.perf_counter() - start
+    print(f"{'zoom viewport, draw only':<32} {renders / elapsed:8.2f} renders/s  {elapsed / renders * 1000:8.1f} ms/render")
+    print(f"asset cache: {live_map.ASSET_CACHE.stats()}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,48 @@
+"""Event-loop lag while maps render inline vs on MapRenderPool."""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import live_map
+from render_pool import MapRenderPool
+from bench_render import ROLES
+
+
+async def heartbeat(stop, lags, interval=0.01):
+    """Record how late each tick fires; a blocked loop shows up as large lag."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def run(label, render, renders):
+    stop, lags = asyncio.Event(), []
+    beat = asyncio.create_task(heartbeat(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(render() for _ in range(renders)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+    lags.sort()
+    print(f"{label:<20} {elapsed:6.2f}s total  max lag {lags[-1] * 1000:7.1f} ms  "
+          f"p50 lag {lags[len(lags) // 2] * 1000:6.1f} ms  ticks {len(lags)}")
+
+
+async def main(renders=8):
+    async def inline():
+        live_map.generate_map(ROLES, 3, zoom_player=2, mr_x_id=1)
+
+    await run("inline", inline, renders)
+    for mode in ("thread", "process"):
+        pool = MapRenderPool(mode=mode, max_workers=2, max_queue=4)
+        await run(f"{mode} pool", lambda: pool.render(ROLES, 3, zoom_player=2, mr_x_id=1), renders)
+        print(f"  {pool.stats()}")
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 8))
@@ -0,0 +1,65 @@
+"""Load test: many simultaneous games in one SessionRegistry, per-move latency."""
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import live_map
+from sessions import SessionRegistry
+
+
+def start_game(game, rng):
+    """Seat one Mr. X and three detectives on random nodes."""
+    nodes = list(live_map.POSITION_COORDS)
+    game.joined_players = [1, 2, 3, 4]
+    game.mr_x_id = 1
+    game.turn_order = [1, 2, 3, 4]
+    for uid in game.joined_players:
+        game.roles[uid] = "Mr. X" if uid == 1 else "Detective"
+        game.player_locations[uid] = rng.choice(nodes)
+
+
+def play_move(game, rng):
+    """Make one random legal move for the current player."""
+    uid = game.get_current_player()
+    current = game.player_locations[uid]
+    options = [(dest, transport) for dest in live_map.get_connected_nodes(current)
+               for transport in game.get_available_transports(uid, current, dest)]
+    if options:
+        dest, transport = rng.choice(options)
+        if game.validate_move(uid, dest, transport)[0]:
+            game.execute_move(uid, dest, transport)
+    game.advance_turn()
+
+
+async def player(registry, channel_id, moves, latencies, rng):
+    session = registry.get_or_create(1, channel_id)
+    start_game(session.state, rng)
+    for _ in range(moves):
+        start = time.perf_counter()
+        async with session.lock:
+            session.touch()
+            play_move(session.state, rng)
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0)
+
+
+async def run(games, moves):
+    registry = SessionRegistry(max_sessions=games)
+    latencies, rng = [], random.Random(games)
+    start = time.perf_counter()
+    await asyncio.gather(*(player(registry, cid, moves, latencies, rng) for cid in range(games)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1e6
+    print(f"{games:>5} games  {len(latencies) / elapsed:10.0f} moves/s  "
+          f"p50 {pct(0.5):7.1f} us  p99 {pct(0.99):7.1f} us  active {len(registry)}")
+
+
+if __name__ == "__main__":
+    moves = int(sys.argv[1]) if len(sys.argv) > 1 else 96
+    for games in (1, 10, 100, 500, 1000):
+        asyncio.run(run(games, moves))
@@ -0,0 +1,86 @@
+"""Token and heat marker drawing: ImageDraw shapes and text per marker (old) vs composited sprites.
+
+"draw" is how generate_map drew before the sprites: draw_token_at for
+every token (two ellipses, a textbbox and a stroked text) and the heatmap
+as ellipses on a full-size overlay composited over the map. "sprites" is
+the current live_map.draw_token / draw_heatmap. Both draw onto the same
+copy of the base map, whose copy is not timed; encoding is left out.
+
+Usage: python benchmarks/bench_sprites.py [runs]
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+import live_map
+
+COLOUR_KEYS = ["Mr. X", "Detective_1", "Detective_2", "Detective_3"]
+
+
+def draw_tokens(image, tokens):
+    draw = ImageDraw.Draw(image)
+    small_font = live_map.ASSET_CACHE.get_fonts()[1]
+    for location, role, color_key in tokens:
+        x, y = live_map.POSITION_COORDS[location]
+        live_map.draw_token_at(draw, x, y, role, color_key, small_font)
+    return image
+
+
+def draw_heat(image, heat):
+    overlay = Image.new("RGBA", image.size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
+    peak = max(heat.values())
+    radius = live_map.HEAT_RADIUS
+    for node, weight in heat.items():
+        x, y = live_map.POSITION_COORDS[node]
+        alpha = 60 + round(160 * weight / peak)
+        draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=live_map.HEAT_COLOUR + (alpha,))
+    return Image.alpha_composite(image, overlay)
+
+
+def sprite_tokens(image, tokens):
+    for location, role, color_key in tokens:
+        live_map.draw_token(image, location, role, color_key)
+    return image
+
+
+def timed(fn, make_args, runs):
+    times = []
+    for _ in range(runs):
+        args = make_args()
+        start = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    rng = random.Random(3)
+    nodes = live_map.get_all_nodes()
+    live_map.warm_up()
+    copy = live_map.ASSET_CACHE.copy_base_map
+
+    print(f"median of {runs}, ms per map")
+    print(f"{'markers':<22}{'draw':>9}{'sprites':>9}")
+    for count in (5, 50, 150):
+        tokens = [(node, "Mr. X" if i == 0 else "Detective", COLOUR_KEYS[i % len(COLOUR_KEYS)])
+                  for i, node in enumerate(rng.sample(nodes, count))]
+        old = timed(draw_tokens, lambda: (copy(), tokens), runs)
+        new = timed(sprite_tokens, lambda: (copy(), tokens), runs)
+        print(f"{f'{count} tokens':<22}{old:>9.2f}{new:>9.2f}")
+    for count in (10, 50, 150):
+        heat = {node: rng.random() for node in rng.sample(nodes, count)}
+        old = timed(draw_heat, lambda: (copy(), heat), runs)
+        new = timed(live_map.draw_heatmap, lambda: (copy(), heat), runs)
+        print(f"{f'{count} heat markers':<22}{old:>9.2f}{new:>9.2f}")
+    print(f"sprites: {live_map.TOKEN_SPRITES.stats()['sprites']} token, {live_map.HEAT_SPRITES.stats()['sprites']} heat")
+
+
+if __name__ == "__main__":
+    main()
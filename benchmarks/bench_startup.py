@@ -0,0 +1,128 @@
+"""Cold start of bot.py and the cost of its first command, with an import-time profile.
+
+Each run starts a fresh interpreter that imports bot.py, which stops
+before its guarded client.run() call, and reports how long after process
+start that was ("imports"). The child never connects to Discord, so it then calls
+startup.ready() the way on_ready does. After that it times a first
+command: a /moves plan, a distance lookup and a zoomed turn map. It runs
+after the warm-up with STARTUP_WARMUP=ready, and cold with lazy. Full-map
+renders are left out because encoding one costs the same every time.
+GAME_STORE is disabled so no saved games are replayed.
+
+The profile runs one more child under python -X importtime, stopping
+before on_ready. It lists the slowest imports by cumulative time, plus the
+self time of every module of the main packages and of this repository.
+
+Pass another checkout of the repository to time its bot.py the same way
+(for example an older commit from git worktree add).
+
+Usage: python benchmarks/bench_startup.py [runs] [other checkout]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import asyncio, json, os, sys, time
+root = sys.argv[1]
+sys.path.insert(0, root)
+os.chdir(root)
+path = os.path.join(root, "bot.py")
+with open(path) as f:
+    source = "".join(line for line in f if not line.startswith("client.run("))
+bot = {"__name__": "bot", "__file__": path}
+exec(compile(source, path, "exec"), bot)
+result = {}
+if len(sys.argv) > 2:
+    sys.exit()  # import profile only
+startup = bot.get("startup")
+if startup is not None:
+    result["imports"] = startup.phases.get("imports") or startup.mark("imports")
+else:
+    with open("/proc/self/stat") as f:
+        ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+    result["imports"] = time.clock_gettime(time.CLOCK_BOOTTIME) - ticks / os.sysconf("SC_CLK_TCK")
+
+async def on_ready():
+    if startup is not None:
+        warm = startup.ready()
+        if warm is not None:
+            await warm
+    live_map = bot["live_map"]
+    roles = {1: {"role": "Detective", "location": 13}, 2: {"role": "Mr. X", "location": 100}}
+    start = time.perf_counter()
+    live_map.REACHABILITY.reachable(13, {"taxi": 10, "bus": 8, "metro": 4}, 4)
+    live_map.DISTANCES.nearest(13, [100, 101, 102])
+    live_map.generate_map(roles, 1, zoom_player=1)
+    result["first_command"] = time.perf_counter() - start
+
+asyncio.run(on_ready())
+print(json.dumps(result))
+"""
+
+GROUPS = ("discord", "aiohttp", "numpy", "PIL")
+
+
+def child_env(**extra):
+    return {**os.environ, "GUILD_ID": "1", "GAME_STORE": "", "LOG_LEVEL": "WARNING", **extra}
+
+
+def cold_starts(root, runs, warmup):
+    results = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", CHILD, root], env=child_env(STARTUP_WARMUP=warmup),
+                                capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+
+def import_profile(root, top=15):
+    """Run one child under -X importtime; return [(cumulative us, self us, module)] and package totals."""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD, root, "imports"], env=child_env(),
+                            capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), int(own), name.rstrip()))
+    totals = {group: sum(own for _, own, name in rows if name.strip().split(".")[0] == group) for group in GROUPS}
+    project = sum(own for _, own, name in rows
+                  if os.path.exists(os.path.join(root, name.strip().split(".")[0] + ".py")))
+    total = sum(own for _, own, _ in rows)
+    return sorted(rows, reverse=True)[:top], totals, project, total
+
+
+def report(label, root, runs):
+    print(f"{label}: {root}")
+    for warmup in ("lazy", "ready"):
+        results = cold_starts(root, runs, warmup)
+        imports = statistics.median(r["imports"] for r in results)
+        first = statistics.median(r["first_command"] for r in results)
+        print(f"  STARTUP_WARMUP={warmup:<6} start to on_ready {imports * 1000:7.0f} ms   "
+              f"first command {first * 1000:6.0f} ms   (median of {runs})")
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    roots = [("this tree", ROOT)]
+    if len(sys.argv) > 2:
+        roots.insert(0, ("other checkout", os.path.abspath(sys.argv[2])))
+    for label, root in roots:
+        report(label, root, runs)
+
+    rows, totals, project, total = import_profile(ROOT)
+    print(f"\nImport profile of this tree's bot.py: {total / 1000:.0f} ms of imports")
+    print("  " + ", ".join(f"{group} {us / 1000:.0f} ms" for group, us in totals.items())
+          + f", project modules (self time) {project / 1000:.0f} ms")
+    print(f"  {'cumulative ms':>13}{'self ms':>9}  module")
+    for cumulative, own, name in rows:
+        print(f"  {cumulative / 1000:>13.1f}{own / 1000:>9.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
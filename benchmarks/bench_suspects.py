@@ -0,0 +1,73 @@
+"""Cost of one suspect-set update, and a check that Mr. X is always inside the set, over random games."""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import live_map
+from suspects import SuspectTracker
+
+GAMES = 300
+DETECTIVES = 4
+
+
+def random_move(graph, location, blocked=()):
+    options = [(dest, mode) for dest, modes in graph.edges(location) for mode in modes if dest not in blocked]
+    return random.choice(options) if options else (None, None)
+
+
+def play(graph, tracker, timings):
+    nodes = list(graph.nodes)
+    mr_x, *detectives = random.sample(nodes, DETECTIVES + 1)
+    tracker.start(detectives)
+    sizes = []
+    for round_number in range(1, 25):
+        dest, mode = random_move(graph, mr_x, detectives)
+        if dest is None:
+            break
+        mr_x = dest
+        ticket = "black" if random.random() < 0.1 else mode
+        start = time.perf_counter()
+        if round_number in live_map.REVEAL_ROUNDS:
+            tracker.reveal(mr_x)
+        else:
+            tracker.mr_x_moved(ticket, detectives)
+        timings.append(time.perf_counter() - start)
+        assert mr_x in tracker, (round_number, mr_x)
+        for i, location in enumerate(detectives):
+            dest, _ = random_move(graph, location, detectives)
+            if dest is None:
+                continue
+            if dest == mr_x:
+                return sizes
+            detectives[i] = dest
+            start = time.perf_counter()
+            tracker.detectives_at([dest])
+            timings.append(time.perf_counter() - start)
+            assert mr_x in tracker
+        sizes.append(len(tracker))
+    return sizes
+
+
+def main():
+    random.seed(7)
+    graph = live_map.GRAPH
+    tracker = SuspectTracker(graph)
+    graph.expand(graph.all_mask())  # build the lookup tables outside the timings
+    timings, sizes = [], []
+    for _ in range(GAMES):
+        sizes += play(graph, tracker, timings)
+    timings.sort()
+    print(f"{len(timings)} updates: median {timings[len(timings) // 2] * 1e6:.1f} us, "
+          f"p99 {timings[int(len(timings) * 0.99)] * 1e6:.1f} us")
+    print(f"average suspect set {sum(sizes) / len(sizes):.1f} nodes over {len(sizes)} rounds")
+
+    start = time.perf_counter()
+    heat = tracker.heat()
+    print(f"heat() over {len(heat)} nodes: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
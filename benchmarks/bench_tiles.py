@@ -0,0 +1,52 @@
+"""Startup time, memory and render cost of the zoom tile cache in each mode."""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import live_map
+from map_tiles import ZoomTileCache
+
+ROLES = {1: {"role": "Mr. X", "location": 45}, 2: {"role": "Detective", "location": 13}}
+
+
+def make_cache(mode, cache_dir=None):
+    size = round(live_map.ZOOM_VIEWPORT * live_map.ZOOM_SCALE)
+    return ZoomTileCache(live_map.ASSET_CACHE, live_map.get_viewport, tuple(live_map.get_all_nodes()),
+                         (size, size), [live_map.MAP_IMAGE_PATH, live_map.NODES_PATH], mode=mode, cache_dir=cache_dir)
+
+
+def draw_all(cache):
+    """Draw one zoomed turn map per node and return ms/render (no PNG encode)."""
+    live_map.TILE_CACHE = cache
+    nodes = live_map.get_all_nodes()
+    start = time.perf_counter()
+    for node in nodes:
+        ROLES[2]["location"] = node
+        live_map.render_viewport(live_map.get_visible_tokens(ROLES, 3, 2, 1), node)
+    return (time.perf_counter() - start) / len(nodes) * 1000
+
+
+def report(label, startup, cache):
+    first = draw_all(cache)
+    again = draw_all(cache)
+    print(f"{label:<22} startup {startup * 1000:8.1f} ms  memory {cache.memory_usage() / 2**20:6.1f} MiB  "
+          f"first pass {first:5.2f} ms/render  second pass {again:5.2f} ms/render")
+
+
+def main():
+    live_map.ASSET_CACHE.get_base_map()
+    report("off", 0.0, make_cache("off"))
+    report("lazy", 0.0, make_cache("lazy"))
+    eager = make_cache("eager")
+    report("eager, built", eager.warm(), eager)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        make_cache("eager", cache_dir).warm()
+        from_disk = make_cache("eager", cache_dir)
+        report("eager, from disk", from_disk.warm(), from_disk)
+
+
+if __name__ == "__main__":
+    main()
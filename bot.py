@@ -4,8 +4,20 @@ from discord import app_commands, Interaction
 from discord.ui import Button, View
 import os
 from dotenv import load_dotenv
+from sessions import SessionRegistry, SessionLimitReached
+from game_store import GameStore, apply_move
+from history import Seated, Moved
+from logs import LogConfig, get_logger
+from startup import Startup
 from game import GameState
-import io
+from render_pool import MapRenderPool
+from render_cache import RenderCache
+from map_layers import RendererRegistry
+from outbox import Outbox, SendLimiter
+import live_map
+import reachability
+from mr_x_ai import MrXAgent, AI_MR_X_ID
+from detective_ai import DetectiveAgent, AI_DETECTIVE_IDS, is_ai_detective, detective_name
 import random
 
 # Load environment variables
@@ -13,6 +25,12 @@ load_dotenv()
 TOKEN = os.getenv('DISCORD_TOKEN')
 GUILD_ID = discord.Object(id=int(os.getenv('GUILD_ID')))
 
+# Logging levels, sampling and output come from LOG_* variables
+log_config = LogConfig.from_env().install()
+log = get_logger("bot")
+# Times the start; STARTUP_WARMUP decides whether map assets are built after on_ready or on first use
+startup = Startup.from_env()
+
 # Set up bot
 intents = discord.Intents.default()
 intents.message_content = True
@@ -20,11 +38,97 @@ intents.reactions = True
 intents.members = True
 
 client = commands.Bot(command_prefix="/", intents=intents)
-game_state = GameState()
+# Games survive restarts: moves are logged and snapshotted to SQLite off the event loop
+game_store = GameStore.from_env()
+render_pool = MapRenderPool.from_env()
+map_cache = RenderCache.from_env()
+map_renderers = RendererRegistry.from_env()
+
+def drop_game_maps(game_key):
+    """Drop a game's cached map images and layered canvas (on reset, eviction and parking)."""
+    map_cache.evict_game(game_key)
+    map_renderers.drop(game_key)
+
+sessions = SessionRegistry.from_env(store=game_store, on_evict=drop_game_maps)
+# Paces each channel's messages under Discord's per-channel rate limit
+send_limiter = SendLimiter.from_env()
+# Searches the bot's Mr. X moves in a worker pool with a per-move time budget
+mr_x_agent = MrXAgent.from_env()
+# Plans the bot detectives' moves jointly; a short budget, they move several times a round
+detective_agent = DetectiveAgent.from_env(default_budget_ms=200)
+
+def reset_game(session):
+    """Reset a game, drop its cached map images and delete it from the store."""
+    game_state = session.state
+    drop_game_maps(session.key)
+    if game_state.history:
+        session.finished = game_state.history
+    game_state.reset()
+    session.forget()
+
+async def play_ai_turns(session, channel, outbox=None):
+    """Play the bot's turns until a human is up. Call with the session lock held.
+
+    The moves are announced together in one message once the bot is done,
+    or queued on outbox for the caller to flush. Returns False if the game ended.
+    """
+    if outbox is None:
+        outbox = Outbox(send_limiter)
+        try:
+            return await play_ai_turns(session, channel, outbox)
+        finally:
+            await outbox.flush()
+    game_state = session.state
+    while game_state.turn_order:
+        player_id = game_state.get_current_player()
+        if player_id == AI_MR_X_ID:
+            name = "Mr. X"
+            move = await mr_x_agent.choose(game_state)
+        elif is_ai_detective(player_id):
+            name = detective_name(player_id)
+            move = await detective_agent.choose(game_state, player_id)
+        else:
+            break
+        if move is None:
+            if player_id == AI_MR_X_ID:
+                outbox.send(channel, "Mr. X is surrounded with no moves left. Detectives win!")
+            else:
+                outbox.send(channel, f"{name} is trapped with no valid moves. Mr. X wins!")
+            reset_game(session)
+            return False
+        dest, ticket = move
+        is_valid, error_message = game_state.validate_move(player_id, dest, ticket)
+        if not is_valid:
+            log.warning("AI chose an invalid move %s for %s: %s", move, name, error_message)
+            outbox.send(channel, f"{name} could not move. Use `/endgame` to reset.")
+            return False
+        end_message = game_state.apply(Moved(player_id, dest, ticket))
+        session.touch()
+        if end_message:
+            outbox.send(channel, end_message)
+            reset_game(session)
+            return False
+        session.record_move(player_id, dest, ticket)
+        if player_id == AI_MR_X_ID:
+            outbox.send(channel, f"Mr. X moved using a {ticket} ticket.")
+        else:
+            outbox.send(channel, f"{name} moved to {dest} using {ticket}")
+    return True
+
+async def resume_ai_turns():
+    """Games recovered from the store may be waiting on one of the bot's own moves."""
+    for session in sessions.sessions():
+        channel = client.get_channel(session.key[1])
+        if channel is None or not session.state.turn_order:
+            continue
+        async with session.lock:
+            await play_ai_turns(session, channel)
 
 class TransportSelectView(View):
-    def __init__(self, user: discord.User, dest: int, interaction: Interaction):
+    def __init__(self, session, user: discord.User, dest: int, interaction: Interaction):
         super().__init__(timeout=60)
+        self.session = session
+        game_state = session.state
         self.user = user
         self.dest = dest
         self.interaction = interaction
@@ -51,30 +155,45 @@ class TransportSelectView(View):
                 await interaction.response.send_message("This is not your move!", ephemeral=True)
                 return
 
+            async with self.parent.session.lock:
+                await self.play_turn(interaction)
+
+        async def play_turn(self, interaction: discord.Interaction):
+            game_state = self.parent.session.state
+            if game_state.get_current_player() != self.user.id:
+                await interaction.response.send_message("It's not your turn!", ephemeral=True)
+                return
+
             is_valid, error_message = game_state.validate_move(self.user.id, self.dest, self.transport)
             if not is_valid:
                 await interaction.response.send_message(error_message, ephemeral=True)
                 return
 
-            game_state.execute_move(self.user.id, self.dest, self.transport)
-            
-            # Check for game end
-            end_message = game_state.check_end_conditions()
+            # Move, check for game end and advance the turn
+            end_message = game_state.apply(Moved(self.user.id, self.dest, self.transport))
             if end_message:
                 await interaction.response.send_message(end_message)
-                game_state.reset()
+                reset_game(self.parent.session)
                 return
-
-            # Advance turn
-            game_state.advance_turn()
+            self.parent.session.record_move(self.user.id, self.dest, self.transport)
             
-            # Update map
-            await self.parent.interaction.followup.send(f"{self.user.mention} moved to {self.dest} using {self.transport}")
-            await send_map(interaction.channel, interaction, zoom_player=self.user.id)
+            # The move, any warning and the map go out as one followup message
+            outbox = Outbox(send_limiter)
+            followup, lane = self.parent.interaction.followup, interaction.channel.id
+            outbox.send(followup, f"{self.user.mention} moved to {self.dest} using {self.transport}", lane=lane)
+            if self.user.id in game_state.trap_warnings:
+                outbox.send(followup,
+                    f"Warning: {self.user.mention} can make at most {game_state.trap_warnings[self.user.id]} more move(s) with their tickets!",
+                    lane=lane)
+            await send_map(game_state, self.parent.session.key, interaction.channel, self.parent.interaction, zoom_player=self.user.id, outbox=outbox)
+            await outbox.flush()
+            await play_ai_turns(self.parent.session, interaction.channel)
 
 class RoleSelectView(View):
-    def __init__(self, user):
+    def __init__(self, session, user):
         super().__init__(timeout=60)
+        self.session = session
+        self.game_state = session.state
         self.user = user
 
     async def on_timeout(self):
@@ -82,6 +201,7 @@ class RoleSelectView(View):
 
     @discord.ui.button(label="🕵 Detective", style=discord.ButtonStyle.primary)
     async def detect(self, interaction: Interaction, button: Button):
+        game_state = self.game_state
         if interaction.user != self.user:
             await interaction.response.send_message("This selection is not for you!", ephemeral=True)
             return
@@ -92,11 +212,13 @@ class RoleSelectView(View):
 
         game_state.roles[interaction.user.id] = "Detective"
         game_state.joined_players.append(interaction.user.id)
+        self.session.save()
         await interaction.response.send_message("You have chosen to be a Detective!", ephemeral=True)
         self.stop()
 
     @discord.ui.button(label="🕶 Mr. X", style=discord.ButtonStyle.danger)
     async def mr_x(self, interaction: Interaction, button: Button):
+        game_state = self.game_state
         if interaction.user != self.user:
             await interaction.response.send_message("This selection is not for you!", ephemeral=True)
             return
@@ -108,40 +230,63 @@ class RoleSelectView(View):
         game_state.roles[interaction.user.id] = "Mr. X"
         game_state.joined_players.append(interaction.user.id)
         game_state.mr_x_id = interaction.user.id
+        self.session.save()
         await interaction.response.send_message("You have chosen to be Mr. X!", ephemeral=True)
         self.stop()
 
-async def send_map(channel, interaction=None, zoom_player=None, is_turn=False):
-    map_image = live_map.generate_map(
-        game_state.player_locations,
-        game_state.round_counter,
-        zoom_player,
-        game_state.mr_x_id
+async def send_map(game_state, game_key, channel, interaction=None, zoom_player=None, is_turn=False, heat=None,
+                   reveal=False, outbox=None):
+    # Render on the worker pool (or reuse an identical earlier render);
+    # generate_map already returns encoded PNG bytes. game_key is the session key
+    # the images and canvas are cached under, also for a past state from /replay;
+    # reveal shows Mr. X.
+    # With an outbox the map is queued there, to go out with the turn's other messages.
+    if outbox is None:
+        outbox = Outbox(send_limiter)
+        await send_map(game_state, game_key, channel, interaction, zoom_player, is_turn, heat, reveal, outbox)
+        await outbox.flush()
+        return
+    map_roles = game_state.get_map_roles()
+    mr_x_id = None if reveal else game_state.mr_x_id
+    key = live_map.render_key(map_roles, game_state.round_counter, zoom_player, mr_x_id, heat=heat)
+    img_byte_arr = await map_cache.get_or_render(
+        game_key, key,
+        lambda: render_pool.render(map_roles, game_state.round_counter, zoom_player, mr_x_id, heat=heat,
+                                   renderer=map_renderers.get(game_key))
     )
-    
-    # Convert PIL Image to bytes
-    img_byte_arr = io.BytesIO()
-    map_image.save(img_byte_arr, format='PNG')
-    img_byte_arr.seek(0)
-    
+    if img_byte_arr is None:
+        outbox.send(channel, "Error generating map.")
+        return
+
     # Send the image
-    file = discord.File(img_byte_arr, filename='map.png')
+    file = discord.File(img_byte_arr, filename=live_map.map_filename('map'))
     if interaction:
-        await interaction.followup.send(file=file)
+        outbox.send(interaction.followup, file=file, lane=channel.id)
     else:
-        await channel.send(file=file)
+        outbox.send(channel, file=file)
 
 @client.tree.command(name="startgame", description="Start a new game", guild=GUILD_ID)
 async def startgame(interaction: discord.Interaction):
-    if game_state.joined_players:
+    try:
+        session = sessions.for_interaction(interaction)
+    except SessionLimitReached:
+        await interaction.response.send_message("Too many games are running right now!", ephemeral=True)
+        return
+    if session.state.joined_players:
         await interaction.response.send_message("A game is already in progress!", ephemeral=True)
         return
 
-    game_state.reset()
+    reset_game(session)
     await interaction.response.send_message("A new game has started! Use /join to participate.")
 
 @client.tree.command(name="join", description="Join the game", guild=GUILD_ID)
 async def join(interaction: discord.Interaction):
+    try:
+        session = sessions.for_interaction(interaction)
+    except SessionLimitReached:
+        await interaction.response.send_message("Too many games are running right now!", ephemeral=True)
+        return
+    game_state = session.state
     if interaction.user.id in game_state.joined_players:
         await interaction.response.send_message("You have already joined the game!", ephemeral=True)
         return
@@ -150,16 +295,70 @@ async def join(interaction: discord.Interaction):
         await interaction.response.send_message("The game is full!", ephemeral=True)
         return
 
-    view = RoleSelectView(interaction.user)
+    view = RoleSelectView(session, interaction.user)
     await interaction.response.send_message("Choose your role:", view=view, ephemeral=True)
 
+@client.tree.command(name="aimrx", description="Let the bot play Mr. X", guild=GUILD_ID)
+async def aimrx(interaction: discord.Interaction):
+    session = sessions.for_interaction(interaction, create=False)
+    if not session:
+        await interaction.response.send_message("No game is in progress!", ephemeral=True)
+        return
+    game_state = session.state
+    if game_state.turn_order:
+        await interaction.response.send_message("The game has already begun!", ephemeral=True)
+        return
+    if game_state.mr_x_id is not None:
+        await interaction.response.send_message("Mr. X has already been chosen!", ephemeral=True)
+        return
+
+    game_state.roles[AI_MR_X_ID] = "Mr. X"
+    game_state.joined_players.append(AI_MR_X_ID)
+    game_state.mr_x_id = AI_MR_X_ID
+    session.save()
+    await interaction.response.send_message("The bot will play Mr. X. Detectives, join and `/begin` when ready!")
+
+@client.tree.command(name="aidetectives", description="Fill the empty seats with bot detectives", guild=GUILD_ID)
+async def aidetectives(interaction: discord.Interaction):
+    session = sessions.for_interaction(interaction, create=False)
+    if not session:
+        await interaction.response.send_message("No game is in progress!", ephemeral=True)
+        return
+    game_state = session.state
+    if game_state.turn_order:
+        await interaction.response.send_message("The game has already begun!", ephemeral=True)
+        return
+    seats = [player_id for player_id in AI_DETECTIVE_IDS if player_id not in game_state.joined_players]
+    # Keep a seat for Mr. X if nobody has taken the role yet
+    free = game_state.MAX_PLAYERS - len(game_state.joined_players) - (game_state.mr_x_id is None)
+    seats = seats[:max(free, 0)]
+    if not seats:
+        await interaction.response.send_message("There are no empty seats to fill!", ephemeral=True)
+        return
+
+    for player_id in seats:
+        game_state.roles[player_id] = "Detective"
+        game_state.joined_players.append(player_id)
+    session.save()
+    await interaction.response.send_message(
+        f"{len(seats)} bot detective(s) joined: {', '.join(detective_name(player_id) for player_id in seats)}")
+
 @client.tree.command(name="map", description="Display the current game map", guild=GUILD_ID)
 async def map(interaction: discord.Interaction):
+    session = sessions.for_interaction(interaction, create=False)
+    if not session:
+        await interaction.response.send_message("No game is in progress!", ephemeral=True)
+        return
     await interaction.response.defer()
-    await send_map(interaction.channel, interaction)
+    await send_map(session.state, session.key, interaction.channel, interaction)
 
 @client.tree.command(name="begin", description="Begin the game", guild=GUILD_ID)
 async def begin(interaction: discord.Interaction):
+    session = sessions.for_interaction(interaction, create=False)
+    if not session:
+        await interaction.response.send_message("No game is in progress!", ephemeral=True)
+        return
+    game_state = session.state
     if not game_state.joined_players:
         await interaction.response.send_message("No players have joined yet!", ephemeral=True)
         return
@@ -172,19 +371,30 @@ async def begin(interaction: discord.Interaction):
         await interaction.response.send_message("Need at least 2 players to start!", ephemeral=True)
         return
 
-    # Initialize player locations
-    for player_id in game_state.joined_players:
-        game_state.player_locations[player_id] = random.choice(live_map.get_all_nodes())
-
-    game_state.turn_order = game_state.joined_players.copy()
-    random.shuffle(game_state.turn_order)
+    # Initialize player locations and the turn order
+    locations = tuple((player_id, random.choice(live_map.get_all_nodes())) for player_id in game_state.joined_players)
+    turn_order = game_state.joined_players.copy()
+    random.shuffle(turn_order)
+    game_state.apply(Seated(tuple(game_state.roles.items()), game_state.mr_x_id, locations, tuple(turn_order)))
+    session.save()
 
     await interaction.response.send_message("The game has begun! Mr. X, make your first move.")
-    await send_map(interaction.channel, interaction, zoom_player=game_state.mr_x_id)
+    if game_state.mr_x_id == AI_MR_X_ID:
+        await send_map(game_state, session.key, interaction.channel, interaction)
+    else:
+        await send_map(game_state, session.key, interaction.channel, interaction, zoom_player=game_state.mr_x_id)
+    # The bot may be first in the turn order
+    async with session.lock:
+        await play_ai_turns(session, interaction.channel)
 
 @client.tree.command(name="move", description="Make a move to a new location", guild=GUILD_ID)
 @app_commands.describe(destination="Where do you want to move?")
 async def move(interaction: discord.Interaction, destination: int):
+    session = sessions.for_interaction(interaction, create=False)
+    if not session:
+        await interaction.response.send_message("No game is in progress!", ephemeral=True)
+        return
+    game_state = session.state
     if interaction.user.id not in game_state.joined_players:
         await interaction.response.send_message("You haven't joined the game yet!", ephemeral=True)
         return
@@ -198,25 +408,41 @@ async def move(interaction: discord.Interaction, destination: int):
         await interaction.response.send_message("The game hasn't started yet!", ephemeral=True)
         return
 
-    view = TransportSelectView(interaction.user, destination, interaction)
+    view = TransportSelectView(session, interaction.user, destination, interaction)
     await interaction.response.send_message("Choose your transport:", view=view, ephemeral=True)
 
 @client.tree.command(name="status", description="Check your current status in the game", guild=GUILD_ID)
 async def status(interaction: Interaction):
+    session = sessions.for_interaction(interaction, create=False)
+    if not session:
+        await interaction.response.send_message("No game is in progress!", ephemeral=True)
+        return
+    game_state = session.state
     status_message = game_state.get_player_status(interaction.user.id)
     await interaction.response.send_message(status_message, ephemeral=True)
 
 @client.tree.command(name="endgame", description="End the current game and reset", guild=GUILD_ID)
 async def endgame(interaction: discord.Interaction):
+    session = sessions.for_interaction(interaction, create=False)
+    if not session:
+        await interaction.response.send_message("No game is in progress!", ephemeral=True)
+        return
+    game_state = session.state
     if not game_state.joined_players:
         await interaction.response.send_message("No game is in progress!", ephemeral=True)
         return
 
-    game_state.reset()
+    reset_game(session)
+    sessions.remove(interaction.guild_id, interaction.channel_id)
     await interaction.response.send_message("The game has been ended and reset.")
 
 @client.tree.command(name="moves", description="Show possible moves and tickets from your current location", guild=GUILD_ID)
 async def moves(interaction: discord.Interaction):
+    session = sessions.for_interaction(interaction, create=False)
+    if not session:
+        await interaction.response.send_message("No game is in progress!", ephemeral=True)
+        return
+    game_state = session.state
     if interaction.user.id not in game_state.joined_players:
         await interaction.response.send_message("You haven't joined the game yet!", ephemeral=True)
         return
@@ -239,8 +465,94 @@ async def moves(interaction: discord.Interaction):
         return
 
     message = "Available moves:\n" + "\n".join(available_moves)
+
+    if interaction.user.id != game_state.mr_x_id:
+        # Multi-step view that only follows routes this detective's tickets can pay for
+        depth = reachability.PLAN_DEPTH
+        tickets = game_state.player_tickets[interaction.user.id]
+        reach = live_map.REACHABILITY.reachable(current_location, tickets, depth)
+        counts = [sum(1 for moves in reach.values() if moves == step) for step in range(1, depth + 1)]
+        message += f"\n\nReachable within {depth} moves: " + ", ".join(
+            f"{count} in {step}" for step, count in enumerate(counts, 1))
+        if game_state.suspects.origin is not None:
+            route = live_map.REACHABILITY.plan(current_location, tickets, game_state.suspects.candidates(), depth)
+            if route:
+                message += "\nPlan to the nearest Mr. X suspect: " + " -> ".join(
+                    f"{mode} to {dest}" for mode, dest in route)
+            else:
+                message += f"\nNo Mr. X suspect within {depth} moves with your tickets."
     await interaction.response.send_message(message, ephemeral=True)
 
+@client.tree.command(name="suspects", description="Show where Mr. X could be hiding", guild=GUILD_ID)
+async def suspects(interaction: discord.Interaction):
+    session = sessions.for_interaction(interaction, create=False)
+    if not session or not session.state.turn_order:
+        await interaction.response.send_message("No game is in progress!", ephemeral=True)
+        return
+    game_state = session.state
+    candidates = game_state.suspects.candidates()
+    if len(candidates) <= 60:
+        message = f"Mr. X could be at: {', '.join(str(node) for node in candidates)}"
+    else:
+        message = f"Mr. X could be at any of {len(candidates)} locations"
+    await interaction.response.send_message(message)
+    await send_map(game_state, session.key, interaction.channel, interaction, heat=game_state.suspects.heat())
+
+def player_name(game_state, player_id):
+    if player_id == game_state.mr_x_id:
+        return "Mr. X"
+    if is_ai_detective(player_id):
+        return detective_name(player_id)
+    return f"<@{player_id}>"
+
+@client.tree.command(name="undo", description="Take back your last move", guild=GUILD_ID)
+async def undo(interaction: discord.Interaction):
+    session = sessions.for_interaction(interaction, create=False)
+    if not session or not session.state.turn_order:
+        await interaction.response.send_message("No game is in progress!", ephemeral=True)
+        return
+    async with session.lock:
+        game_state = session.state
+        events = game_state.history.events
+        if not events or not isinstance(events[-1], Moved) or events[-1].player != interaction.user.id:
+            await interaction.response.send_message("You can only take back the last move, and only your own!",
+                                                    ephemeral=True)
+            return
+        event = game_state.undo()
+        session.save()
+    if event.player == game_state.mr_x_id:
+        await interaction.response.send_message("Mr. X took back their last move.")
+    else:
+        await interaction.response.send_message(f"{interaction.user.mention} took back their move to {event.dest}.")
+
+@client.tree.command(name="replay", description="Show the moves and map of a past round", guild=GUILD_ID)
+@app_commands.describe(round="Which round to replay")
+async def replay(interaction: discord.Interaction, round: int):
+    session = sessions.for_interaction(interaction, create=False)
+    game_state = session.state if session else None
+    if game_state and game_state.history:
+        history, finished = game_state.history, False
+    elif session and session.finished:
+        # After the game everything can be shown, including Mr. X's moves
+        history, finished = session.finished, True
+    else:
+        await interaction.response.send_message("There is no game to replay!", ephemeral=True)
+        return
+    start = history.round_start(round)
+    if start is None:
+        await interaction.response.send_message(f"Round {round} has not been played yet!", ephemeral=True)
+        return
+
+    past = history.state_at(start, GameState)
+    lines = []
+    for event in history.moves_in_round(round):
+        if event.player == past.mr_x_id and not finished:
+            lines.append(f"Mr. X used a {event.ticket} ticket")
+        else:
+            lines.append(f"{player_name(past, event.player)} moved to {event.dest} using {event.ticket}")
+    await interaction.response.send_message(f"**Round {round}**\n" + ("\n".join(lines) or "No moves yet."))
+    await send_map(past, session.key, interaction.channel, interaction, reveal=finished)
+
 @client.tree.command(name="help", description="Show all commands and game rules", guild=GUILD_ID)
 async def help(interaction: discord.Interaction):
     help_message = """
@@ -252,6 +564,11 @@ async def help(interaction: discord.Interaction):
 - `/map` - Display the current game map
 - `/status` - Check your current status
 - `/moves` - Show possible moves from your location
+- `/suspects` - Show where Mr. X could be, with a heatmap
+- `/aimrx` - Let the bot play Mr. X
+- `/aidetectives` - Fill the empty seats with bot detectives
+- `/undo` - Take back your last move
+- `/replay <round>` - Show the moves and map of a past round
 - `/endgame` - End the current game
 
 **Game Rules:**
@@ -274,11 +591,27 @@ async def sync(ctx):
 
 @client.event
 async def on_ready():
-    print(f'Logged in as {client.user}')
+    log.info("Logged in as %s", client.user)
+    startup.ready()
+    if not sessions.evictor_running:
+        client.loop.create_task(sessions.run_evictor())
+    client.loop.create_task(mr_x_agent.warm_up())
+    client.loop.create_task(detective_agent.warm_up())
+    client.loop.create_task(resume_ai_turns())
     try:
         synced = await client.tree.sync(guild=GUILD_ID)
-        print(f"Synced {len(synced)} command(s)")
-    except Exception as e:
-        print(e)
-
-client.run(TOKEN) 
\ No newline at end of file
+        log.info("Synced %s command(s)", len(synced))
+    except Exception:
+        log.exception("Failed to sync commands")
+
+# Process pool workers may import this module as __mp_main__; only the real entry point runs the bot
+if __name__ == "__main__":
+    sessions.recover(apply_move)
+    startup.mark("imports")
+    client.run(TOKEN)
+    # Both AI players may hold a process pool; stop their workers before the store closes
+    mr_x_agent.shutdown()
+    detective_agent.shutdown()
+    if game_store:
+        game_store.close()
+    log_config.uninstall()
\ No newline at end of file
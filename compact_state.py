@@ -0,0 +1,223 @@
+import struct
+from array import array
+from operator import itemgetter
+from game import GameState
+from history import EventLog, Seated, Moved
+
+VERSION = 1
+ROLES = ("Mr. X", "Detective")
+TICKETS = ("taxi", "bus", "metro", "black")
+STEP_MODES = ("taxi", "bus", "metro", None)  # suspect steps; None is a black ticket (any edge)
+# One row of the player table: role, location (0 = none), the four ticket counts, trap warning
+PLAYER_FIELDS = 7
+NONE = 255          # "no value" in single-byte fields (Mr. X index, role, trap warning)
+MASK_BYTES = 26     # node bitmasks: nodes 1-200 fit in 201 bits
+
+_ROLE_CODES = {role: code for code, role in enumerate(ROLES)}
+_TICKET_CODES = {ticket: code for code, ticket in enumerate(TICKETS)}
+_TICKET_COUNTS = itemgetter(*TICKETS)
+_NO_TICKETS = dict.fromkeys(TICKETS, 0)
+
+_HEADER = struct.Struct("<6B")  # version, players, Mr. X index, round, turn index, flags
+_MOVES = struct.Struct("<H")
+_TURN_ORDER = 1                 # flag: turn_order is set (the game has begun)
+_SEATED = 2                     # flag: the history starts with a Seated event
+
+
+def _nodes(mask):
+    """Return the nodes set in a bitmask as bytes."""
+    nodes = bytearray()
+    while mask:
+        low = mask & -mask
+        nodes.append(low.bit_length() - 1)
+        mask ^= low
+    return bytes(nodes)
+
+
+def _mask(nodes):
+    mask = 0
+    for node in nodes:
+        mask |= 1 << node
+    return mask
+
+
+class CompactGameState:
+    """A GameState packed into fixed-width arrays, for games that are stored or parked rather than played.
+
+    Players are indexed in join order. Everything per player is one
+    PLAYER_FIELDS-byte row of a table, Mr. X's moves are (ticket code, node)
+    byte pairs and each history move is two bytes (player index and ticket
+    code, node). to_bytes() is about 100 bytes of state plus two bytes per
+    move, against several kilobytes of objects for a live GameState.
+    from_game raises ValueError for a game it cannot represent exactly
+    (players that never joined, unknown roles or tickets), so callers can
+    fall back to GameState.to_dict.
+    """
+
+    __slots__ = ("players", "table", "issued", "mr_x", "turn_order", "current_turn_index", "round_counter",
+                 "mr_x_moves", "ticket_log", "suspects", "seated", "moves")
+
+    # ---------- GameState conversion ----------
+    @classmethod
+    def from_game(cls, game, history=True):
+        """Pack a game; with history=False the event log is left out, like GameState.to_dict(history=False)."""
+        players = list(game.joined_players)
+        index = {player_id: i for i, player_id in enumerate(players)}
+        if (len(index) != len(players) or len(players) >= NONE
+                or not index.keys() >= game.roles.keys() | game.player_locations.keys()):
+            raise ValueError("Game cannot be packed: players must be unique and have joined")
+        roles, locations, tickets, traps = game.roles, game.player_locations, game.player_tickets, game.trap_warnings
+        # Each Mr. X history entry reads "Used <ticket> to <node>"
+        words = " ".join(game.mr_x_move_history).split()
+        try:
+            if words[::4] != ["Used"] * len(game.mr_x_move_history):
+                raise KeyError("Mr. X move history entry")
+            compact = cls()
+            compact.players = array("q", players)
+            compact.table = array("B", [value for p in players for value in (
+                _ROLE_CODES[roles[p]] if p in roles else NONE,
+                locations.get(p, 0),
+                *_TICKET_COUNTS(tickets[p] if p in tickets else _NO_TICKETS),
+                traps.get(p, NONE),
+            )])
+            compact.issued = array("B", [index[p] for p in tickets])
+            compact.mr_x = NONE if game.mr_x_id is None else index[game.mr_x_id]
+            compact.turn_order = array("B", [index[p] for p in game.turn_order])
+            compact.current_turn_index = game.current_turn_index
+            compact.round_counter = game.round_counter
+            compact.mr_x_moves = array("B", [value for move in zip(map(_TICKET_CODES.__getitem__, words[1::4]),
+                                                                   map(int, words[3::4]))
+                                             for value in move])
+            compact.ticket_log = array("B", [_TICKET_CODES[ticket] for ticket in game.mr_x_ticket_log])
+            suspects = game.suspects.to_dict()
+            compact.suspects = (suspects["mask"], suspects["origin"] or 0, suspects["blocked"],
+                                tuple((STEP_MODES.index(mode), blocked) for mode, blocked in suspects["steps"]))
+            compact.seated, compact.moves = cls._pack_history(game, index) if history else (None, array("B"))
+        except (KeyError, ValueError, TypeError, OverflowError) as e:
+            raise ValueError(f"Game cannot be packed: {e!r}") from e
+        return compact
+
+    @staticmethod
+    def _pack_history(game, index):
+        events = game.history.events
+        seated = None
+        if events and isinstance(events[0], Seated):
+            first = events[0]
+            if (list(first.roles) != list(game.roles.items()) or first.mr_x_id != game.mr_x_id
+                    or [p for p, _ in first.locations] != list(game.joined_players)):
+                raise KeyError("Seated event does not match the players")
+            seated = array("B", [location for _, location in first.locations])
+            seated.extend([index[p] for p in first.turn_order])
+            events = events[1:]
+        if not all(type(event) is Moved for event in events):
+            raise KeyError("Seated event after the first")
+        moves = []
+        for player, dest, ticket in events:
+            moves += (index[player] << 2 | _TICKET_CODES[ticket], dest)
+        return seated, array("B", moves)
+
+    def to_game(self, factory=GameState):
+        """Return a new factory() game equal to the one packed."""
+        game = factory()
+        players = self.players.tolist()
+        table = self.table.tobytes()
+        rows = [table[i:i + PLAYER_FIELDS] for i in range(0, len(table), PLAYER_FIELDS)]
+        game.joined_players = players.copy()
+        game.roles = {p: ROLES[row[0]] for p, row in zip(players, rows) if row[0] != NONE}
+        game.player_locations = {p: row[1] for p, row in zip(players, rows) if row[1]}
+        for i in self.issued:
+            game.player_tickets[players[i]] = dict(zip(TICKETS, rows[i][2:6]))
+        game.trap_warnings = {p: row[6] for p, row in zip(players, rows) if row[6] != NONE}
+        game.mr_x_id = None if self.mr_x == NONE else players[self.mr_x]
+        game.turn_order = [players[i] for i in self.turn_order]
+        game.current_turn_index = self.current_turn_index
+        game.round_counter = self.round_counter
+        moves = self.mr_x_moves.tobytes()
+        game.mr_x_move_history = [f"Used {TICKETS[code]} to {dest}" for code, dest in zip(moves[::2], moves[1::2])]
+        game.mr_x_ticket_log.extend([TICKETS[code] for code in self.ticket_log])
+        mask, origin, blocked, steps = self.suspects
+        game.suspects.restore({"mask": mask, "origin": origin or None, "blocked": blocked,
+                               "steps": [(STEP_MODES[mode], step_blocked) for mode, step_blocked in steps]})
+        events = []
+        if self.seated is not None:
+            n = len(players)
+            events.append(Seated(tuple(game.roles.items()), game.mr_x_id,
+                                 tuple(zip(players, self.seated[:n])),
+                                 tuple(players[i] for i in self.seated[n:])))
+        moves = self.moves.tobytes()
+        events += [Moved(players[code >> 2], dest, TICKETS[code & 3]) for code, dest in zip(moves[::2], moves[1::2])]
+        game.history = EventLog(events)
+        return game
+
+    # ---------- Bytes ----------
+    def to_bytes(self):
+        flags = (_TURN_ORDER if self.turn_order else 0) | (_SEATED if self.seated is not None else 0)
+        mask, origin, blocked, steps = self.suspects
+        blocked = _nodes(blocked)
+        parts = [
+            _HEADER.pack(VERSION, len(self.players), self.mr_x, self.round_counter, self.current_turn_index, flags),
+            self.players.tobytes(), self.table.tobytes(), self.turn_order.tobytes(),
+            bytes((len(self.issued),)), self.issued.tobytes(),
+            bytes((len(self.mr_x_moves) // 2,)), self.mr_x_moves.tobytes(),
+            bytes((len(self.ticket_log),)), self.ticket_log.tobytes(),
+            mask.to_bytes(MASK_BYTES, "little"), bytes((origin, len(blocked))), blocked, bytes((len(steps),)),
+        ]
+        for mode, step_blocked in steps:
+            nodes = _nodes(step_blocked)
+            parts += [bytes((mode, len(nodes))), nodes]
+        if self.seated is not None:
+            parts.append(self.seated.tobytes())
+        parts += [_MOVES.pack(len(self.moves) // 2), self.moves.tobytes()]
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = bytes(data)
+        version, n, mr_x, round_counter, turn_index, flags = _HEADER.unpack_from(data)
+        if version != VERSION:
+            raise ValueError(f"Unknown compact game version {version}")
+        position = _HEADER.size
+
+        def take(size, typecode="B"):
+            nonlocal position
+            values = array(typecode, data[position:position + size])
+            position += size
+            return values
+
+        def byte():
+            nonlocal position
+            position += 1
+            return data[position - 1]
+
+        compact = cls()
+        compact.mr_x, compact.round_counter, compact.current_turn_index = mr_x, round_counter, turn_index
+        compact.players = take(8 * n, "q")
+        compact.table = take(PLAYER_FIELDS * n)
+        compact.turn_order = take(n if flags & _TURN_ORDER else 0)
+        compact.issued = take(byte())
+        compact.mr_x_moves = take(2 * byte())
+        compact.ticket_log = take(byte())
+        mask = int.from_bytes(data[position:position + MASK_BYTES], "little")
+        position += MASK_BYTES
+        origin = byte()
+        blocked = _mask(take(byte()))
+        steps = []
+        for _ in range(byte()):
+            mode = byte()
+            steps.append((mode, _mask(take(byte()))))
+        compact.suspects = (mask, origin, blocked, tuple(steps))
+        compact.seated = take(2 * n) if flags & _SEATED else None
+        (moves,) = _MOVES.unpack_from(data, position)
+        position += _MOVES.size
+        compact.moves = take(2 * moves)
+        return compact
+
+
+def pack(game, history=True):
+    """Return a game as compact bytes; raises ValueError if it cannot be represented."""
+    return CompactGameState.from_game(game, history).to_bytes()
+
+
+def unpack(data, factory=GameState):
+    """Return a new game from pack() bytes."""
+    return CompactGameState.from_bytes(data).to_game(factory)
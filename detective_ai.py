@@ -0,0 +1,179 @@
+import itertools
+import random
+import time
+import live_map
+import reachability
+from mr_x_ai import PooledAgent
+
+# Player ids used for the bot's detectives (Mr. X is -1, Discord ids are positive)
+AI_DETECTIVE_IDS = (-2, -3, -4, -5)
+
+# Joint move scoring
+DISTANCE_CAP = 6        # suspects further than this from every detective count as this far
+TICKET_WEIGHT = 0.3     # cost of spending a ticket is TICKET_WEIGHT / tickets of that kind left
+TRAP_PENALTY = 100.0    # moving somewhere every route from which runs out of tickets
+JOINT_LIMIT = 20000     # most joint moves scored per turn; larger teams keep only their best options
+
+
+def is_ai_detective(player_id):
+    return player_id in AI_DETECTIVE_IDS
+
+
+def detective_name(player_id):
+    """Display name of a bot detective."""
+    return f"Bot Detective {AI_DETECTIVE_IDS.index(player_id) + 1}"
+
+
+def snapshot(game_state, player_id, budget_ms, seed=None):
+    """Return the picklable view of a GameState that choose_move needs, for player_id's turn."""
+    team = [player_id] + [other for other in game_state.turn_order
+                          if is_ai_detective(other) and other != player_id]
+    return {
+        "team": [(game_state.player_locations[member], dict(game_state.player_tickets[member])) for member in team],
+        "others": [location for other, location in game_state.player_locations.items()
+                   if other != game_state.mr_x_id and other not in team],
+        "suspects": game_state.suspects.heat(),
+        "rounds_left": game_state.MAX_ROUNDS - game_state.round_counter + 1,
+        "budget_ms": budget_ms,
+        "seed": seed,
+    }
+
+
+class _Planner:
+    """Scores joint moves of the bot's detectives against the suspect set.
+
+    Each detective's options are its affordable moves (one per destination,
+    with the cheapest ticket that does not strand it). A joint move is scored
+    as the expected distance from Mr. X, weighted by the suspect heatmap, to
+    the nearest detective (human detectives count where they stand), plus the
+    ticket costs. All joint moves are scored at once with NumPy: the team's
+    distance rows are combined into one (joint moves x suspects) matrix per
+    option of the detective whose turn it is, so that option loop is the only
+    Python loop and the deadline is checked between its steps.
+    """
+
+    def __init__(self, state, rng):
+        import numpy as np  # deferred so importing the bot does not load numpy
+        self.graph = live_map.GRAPH
+        self.tables = live_map.DISTANCES
+        self.state = state
+        self.rng = rng
+
+        heat = state["suspects"] or {node: 1.0 for node in self.graph.nodes}
+        columns = [self.tables.index[node] for node in heat]
+        weights = np.array(list(heat.values()), dtype=np.float32)
+        self.weights = weights / weights.sum()
+        dist = self.tables.dist[-1][:, columns]
+        self.rows = np.minimum(dist, DISTANCE_CAP).astype(np.float32)
+
+        # Detectives outside the team cover the suspects near them, wherever they go next
+        self.base = np.full(len(columns), DISTANCE_CAP, dtype=np.float32)
+        for location in state["others"]:
+            self.base = np.minimum(self.base, self.rows[self.tables.index[location]])
+
+    def _ticket_cost(self, tickets, dest, mode):
+        after = dict(tickets)
+        after[mode] -= 1
+        cost = TICKET_WEIGHT / tickets[mode]
+        # The game ends a detective's turn with no move left from where they stand, even in the last round
+        turns = max(min(reachability.TRAP_WARNING_TURNS, self.state["rounds_left"] - 1), 1)
+        if live_map.REACHABILITY.trapped_within(dest, after, turns):
+            cost += TRAP_PENALTY
+        return cost
+
+    def options(self, location, tickets, taken):
+        """Return [(dest, mode, cost)] for one detective, best on its own first."""
+        import numpy as np
+        options = []
+        for dest, modes in self.graph.edges(location):
+            if dest in taken:
+                continue
+            costs = [(self._ticket_cost(tickets, dest, mode), mode)
+                     for mode in modes if tickets.get(mode, 0) > 0]
+            if costs:
+                cost, mode = min(costs)
+                options.append((dest, mode, cost))
+        alone = [self.weights @ np.minimum(self.base, self.rows[self.tables.index[dest]]) + cost
+                 for dest, _, cost in options]
+        order = sorted(range(len(options)), key=lambda i: (alone[i], self.rng.random()))
+        return [options[i] for i in order]
+
+    def team_options(self):
+        import numpy as np
+        taken = set(self.state["others"])
+        team = [self.options(location, tickets, taken) for location, tickets in self.state["team"]]
+        # Keep the product of option counts under JOINT_LIMIT by dropping each largest list's worst option
+        while np.prod([max(len(options), 1) for options in team], dtype=np.int64) > JOINT_LIMIT:
+            longest = max(range(len(team)), key=lambda k: len(team[k]))
+            team[longest] = team[longest][:-1]
+        return team
+
+    def _rest(self, team):
+        """Cover, cost and destinations of every joint move of team[1:], as arrays over those joint moves."""
+        import numpy as np
+        cover = np.broadcast_to(self.base, (1, len(self.base)))
+        cost = np.zeros(1, dtype=np.float32)
+        dests = np.zeros((1, 0), dtype=np.int32)
+        for options in team[1:]:
+            if not options:
+                continue  # stuck detectives stay where they are
+            rows = self.rows[[self.tables.index[dest] for dest, _, _ in options]]
+            costs = np.array([c for _, _, c in options], dtype=np.float32)
+            cover = np.minimum(cover[:, None, :], rows[None, :, :]).reshape(-1, len(self.base))
+            cost = (cost[:, None] + costs[None, :]).reshape(-1)
+            dests = np.concatenate([
+                np.repeat(dests, len(options), axis=0),
+                np.tile(np.array([dest for dest, _, _ in options], dtype=np.int32), len(dests))[:, None],
+            ], axis=1)
+        # Two bot detectives may not end on the same node
+        clash = np.zeros(len(dests), dtype=bool)
+        for a, b in itertools.combinations(range(dests.shape[1]), 2):
+            clash |= dests[:, a] == dests[:, b]
+        return cover, np.where(clash, np.inf, cost), dests
+
+    def run(self, deadline):
+        """Return (move for team[0], joint moves scored); the move is None if team[0] is stuck."""
+        import numpy as np
+        team = self.team_options()
+        if not team[0]:
+            return None, 0
+        cover, cost, dests = self._rest(team)
+        best, best_score, scored = None, np.inf, 0
+        for dest, mode, own_cost in team[0]:
+            score = np.minimum(cover, self.rows[self.tables.index[dest]]) @ self.weights + cost + own_cost
+            score[(dests == dest).any(axis=1)] = np.inf
+            i = int(score.argmin())
+            if score[i] < best_score:
+                best, best_score = (dest, mode), score[i]
+            scored += len(score)
+            if time.perf_counter() >= deadline:
+                break
+        return best, scored
+
+
+def choose_move(state):
+    """Pick the move for the first detective in snapshot()["team"] within state["budget_ms"].
+
+    Returns (dest, ticket), or None if that detective cannot move.
+    """
+    deadline = time.perf_counter() + state["budget_ms"] / 1000
+    move, _ = _Planner(state, random.Random(state.get("seed"))).run(deadline)
+    return move
+
+
+def fallback_move(state):
+    """Cheap move used when planning fails or times out: the detective's best move on its own."""
+    planner = _Planner(state, random.Random(state.get("seed")))
+    location, tickets = state["team"][0]
+    options = planner.options(location, tickets, set(state["others"]))
+    return options[0][:2] if options else None
+
+
+class DetectiveAgent(PooledAgent):
+    """Chooses the bot detectives' moves with choose_move (DETECTIVE_AI_* settings)."""
+
+    ENV_PREFIX = "DETECTIVE_AI"
+
+    async def choose(self, game_state, player_id):
+        """Return (dest, ticket) for the bot detective player_id, or None if it cannot move."""
+        return await self._search(choose_move, fallback_move, snapshot(game_state, player_id, self.budget_ms))
@@ -0,0 +1,165 @@
+import os
+import time
+import numpy as np
+import graph_index
+from logs import get_logger
+
+log = get_logger("maps")
+
+UNREACHABLE = 255
+# One table per transport mode plus the combined graph (None = any ticket)
+TABLE_MODES = graph_index.MODES + (None,)
+_TABLE_INDEX = {mode: i for i, mode in enumerate(TABLE_MODES)}
+
+
+def _table_index(mode):
+    index = _TABLE_INDEX.get(mode)
+    if index is None:
+        mode = graph_index.normalize_mode(mode)
+        index = _TABLE_INDEX[None if mode == "black" else mode]
+    return index
+
+
+def _all_pairs_bfs(adjacency):
+    """BFS from every node at once: one boolean matrix product per level."""
+    n = len(adjacency)
+    dist = np.full((n, n), UNREACHABLE, dtype=np.uint8)
+    np.fill_diagonal(dist, 0)
+    reached = np.eye(n, dtype=bool)
+    frontier = reached.copy()
+    level = 0
+    while frontier.any():
+        level += 1
+        frontier = ((frontier.astype(np.float32) @ adjacency) > 0) & ~reached
+        dist[frontier] = level
+        reached |= frontier
+    return dist
+
+
+def _next_hops(adjacency, dist):
+    """hop[i, j] = index of the lowest-numbered neighbour of i that is one move closer to j."""
+    n = len(adjacency)
+    hop = np.full((n, n), UNREACHABLE, dtype=np.uint8)
+    target = dist.astype(np.int16) - 1
+    for i in range(n):
+        # Highest neighbour first, so the lowest one wins ties
+        for k in np.flatnonzero(adjacency[i])[::-1]:
+            hop[i, dist[k] == target[i]] = k
+    return hop
+
+
+class DistanceTables:
+    """All-pairs move counts and next hops per transport mode, as uint8 matrices.
+
+    dist[m, i, j] is the fewest moves from nodes[i] to nodes[j] using only
+    TABLE_MODES[m] (UNREACHABLE if there is no such route) and hop[m, i, j] is
+    the index of the first node on one of those routes. Four 200x200 tables of
+    each kind are 320 KB in total.
+    """
+
+    def __init__(self, nodes, dist, hop, checksum=None):
+        self.nodes = tuple(int(node) for node in nodes)
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        self.dist = dist
+        self.hop = hop
+        self.checksum = checksum
+
+    @classmethod
+    def build(cls, graph, checksum=None):
+        """Compute every table from a graph_index.GraphIndex."""
+        nodes = graph.nodes
+        index = {node: i for i, node in enumerate(nodes)}
+        shape = (len(TABLE_MODES), len(nodes), len(nodes))
+        dist = np.full(shape, UNREACHABLE, dtype=np.uint8)
+        hop = np.full(shape, UNREACHABLE, dtype=np.uint8)
+        for m, mode in enumerate(TABLE_MODES):
+            adjacency = np.zeros(shape[1:], dtype=np.float32)
+            for node in nodes:
+                for dest in graph.neighbors(node, mode):
+                    adjacency[index[node], index[dest]] = 1
+            dist[m] = _all_pairs_bfs(adjacency)
+            hop[m] = _next_hops(adjacency, dist[m])
+        return cls(nodes, dist, hop, checksum)
+
+    def save(self, path):
+        """Write the tables to path atomically."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        partial = path + ".tmp"
+        with open(partial, 'wb') as f:
+            np.savez(f, nodes=np.array(self.nodes, dtype=np.int32), dist=self.dist, hop=self.hop,
+                     checksum=np.array(self.checksum or ""))
+        os.replace(partial, path)
+
+    @classmethod
+    def load(cls, path, checksum):
+        """Read tables saved by save(), or return None if they were built from other data."""
+        with np.load(path) as data:
+            if str(data["checksum"]) != checksum:
+                return None
+            return cls(data["nodes"], data["dist"], data["hop"], checksum)
+
+    def lookup(self, a, b, mode=None):
+        """Return (moves, next hop) from a to b using mode (any if None or "black"), or (None, None)."""
+        i, j = self.index.get(a), self.index.get(b)
+        if i is None or j is None:
+            return None, None
+        m = _table_index(mode)
+        moves = self.dist.item(m, i, j)
+        if moves == UNREACHABLE:
+            return None, None
+        if moves == 0:
+            return 0, None
+        return moves, self.nodes[self.hop.item(m, i, j)]
+
+    def distance(self, a, b, mode=None):
+        """Return the fewest moves from a to b, or None if b cannot be reached."""
+        return self.lookup(a, b, mode)[0]
+
+    def route(self, a, b, mode=None):
+        """Return one shortest route [a, ..., b], or None if b cannot be reached."""
+        moves, node = self.lookup(a, b, mode)
+        if moves is None:
+            return None
+        route = [a]
+        while node is not None:
+            route.append(node)
+            node = self.lookup(node, b, mode)[1]
+        return route
+
+    def row(self, node, mode=None):
+        """Return the uint8 distances from node to every node, in self.nodes order."""
+        return self.dist[_table_index(mode), self.index[node]]
+
+    def nearest(self, node, targets, mode=None):
+        """Return (moves, target) for the closest of targets, or (None, None) if none is reachable."""
+        columns = [self.index[target] for target in targets if target in self.index]
+        if node not in self.index or not columns:
+            return None, None
+        moves = self.row(node, mode)[columns]
+        best = int(moves.argmin())
+        if moves[best] == UNREACHABLE:
+            return None, None
+        return int(moves[best]), self.nodes[columns[best]]
+
+
+def load_distance_tables(graph, checksum, cache_path=None):
+    """Load the tables from cache_path if they were built for checksum (a MapData.checksum), else build (and cache) them."""
+    if cache_path and os.path.exists(cache_path):
+        try:
+            tables = DistanceTables.load(cache_path, checksum)
+        except (OSError, ValueError, KeyError) as e:
+            log.warning("Ignoring unreadable distance cache %s: %s", cache_path, e)
+            tables = None
+        if tables is not None and tables.nodes == graph.nodes:
+            log.info("Loaded distance tables from %s", cache_path)
+            return tables
+
+    start = time.perf_counter()
+    tables = DistanceTables.build(graph, checksum)
+    log.info("Built distance tables for %s nodes in %.3fs", len(tables.nodes), time.perf_counter() - start)
+    if cache_path:
+        try:
+            tables.save(cache_path)
+        except OSError as e:
+            log.warning("Could not write distance cache %s: %s", cache_path, e)
+    return tables
@@ -3,9 +3,18 @@ import random
 from discord.ext import commands
 from discord import app_commands, Interaction
 from discord.ui import Button, View
-from collections import defaultdict, deque
 import live_map
 import os
+import time
+from render_pool import MapRenderPool
+from render_cache import RenderCache
+from map_layers import RendererRegistry
+from sessions import SessionRegistry, SessionLimitReached
+from game import GameState
+from logs import LogConfig, get_logger
+from startup import Startup
+from outbox import Outbox, SendLimiter
+import reachability
 
 # ---------- CONFIGURATION ----------
 GUILD_ID = discord.Object(id=1358853180179611888)
@@ -17,15 +26,33 @@ intents.members = True
 
 client = commands.Bot(command_prefix="/", intents=intents)
 
+# Levels, sampling and output of these loggers come from LOG_* variables;
+# the per-move game and view messages are DEBUG, so they cost nothing by default
+log_config = LogConfig.from_env().install()
+game_log = get_logger("game")
+map_log = get_logger("maps")
+view_log = get_logger("views")
+command_log = get_logger("commands")
+# Times the start; STARTUP_WARMUP decides whether map assets are built after on_ready or on first use
+startup = Startup.from_env()
+
+# Map renders run on this pool so Pillow work never blocks the event loop
+render_pool = MapRenderPool.from_env()
+# Encoded maps keyed by what they show, so unchanged maps are not re-rendered
+map_cache = RenderCache.from_env()
+# Per-game canvases that only redraw the tokens that moved
+map_renderers = RendererRegistry.from_env()
+# Paces each channel's messages under Discord's per-channel rate limit
+send_limiter = SendLimiter.from_env()
+
 # ---------- GAME STATE ----------
-joined_players = []
-roles = {}
-turn_order = []
-current_turn_index = 0
-mr_x_ticket_log = deque(maxlen=5)
-mr_x_move_history = []
-round_counter = 1
-mr_x_id = None  # Cache Mr. X's ID
+def drop_game_maps(game_key):
+    """Drop a game's cached map images and layered canvas (on reset, eviction and parking)."""
+    map_cache.evict_game(game_key)
+    map_renderers.drop(game_key)
+
+# One GameState per guild channel; roles[uid] holds {"role", "location", "tickets", "black_tickets"}
+sessions = SessionRegistry.from_env(factory=GameState, on_evict=drop_game_maps)
 
 MAX_ROUNDS = 24
 MAX_PLAYERS = 5
@@ -37,162 +64,161 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 
 # ---------- HELPERS ----------
-def reset_game_state():
-    """Fully reset all global game state variables."""
-    global joined_players, roles, turn_order, current_turn_index, mr_x_ticket_log
-    global mr_x_move_history, round_counter, mr_x_id
-    joined_players = []
-    roles = {}
-    turn_order = []
-    current_turn_index = 0
-    mr_x_ticket_log = deque(maxlen=5)
-    mr_x_move_history = []
-    round_counter = 1
-    mr_x_id = None
-    print("[reset_game_state] Cleared turn_order and all game state")
-
-def load_map_from_file(filename):
-    conn_map = defaultdict(list)
-    full_path = os.path.join(BASE_DIR, filename)
-    try:
-        with open(full_path, "r") as f:
-            for line in f:
-                a, b = map(int, line.strip().split(","))
-                conn_map[a].append(b)
-                conn_map[b].append(a)
-        print(f"[load_map_from_file] Loaded map from {full_path}")
-        return conn_map
-    except FileNotFoundError:
-        print(f"[load_map_from_file] Error: File not found at {full_path}")
-        return conn_map
-
-taxi_map = load_map_from_file("taxi_map.txt")
-bus_map = load_map_from_file("bus_map.txt")
-metro_map = load_map_from_file("metro_map.txt")
-
-def get_available_transports(user_id, current, dest):
+def reset_game_state(game, game_key):
+    """Fully reset all state of one game; game_key is its session's key."""
+    drop_game_maps(game_key)
+    game.reset()
+    game_log.debug("Cleared turn_order and all game state")
+
+def get_available_transports(game, user_id, current, dest):
+    roles = game.roles
     if user_id not in roles:
-        print(f"[get_available_transports] User {user_id} not in roles")
+        game_log.debug("User %s not in roles", user_id)
         return []
     info = roles[user_id]
-    options = []
-    if dest in taxi_map[current] and info["tickets"].get("taxi", 0) > 0:
-        options.append("Taxi")
-    if dest in bus_map[current] and info["tickets"].get("bus", 0) > 0:
-        options.append("Bus")
-    if dest in metro_map[current] and info["tickets"].get("metro", 0) > 0:
-        options.append("Metro")
+    # One lookup in the shared adjacency index instead of scanning per-mode lists
+    options = [mode.capitalize() for mode in live_map.GRAPH.modes_between(current, dest)
+               if info["tickets"].get(mode, 0) > 0]
     if info.get("role") == "Mr. X" and info.get("black_tickets", 0) > 0 and options:
         options.append("Black")
-    print(f"[get_available_transports] User {user_id}, current={current}, dest={dest}, options={options}")
+    game_log.debug("User %s, current=%s, dest=%s, options=%s", user_id, current, dest, options)
     return options
 
-def get_current_player():
-    global turn_order, current_turn_index
+def detective_locations(game):
+    return [info["location"] for info in game.roles.values() if info.get("role") == "Detective"]
+
+def get_current_player(game):
+    turn_order = game.turn_order
     if not turn_order or len(turn_order) == 0:
-        print(f"[get_current_player] No players in turn_order")
+        game_log.debug("No players in turn_order")
         return None
-    if current_turn_index >= len(turn_order):
-        print(f"[get_current_player] Resetting current_turn_index from {current_turn_index} to 0")
-        current_turn_index = 0
-    player_id = turn_order[current_turn_index]
-    player_role = roles.get(player_id, {}).get("role", "Unknown")
-    print(f"[get_current_player] player_id={player_id}, role={player_role}, turn_order={turn_order}, current_turn_index={current_turn_index}")
+    if game.current_turn_index >= len(turn_order):
+        game_log.debug("Resetting current_turn_index from %s to 0", game.current_turn_index)
+        game.current_turn_index = 0
+    player_id = turn_order[game.current_turn_index]
+    player_role = game.roles.get(player_id, {}).get("role", "Unknown")
+    game_log.debug("player_id=%s, role=%s, turn_order=%s, current_turn_index=%s", player_id, player_role, turn_order, game.current_turn_index)
     return player_id
 
-def advance_turn():
-    global current_turn_index, round_counter, turn_order
+def advance_turn(game):
+    roles, turn_order, mr_x_id = game.roles, game.turn_order, game.mr_x_id
     if not turn_order or len(turn_order) == 0:
-        print(f"[advance_turn] No players in turn_order")
+        game_log.debug("No players in turn_order")
         return None, False
     
     mr_x_count = sum(1 for pid in turn_order if roles.get(pid, {}).get("role") == "Mr. X")
     if mr_x_count != 1:
-        print(f"[advance_turn] Invalid turn_order, mr_x_count={mr_x_count}, turn_order={turn_order}, roles={roles}")
+        game_log.warning("Invalid turn_order, mr_x_count=%s, turn_order=%s, roles=%s", mr_x_count, turn_order, roles)
         return None, False
     
-    current_turn_index = (current_turn_index + 1) % len(turn_order)
-    new_round = (current_turn_index == 0)
+    game.current_turn_index = (game.current_turn_index + 1) % len(turn_order)
+    new_round = (game.current_turn_index == 0)
     if new_round:
-        round_counter += 1
+        game.round_counter += 1
+        # Reveal rounds announce Mr. X's location, which resets the suspect set
+        if game.round_counter in live_map.REVEAL_ROUNDS and mr_x_id in roles:
+            game.suspects.reveal(roles[mr_x_id]["location"])
 
-    next_player_id = turn_order[current_turn_index]
+    next_player_id = turn_order[game.current_turn_index]
     next_role = roles.get(next_player_id, {}).get("role", "Unknown")
     
     # Ensure Mr. X is first in a new round
     if new_round and next_role != "Mr. X" and mr_x_id:
-        print(f"[advance_turn] Warning: Expected Mr. X at round start, got {next_role} ({next_player_id}). Correcting to Mr. X {mr_x_id}")
+        game_log.warning("Expected Mr. X at round start, got %s (%s). Correcting to Mr. X %s", next_role, next_player_id, mr_x_id)
         next_player_id = mr_x_id
-        current_turn_index = turn_order.index(mr_x_id)
+        game.current_turn_index = turn_order.index(mr_x_id)
         next_role = "Mr. X"
     
-    print(f"[advance_turn] next_player_id={next_player_id}, role={next_role}, round={round_counter}, new_round={new_round}, turn_order={turn_order}, current_turn_index={current_turn_index}")
+    game_log.debug("next_player_id=%s, role=%s, round=%s, new_round=%s, turn_order=%s, current_turn_index=%s", next_player_id, next_role, game.round_counter, new_round, turn_order, game.current_turn_index)
     return next_player_id, new_round
 
-def check_end_conditions(channel):
-    global mr_x_id
+def check_end_conditions(game):
+    roles, mr_x_id, round_counter = game.roles, game.mr_x_id, game.round_counter
     if not mr_x_id:
-        print(f"[check_end_conditions] No Mr. X found, roles={roles}")
+        game_log.warning("No Mr. X found, roles=%s", roles)
         return "❌ No Mr. X found. Game cannot continue."
     mr_x_location = roles[mr_x_id]["location"]
     detective_locations = [info["location"] for uid, info in roles.items() if info["role"] == "Detective"]
     
-    print(f"[check_end_conditions] mr_x_id={mr_x_id}, mr_x_location={mr_x_location}, detective_locations={detective_locations}, round={round_counter}")
+    game_log.debug("mr_x_id=%s, mr_x_location=%s, detective_locations=%s, round=%s", mr_x_id, mr_x_location, detective_locations, round_counter)
     
     if mr_x_location in detective_locations:
-        print(f"[check_end_conditions] Mr. X caught at {mr_x_location}")
+        game_log.debug("Mr. X caught at %s", mr_x_location)
         return f"🕵️ Mr. X has been caught at location {mr_x_location}! Detectives win!"
 
-    stuck_detectives = 0
-    for uid, info in roles.items():
-        if info["role"] == "Detective":
-            current = info["location"]
-            possible = False
-            for dest in range(1, 201):
-                if get_available_transports(uid, current, dest):
-                    possible = True
-                    break
-            if not possible:
-                stuck_detectives += 1
-    if stuck_detectives == len([r for r in roles.values() if r["role"] == "Detective"]):
-        print(f"[check_end_conditions] All detectives stuck, count={stuck_detectives}")
+    # Answered from each detective's real exits and tickets; the tracker only
+    # re-checks detectives whose location or ticket set changed since last time
+    detectives = [(uid, info) for uid, info in roles.items() if info["role"] == "Detective"]
+    stuck_detectives = sum(
+        1 for uid, info in detectives if game.trapped.is_trapped(uid, info["location"], info["tickets"])
+    )
+    if stuck_detectives == len(detectives):
+        game_log.debug("All detectives stuck, count=%s", stuck_detectives)
         return "🕶️ All detectives are stuck! Mr. X escapes and wins!"
 
+    # Detectives whose every route runs out of tickets within the next few turns
+    turns = min(reachability.TRAP_WARNING_TURNS, MAX_ROUNDS - round_counter + 1)
+    game.trap_warnings = {}
+    for uid, info in detectives:
+        moves_left = game.trapped.doomed_within(info["location"], info["tickets"], turns)
+        if moves_left is not None:
+            game.trap_warnings[uid] = moves_left
+    if game.trap_warnings:
+        game_log.debug("Detectives running out of tickets: %s", game.trap_warnings)
+
     if round_counter > MAX_ROUNDS:
-        print(f"[check_end_conditions] Max rounds ({MAX_ROUNDS}) exceeded")
+        game_log.debug("Max rounds (%s) exceeded", MAX_ROUNDS)
         return "⏳ 24 rounds are over. Mr. X wins!"
 
     return None
 
-async def send_map(channel, interaction=None, zoom_player=None, is_turn=False):
+async def render_map(game, game_key, zoom_player=None, heat=None):
+    """Render the game's map from zoom_player's perspective, reusing a cached image when nothing visible changed.
+
+    game_key is the game's session key, which its cached images and canvas are kept under.
+    """
+    key = live_map.render_key(game.roles, game.round_counter, zoom_player, game.mr_x_id, heat=heat)
+    return await map_cache.get_or_render(
+        game_key, key,
+        lambda: render_pool.render(game.roles, game.round_counter, zoom_player=zoom_player, mr_x_id=game.mr_x_id,
+                                   heat=heat, renderer=map_renderers.get(game_key))
+    )
+
+async def send_map(game, game_key, channel, interaction=None, zoom_player=None, is_turn=False, outbox=None, member=None):
+    """Send the map, or with an outbox queue it to go out with the turn's other messages.
+
+    member is zoom_player's Member if the caller already fetched it.
+    """
+    if outbox is None:
+        outbox = Outbox(send_limiter)
+        await send_map(game, game_key, channel, interaction, zoom_player, is_turn, outbox, member)
+        await outbox.flush()
+        return
+    roles, round_counter = game.roles, game.round_counter
     try:
-        buffer = live_map.generate_map(roles, round_counter, zoom_player=zoom_player, mr_x_id=mr_x_id)
+        buffer = await render_map(game, game_key, zoom_player)
         if buffer is None:
             raise Exception("Failed to generate map")
         player_role = roles.get(zoom_player, {}).get("role", "Unknown") if zoom_player else "None"
 
         if zoom_player and is_turn:
             player_location = roles.get(zoom_player, {}).get("location", "Unknown")
-            player = await channel.guild.fetch_member(zoom_player)
+            player = member or await channel.guild.fetch_member(zoom_player)
 
             if player_role == "Detective":
-                print(f"[send_map] Sending public map to Detective {zoom_player} at location {player_location}")
-                await channel.send(
-                    content=f"🔎 {player.mention}'s current location is {player_location} (Round {round_counter}):",
-                    file=discord.File(buffer, 'zoom_map.png')
+                map_log.debug("Sending public map to Detective %s at location %s", zoom_player, player_location)
+                outbox.send(
+                    channel, f"🔎 {player.mention}'s current location is {player_location} (Round {round_counter}):",
+                    file=discord.File(buffer, live_map.map_filename('zoom_map'))
                 )
             elif player_role == "Mr. X":
-                print(f"[send_map] Sending private map to Mr. X {zoom_player} at location {player_location}")
-                # Prefer direct DM to ensure correct recipient
-                try:
-                    await player.send(
-                        content=f"🕶 Your current location {player_location} (Round {round_counter}):",
-                        file=discord.File(buffer, 'zoom_map.png'),
-                        embed=create_mr_x_notepad_embed()
-                    )
-                    await channel.send(f"🕶 Map sent to Mr. X privately.")
-                except discord.Forbidden:
-                    print(f"[send_map] Failed to send DM to Mr. X {zoom_player}: Forbidden")
+                map_log.debug("Sending private map to Mr. X %s at location %s", zoom_player, player_location)
+
+                async def dm_failed(error):
+                    if not isinstance(error, discord.Forbidden):
+                        map_log.error("Failed to send map to Mr. X %s: %r", zoom_player, error)
+                        return
+                    map_log.warning("Failed to send DM to Mr. X %s: Forbidden", zoom_player)
                     if interaction:
                         await interaction.followup.send(
                             content="❌ Unable to send map to Mr. X via DM. Please enable DMs.",
@@ -200,18 +226,27 @@ async def send_map(channel, interaction=None, zoom_player=None, is_turn=False):
                         )
                     else:
                         await channel.send("❌ Unable to send map to Mr. X via DM. Please enable DMs.")
+
+                # Prefer direct DM to ensure correct recipient; it goes out alongside the channel messages
+                outbox.send(
+                    player, f"🕶 Your current location {player_location} (Round {round_counter}):",
+                    file=discord.File(buffer, live_map.map_filename('zoom_map')),
+                    embed=create_mr_x_notepad_embed(game), on_error=dm_failed
+                )
+                outbox.send(channel, f"🕶 Map sent to Mr. X privately.")
             else:
-                print(f"[send_map] Invalid role for player {zoom_player}: {player_role}")
+                map_log.warning("Invalid role for player %s: %s", zoom_player, player_role)
                 if interaction:
-                    await interaction.followup.send(f"⚠️ Invalid role for player <@{zoom_player}>. Map not sent.", ephemeral=True)
+                    outbox.send(interaction.followup, f"⚠️ Invalid role for player <@{zoom_player}>. Map not sent.",
+                                ephemeral=True, lane=channel.id)
                 else:
-                    await channel.send(f"⚠️ Invalid role for player <@{zoom_player}>. Map not sent.")
+                    outbox.send(channel, f"⚠️ Invalid role for player <@{zoom_player}>. Map not sent.")
         else:
-            print(f"[send_map] Sending general map for Round {round_counter}")
-            await channel.send(file=discord.File(buffer, 'map.png'))
+            map_log.debug("Sending general map for Round %s", round_counter)
+            outbox.send(channel, file=discord.File(buffer, live_map.map_filename('map')))
 
-    except Exception as e:
-        print(f"[send_map] Error: {type(e).__name__}: {e}")
+    except Exception:
+        map_log.exception("Error")
         if interaction:
             try:
                 await interaction.followup.send("Error generating map. Please check bot configuration.", ephemeral=True)
@@ -222,10 +257,11 @@ async def send_map(channel, interaction=None, zoom_player=None, is_turn=False):
 
 # ---------- VIEWS ----------
 class TransportSelectView(View):
-    def __init__(self, user: discord.User, dest: int, interaction: Interaction):
+    def __init__(self, session, user: discord.User, dest: int, interaction: Interaction):
         super().__init__(timeout=90.0)
+        self.session, self.game = session, session.state
         self.user, self.dest, self.interaction = user, dest, interaction
-        for t in get_available_transports(user.id, roles[user.id]["location"], dest):
+        for t in get_available_transports(self.game, user.id, self.game.roles[user.id]["location"], dest):
             self.add_item(self.TransportButton(t, user, dest, interaction, self))
 
     async def on_timeout(self):
@@ -248,113 +284,155 @@ class TransportSelectView(View):
             if interaction.user != self.user:
                 await interaction.response.send_message("Not for you!", ephemeral=True)
                 return
-            
+
+            # Hold the session lock for the whole turn so double-clicks and
+            # concurrent commands in this channel cannot interleave with it
+            start = time.perf_counter()
+            async with self.parent.session.lock:
+                self.parent.session.touch()
+                await self.play_turn(interaction)
+            sessions.record_turn(time.perf_counter() - start)
+
+        async def play_turn(self, interaction: discord.Interaction):
+            game = self.parent.game
+            roles = game.roles
+            if get_current_player(game) != self.user.id or self.user.id not in roles:
+                await interaction.response.send_message("❌ It's not your turn!", ephemeral=True)
+                return
+
             info = roles[self.user.id]
             Role = info["role"]
             start_location = info["location"]
-            print(f"[TransportSelectView.callback] Current player={self.user.id}, role={Role}, moving from {start_location} to {self.dest} via {self.transport}")
+            view_log.debug("Current player=%s, role=%s, moving from %s to %s via %s", self.user.id, Role, start_location, self.dest, self.transport)
 
             if Role == "Detective":
                 info["tickets"][self.transport.lower()] -= 1
             else:
                 if self.transport == "Black":
                     info["black_tickets"] -= 1
-                mr_x_ticket_log.append(self.transport)
-                mr_x_move_history.append((self.transport, start_location, self.dest))
+                game.mr_x_ticket_log.append(self.transport)
+                game.mr_x_move_history.append((self.transport, start_location, self.dest))
 
             info["location"] = self.dest
+            if Role == "Detective":
+                game.suspects.detectives_at([self.dest])
+            elif game.round_counter in live_map.REVEAL_ROUNDS:
+                game.suspects.reveal(self.dest)
+            else:
+                game.suspects.mr_x_moved(self.transport, detective_locations(game))
             live_map.update_player_location(self.user.id, self.dest, roles)
-            
+
+            announcement = None
             if Role == "Detective":
                 await interaction.response.edit_message(
                     content=f"🕵 {self.user.mention} moved to {self.dest} via {self.transport}", view=None)
-                await self.interaction.channel.send(f"🕵️ {self.user.mention} moved to location **{self.dest}** using **{self.transport}** ticket")
+                announcement = f"🕵️ {self.user.mention} moved to location **{self.dest}** using **{self.transport}** ticket"
             elif Role == "Mr. X":
                 await interaction.response.edit_message(content="✅ Move recorded.", view=None)
-                await self.interaction.channel.send(f"🕶 Mr. X has moved using {self.transport} ticket.")
-            
-            res = check_end_conditions(self.interaction.channel)
+                announcement = f"🕶 Mr. X has moved using {self.transport} ticket."
+
+            # Everything else the turn announces is queued and sent together once it is decided
+            outbox = Outbox(send_limiter)
+            if announcement:
+                outbox.send(self.interaction.channel, announcement)
+            try:
+                await self.finish_turn(interaction, outbox, Role)
+            finally:
+                await outbox.flush()
+
+        async def finish_turn(self, interaction, outbox, Role):
+            game, game_key = self.parent.game, self.parent.session.key
+            roles, mr_x_id = game.roles, game.mr_x_id
+            channel = self.interaction.channel
+            res = check_end_conditions(game)
             if res:
-                print(f"[TransportSelectView.callback] Game ended: {res}")
-                await self.interaction.channel.send(res)
-                reset_game_state()
+                view_log.info("Game ended: %s", res)
+                outbox.send(channel, res)
+                reset_game_state(game, game_key)
                 self.parent.stop()
                 return
+            if Role == "Detective" and self.user.id in game.trap_warnings:
+                outbox.send(channel,
+                    f"⚠️ {self.user.mention} can make at most {game.trap_warnings[self.user.id]} more move(s) with their tickets!")
             
-            nxt, new_round = advance_turn()
+            nxt, new_round = advance_turn(game)
             if not nxt:
-                print(f"[TransportSelectView.callback] No valid next player, roles={roles}, turn_order={turn_order}")
-                await self.interaction.channel.send("❌ No valid next player. Game stopped. Use `/endgame` to reset.")
-                reset_game_state()
+                view_log.warning("No valid next player, roles=%s, turn_order=%s", roles, game.turn_order)
+                outbox.send(channel, "❌ No valid next player. Game stopped. Use `/endgame` to reset.")
+                reset_game_state(game, game_key)
                 self.parent.stop()
                 return
 
             if new_round:
-                print(f"[TransportSelectView.callback] New round started: {round_counter}")
-                await self.interaction.channel.send(f"Round {round_counter} has started!")
-                if round_counter in [3, 8, 13, 18, 24] and mr_x_id:
+                view_log.info("New round started: %s", game.round_counter)
+                outbox.send(channel, f"Round {game.round_counter} has started!")
+                if game.round_counter in [3, 8, 13, 18, 24] and mr_x_id:
                     mr_x_location = roles[mr_x_id]["location"]
-                    await self.interaction.channel.send(f"📍 Mr. X location: *{mr_x_location}*")
-                    await send_map(self.interaction.channel, interaction=interaction)
+                    outbox.send(channel, f"📍 Mr. X location: *{mr_x_location}*")
+                    await send_map(game, game_key, channel, interaction=interaction, outbox=outbox)
                 else:
-                    await send_map(self.interaction.channel, interaction=interaction)
+                    await send_map(game, game_key, channel, interaction=interaction, outbox=outbox)
 
+            members = self.parent.session.members
             try:
-                member = await self.interaction.guild.fetch_member(nxt)
-                await self.interaction.channel.send(f"🔁 It's {member.mention}'s turn! Use `/move <destination>` to make your move. (Round {round_counter})")
-                print(f"[TransportSelectView.callback] Next player={nxt}, role={roles.get(nxt, {}).get('role', 'Unknown')}, mr_x_id={mr_x_id}, turn_order={turn_order}, current_turn_index={current_turn_index}")
+                member = await members.fetch(self.interaction.guild, nxt)
+                outbox.send(channel, f"🔁 It's {member.mention}'s turn! Use `/move <destination>` to make your move. (Round {game.round_counter})")
+                view_log.debug("Next player=%s, role=%s, mr_x_id=%s, turn_order=%s, current_turn_index=%s", nxt, roles.get(nxt, {}).get('role', 'Unknown'), mr_x_id, game.turn_order, game.current_turn_index)
                 
                 # Set zoom_player based on nxt matching mr_x_id
                 zoom_player = mr_x_id if nxt == mr_x_id else nxt
-                print(f"[TransportSelectView.callback] Setting zoom_player to {'Mr. X' if nxt == mr_x_id else 'Detective'} {zoom_player}")
-                await send_map(self.interaction.channel, interaction=interaction, zoom_player=zoom_player, is_turn=True)
+                view_log.debug("Setting zoom_player to %s %s", 'Mr. X' if nxt == mr_x_id else 'Detective', zoom_player)
+                await send_map(game, game_key, channel, interaction=interaction, zoom_player=zoom_player, is_turn=True,
+                               outbox=outbox, member=member)
             except discord.errors.NotFound:
-                print(f"[TransportSelectView.callback] Player {nxt} not found")
-                await self.interaction.channel.send(f"❌ Player <@{nxt}> not found. Skipping their turn.")
+                view_log.warning("Player %s not found", nxt)
+                outbox.send(channel, f"❌ Player <@{nxt}> not found. Skipping their turn.")
                 
-                nxt, new_round = advance_turn()
+                nxt, new_round = advance_turn(game)
                 if not nxt:
-                    print(f"[TransportSelectView.callback] No valid next player after skip, roles={roles}, turn_order={turn_order}")
-                    await self.interaction.channel.send("❌ No valid next player. Game stopped. Use `/endgame` to reset.")
-                    reset_game_state()
+                    view_log.warning("No valid next player after skip, roles=%s, turn_order=%s", roles, game.turn_order)
+                    outbox.send(channel, "❌ No valid next player. Game stopped. Use `/endgame` to reset.")
+                    reset_game_state(game, game_key)
                     self.parent.stop()
                     return
                 if new_round:
-                    print(f"[TransportSelectView.callback] New round started after skip: {round_counter}")
-                    await self.interaction.channel.send(f"Round {round_counter} has started!")
-                    if round_counter in [3, 8, 13, 18, 24] and mr_x_id:
+                    view_log.info("New round started after skip: %s", game.round_counter)
+                    outbox.send(channel, f"Round {game.round_counter} has started!")
+                    if game.round_counter in [3, 8, 13, 18, 24] and mr_x_id:
                         mr_x_location = roles[mr_x_id]["location"]
-                        await self.interaction.channel.send(f"📍 Mr. X location: *{mr_x_location}*")
-                        await send_map(self.interaction.channel, interaction=interaction)
+                        outbox.send(channel, f"📍 Mr. X location: *{mr_x_location}*")
+                        await send_map(game, game_key, channel, interaction=interaction, outbox=outbox)
                     else:
-                        await send_map(self.interaction.channel, interaction=interaction)
+                        await send_map(game, game_key, channel, interaction=interaction, outbox=outbox)
 
                 try:
-                    member = await self.interaction.guild.fetch_member(nxt)
+                    member = await members.fetch(self.interaction.guild, nxt)
                     embed = discord.Embed(
                         title="🔁 It's Your Turn!",
-                        description=f"{member.mention}, use /move <destination> to make your move. (Round {round_counter})",
+                        description=f"{member.mention}, use /move <destination> to make your move. (Round {game.round_counter})",
                         color=discord.Color.blue()  
                     )
                     embed.set_footer(text="Make your move!")  
-                    await self.interaction.channel.send(embed=embed)
+                    outbox.send(channel, embed=embed)
 
-                    print(f"[TransportSelectView.callback] Next player after skip={nxt}, role={roles.get(nxt, {}).get('role', 'Unknown')}, mr_x_id={mr_x_id}, turn_order={turn_order}, current_turn_index={current_turn_index}")
+                    view_log.debug("Next player after skip=%s, role=%s, mr_x_id=%s, turn_order=%s, current_turn_index=%s", nxt, roles.get(nxt, {}).get('role', 'Unknown'), mr_x_id, game.turn_order, game.current_turn_index)
                     zoom_player = mr_x_id if nxt == mr_x_id else nxt
-                    print(f"[TransportSelectView.callback] Setting zoom_player to {'Mr. X' if nxt == mr_x_id else 'Detective'} {zoom_player} after skip")
-                    await send_map(self.interaction.channel, interaction=interaction, zoom_player=zoom_player, is_turn=True)
+                    view_log.debug("Setting zoom_player to %s %s after skip", 'Mr. X' if nxt == mr_x_id else 'Detective', zoom_player)
+                    await send_map(game, game_key, channel, interaction=interaction, zoom_player=zoom_player, is_turn=True,
+                                   outbox=outbox, member=member)
                 except discord.errors.NotFound:
-                    print(f"[TransportSelectView.callback] Next player not found after second skip")
-                    await self.interaction.channel.send("❌ Next player not found. Game may need to be reset with `/endgame`.")
-                    reset_game_state()
+                    view_log.warning("Next player not found after second skip")
+                    outbox.send(channel, "❌ Next player not found. Game may need to be reset with `/endgame`.")
+                    reset_game_state(game, game_key)
                     self.parent.stop()
                     return
 
             self.parent.stop()
 
 class RoleSelectView(View):
-    def __init__(self, user):
+    def __init__(self, game, user):
         super().__init__(timeout=60)
+        self.game = game
         self.user = user
         self.message = None
 
@@ -364,11 +442,12 @@ class RoleSelectView(View):
                 item.disabled = True
             if self.message:
                 await self.message.edit(view=self)
-        except Exception as e:
-            print(f"[RoleSelectView.on_timeout] Error: {e}")
+        except Exception:
+            view_log.exception("Error")
 
     @discord.ui.button(label="🕵 Detective", style=discord.ButtonStyle.primary)
     async def detect(self, interaction: Interaction, button: Button):
+        roles = self.game.roles
         try:
             if interaction.user != self.user:
                 await interaction.response.send_message("Not for you!", ephemeral=True)
@@ -387,11 +466,11 @@ class RoleSelectView(View):
                 "location": None,
                 "tickets": ticket_limits.copy()
             }
-            print(f"[RoleSelectView.detect] User {interaction.user.id} chose Detective, roles={roles}")
+            view_log.debug("User %s chose Detective, roles=%s", interaction.user.id, roles)
             await interaction.response.edit_message(content="✅ You are Detective", view=None)
             await interaction.channel.send(f"🕵 {interaction.user.mention} has chosen **Detective**!")
-        except Exception as e:
-            print(f"[RoleSelectView.detect] Error: {e}")
+        except Exception:
+            view_log.exception("Error")
             try:
                 await interaction.response.send_message("Error selecting role.", ephemeral=True)
             except:
@@ -399,6 +478,7 @@ class RoleSelectView(View):
 
     @discord.ui.button(label="🕶 Mr. X", style=discord.ButtonStyle.danger)
     async def mr_x(self, interaction: Interaction, button: Button):
+        roles = self.game.roles
         try:
             if interaction.user != self.user:
                 await interaction.response.send_message("Not for you!", ephemeral=True)
@@ -418,19 +498,19 @@ class RoleSelectView(View):
                 "tickets": {"taxi": 999, "bus": 999, "metro": 999},
                 "black_tickets": black_ticket_limit
             }
-            print(f"[RoleSelectView.mr_x] User {interaction.user.id} chose Mr. X, roles={roles}")
+            view_log.debug("User %s chose Mr. X, roles=%s", interaction.user.id, roles)
             await interaction.response.edit_message(content="✅ You are Mr. X", view=None)
             await interaction.channel.send(f"🕶 {interaction.user.mention} has chosen **Mr. X**!")
-        except Exception as e:
-            print(f"[RoleSelectView.mr_x] Error: {e}")
+        except Exception:
+            view_log.exception("Error")
             try:
                 await interaction.response.send_message("Error selecting role.", ephemeral=True)
             except:
                 pass
 
-async def send_role_selection(user, channel):
+async def send_role_selection(game, user, channel):
     try:
-        view = RoleSelectView(user)
+        view = RoleSelectView(game, user)
         embed = discord.Embed(
             title="🎭 Choose Your Role",
             description="Click to become Mr. X or Detective.",
@@ -438,15 +518,16 @@ async def send_role_selection(user, channel):
         )
         message = await channel.send(content=user.mention, embed=embed, view=view)
         view.message = message
-        print(f"[send_role_selection] Sent role selection for user {user.id}")
-    except Exception as e:
-        print(f"[send_role_selection] Error: {e}")
+        view_log.debug("Sent role selection for user %s", user.id)
+    except Exception:
+        view_log.exception("Error")
         try:
             await channel.send("Failed to send role selection. Please try again.")
         except:
             pass
 
-def create_mr_x_notepad_embed():
+def create_mr_x_notepad_embed(game):
+    mr_x_move_history = game.mr_x_move_history
     embed = discord.Embed(
         title="🕶️ Mr. X's Notepad",
         description="Your secret move history:",
@@ -462,14 +543,17 @@ def create_mr_x_notepad_embed():
                 value=f"{ticket_emoji} {ticket}: {start_node} → {end_node}",
                 inline=False
             )
-    print(f"create_mr_x_notepad_embed() Generated notepad, move_history={mr_x_move_history}")
+    map_log.debug("Generated notepad, move_history=%s", mr_x_move_history)
     return embed
 
 # ---------- COMMANDS ----------
 @client.tree.command(name="startgame", description="Start a new game", guild=GUILD_ID)
 async def startgame(interaction: discord.Interaction):
     try:
-        reset_game_state()
+        session = sessions.for_interaction(interaction)
+        game = session.state
+        reset_game_state(game, session.key)
+        roles = game.roles
         roles[interaction.user.id] = {"role": None, "location": None, "tickets": {}, "black_tickets": 0}
 
         embed = discord.Embed(
@@ -500,18 +584,21 @@ async def startgame(interaction: discord.Interaction):
         
         
         if not os.path.exists(image_path):
-            print(f"[startgame] Image file not found at {image_path}")
+            command_log.warning("Image file not found at %s", image_path)
             await interaction.response.send_message("Error: Start game image not found.", ephemeral=True)
             return
         
         file = discord.File(image_path, filename="startgame_image.png")
         embed.set_image(url="attachment://startgame_image.png")
         
-        print(f"[startgame] Started game by {interaction.user.id}, roles={roles}")
+        command_log.info("Started game by %s, roles=%s", interaction.user.id, roles)
     
         await interaction.response.send_message(embed=embed, file=file)
-    except Exception as e:
-        print(f"[startgame] Error: {type(e).__name__}: {e}")
+    except SessionLimitReached as e:
+        command_log.warning("%s", e)
+        await interaction.response.send_message("Too many games are running right now. Please try again later.", ephemeral=True)
+    except Exception:
+        command_log.exception("Error")
         try:
             await interaction.response.send_message("Failed to start game. Please try again.", ephemeral=True)
         except:
@@ -520,6 +607,9 @@ async def startgame(interaction: discord.Interaction):
 @client.tree.command(name="join", description="Join the game", guild=GUILD_ID)
 async def join(interaction: discord.Interaction):
     try:
+        session = sessions.for_interaction(interaction)
+        game = session.state
+        roles, joined_players = game.roles, game.joined_players
         user = interaction.user
         if len(joined_players) >= MAX_PLAYERS:
             await interaction.response.send_message("Game is full!", ephemeral=True)
@@ -530,11 +620,16 @@ async def join(interaction: discord.Interaction):
         
         joined_players.append(user)
         roles[user.id] = {"role": None, "location": None, "tickets": {}, "black_tickets": 0}
-        print(f"[join] User {user.id} joined, joined_players={len(joined_players)}, roles={roles}")
+        # Turns look players up here instead of fetching them from Discord
+        session.members.put(user)
+        command_log.info("User %s joined, joined_players=%s, roles=%s", user.id, len(joined_players), roles)
         await interaction.response.send_message(f"👤 {user.mention} joined!")
-        await send_role_selection(user, interaction.channel)
-    except Exception as e:
-        print(f"[join] Error: {e}")
+        await send_role_selection(game, user, interaction.channel)
+    except SessionLimitReached as e:
+        command_log.warning("%s", e)
+        await interaction.response.send_message("Too many games are running right now. Please try again later.", ephemeral=True)
+    except Exception:
+        command_log.exception("Error")
         try:
             await interaction.response.send_message("An error occurred while processing your request.")
         except:
@@ -544,16 +639,17 @@ async def join(interaction: discord.Interaction):
 async def map(interaction: discord.Interaction):
     try:
         await interaction.response.defer()
-        if not roles:
-            print(f"[map] No game in progress, roles={roles}")
+        session = sessions.for_interaction(interaction, create=False)
+        if not session or not session.state.roles:
+            command_log.info("No game in progress in channel %s", interaction.channel_id)
             await interaction.followup.send("No game in progress.", ephemeral=True)
             return
-        buffer = live_map.generate_map(roles, round_counter)
-        print(f"[map] Generated map for round {round_counter}")
-        await send_map(interaction.channel, interaction=interaction, zoom_player=None, is_turn=False)
+        game = session.state
+        command_log.info("Sending map for round %s", game.round_counter)
+        await send_map(game, session.key, interaction.channel, interaction=interaction, zoom_player=None, is_turn=False)
         # await interaction.followup.send(file=discord.File(buffer, 'map.png'))
-    except Exception as e:
-        print(f"[map] Error: {type(e).__name__}: {e}")
+    except Exception:
+        command_log.exception("Error")
         if not interaction.response.is_done():
             await interaction.response.send_message("Error generating map. Please check bot configuration.", ephemeral=True)
         else:
@@ -563,28 +659,35 @@ async def map(interaction: discord.Interaction):
 async def begin(interaction: discord.Interaction):
     try:
         await interaction.response.defer()
-        global turn_order, current_turn_index, mr_x_id
+        session = sessions.for_interaction(interaction, create=False)
+        if not session:
+            await interaction.followup.send("No game in this channel. Start one with `/startgame`.", ephemeral=True)
+            return
+        game = session.state
+        roles, joined_players = game.roles, game.joined_players
 
         mr_x_count = sum(1 for r in roles.values() if r["role"] == "Mr. X")
         detective_count = sum(1 for r in roles.values() if r["role"] == "Detective")
         
         if mr_x_count != 1 or detective_count < 1 or (mr_x_count + detective_count) != len(joined_players):
-            print(f"[begin] Invalid roles: mr_x_count={mr_x_count}, detective_count={detective_count}, joined_players={len(joined_players)}, roles={roles}")
+            command_log.warning("Invalid roles: mr_x_count=%s, detective_count=%s, joined_players=%s, roles=%s", mr_x_count, detective_count, len(joined_players), roles)
             await interaction.followup.send("❌ Need exactly 1 Mr. X and at least 1 Detective to start!", ephemeral=True)
             return
 
         for user_id in roles:
             roles[user_id]["location"] = random.randint(1, 200)
 
-        mr_x_id = next((uid for uid, r in roles.items() if r["role"] == "Mr. X"), None)
+        mr_x_id = game.mr_x_id = next((uid for uid, r in roles.items() if r["role"] == "Mr. X"), None)
         if not mr_x_id:
-            print(f"[begin] No Mr. X found, roles={roles}")
+            command_log.warning("No Mr. X found, roles=%s", roles)
             await interaction.followup.send("❌ No Mr. X found. Please reset the game and try again.", ephemeral=True)
             return
         
-        turn_order = [mr_x_id] + [uid for uid, r in roles.items() if r["role"] == "Detective"]
-        current_turn_index = 0
-        print(f"[begin] Initialized game: turn_order={turn_order}, current_turn_index={current_turn_index}, mr_x_id={mr_x_id}, roles={roles}")
+        turn_order = game.turn_order = [mr_x_id] + [uid for uid, r in roles.items() if r["role"] == "Detective"]
+        game.current_turn_index = 0
+        game.suspects.start(detective_locations(game))
+        round_counter = game.round_counter
+        command_log.info("Initialized game: turn_order=%s, current_turn_index=%s, mr_x_id=%s, roles=%s", turn_order, game.current_turn_index, mr_x_id, roles)
 
         detectives = [f"<@{uid}> → *Detective* at location {roles[uid]['location']}"
                       for uid in turn_order if roles[uid]["role"] == "Detective"]
@@ -595,28 +698,28 @@ async def begin(interaction: discord.Interaction):
         )
         await interaction.followup.send(embed=embed)
 
-        await send_map(interaction.channel, interaction = interaction)
+        await send_map(game, session.key, interaction.channel, interaction = interaction)
 
         try:
-            mr_x = await interaction.guild.fetch_member(mr_x_id)
+            mr_x = await session.members.fetch(interaction.guild, mr_x_id)
             mr_x_location = roles[mr_x_id]["location"]
-            buffer = live_map.generate_map(roles, round_counter, zoom_player=mr_x_id,mr_x_id=mr_x_id)
-            print(f"[begin] Sending initial private map to Mr. X {mr_x_id} at location {mr_x_location}")
+            buffer = await render_map(game, session.key, zoom_player=mr_x_id)
+            command_log.info("Sending initial private map to Mr. X %s at location %s", mr_x_id, mr_x_location)
             await mr_x.send(
                 content=f"🔒 Your secret starting location is **{mr_x_location}** (Round {round_counter}):",
-                file=discord.File(buffer, 'zoom_map.png'),
-                embed=create_mr_x_notepad_embed()
+                file=discord.File(buffer, live_map.map_filename('zoom_map')),
+                embed=create_mr_x_notepad_embed(game)
             )
             await interaction.channel.send(f"🕶 Map sent to Mr. X privately.")
         except discord.Forbidden:
-            print(f"[begin] Failed to send DM to Mr. X {mr_x_id}: Forbidden")
+            command_log.warning("Failed to send DM to Mr. X %s: Forbidden", mr_x_id)
             await interaction.followup.send("❌ Couldn't send Mr. X their location. Please enable DMs.", ephemeral=True)
             return
 
         await interaction.followup.send(f"🎲 It's {mr_x.mention}'s turn! Use `/move <destination>` to make your move. (Round {round_counter})")
 
-    except Exception as e:
-        print(f"[begin] Error: {e}")
+    except Exception:
+        command_log.exception("Error")
         try:
             await interaction.followup.send("Failed to begin game. Please try again.", ephemeral=True)
         except:
@@ -627,49 +730,57 @@ async def begin(interaction: discord.Interaction):
 async def move(interaction: discord.Interaction, destination: int):
     try:
         user = interaction.user
-        current_player_id = get_current_player()
-        print(f"[move] User {user.id} attempting move to {destination}, current_player_id={current_player_id}, turn_order={turn_order}, current_turn_index={current_turn_index}")
+        session = sessions.for_interaction(interaction, create=False)
+        if not session:
+            await interaction.response.send_message("No game in this channel.", ephemeral=True)
+            return
+        game = session.state
+        roles = game.roles
+        current_player_id = get_current_player(game)
+        command_log.debug("User %s attempting move to %s, current_player_id=%s, turn_order=%s, current_turn_index=%s", user.id, destination, current_player_id, game.turn_order, game.current_turn_index)
 
         if user.id != current_player_id:
-            print(f"[move] Not user's turn: user_id={user.id}, current_player_id={current_player_id}")
+            command_log.debug("Not user's turn: user_id=%s, current_player_id=%s", user.id, current_player_id)
             await interaction.response.send_message("❌ It's not your turn!", ephemeral=True)
             return
 
         if user.id not in roles or not roles[user.id]["role"]:
-            print(f"[move] User {user.id} not in game or no role, roles={roles}")
+            command_log.debug("User %s not in game or no role, roles=%s", user.id, roles)
             await interaction.response.send_message("You're not in the game.", ephemeral=True)
             return
         
         if destination < 1 or destination > 200:
-            print(f"[move] Invalid destination: {destination}")
+            command_log.warning("Invalid destination: %s", destination)
             await interaction.response.send_message("Invalid destination!", ephemeral=True)
             return
 
         current = roles[user.id]["location"]
-        available = get_available_transports(user.id, current, destination)
+        available = get_available_transports(game, user.id, current, destination)
         if not available:
-            print(f"[move] No available transports for user {user.id} from {current} to {destination}")
+            command_log.debug("No available transports for user %s from %s to %s", user.id, current, destination)
             await interaction.response.send_message("You can't move there with any available transport.", ephemeral=True)
             return
 
-        view = TransportSelectView(user, destination, interaction)
-        print(f"[move] Presenting transport options for user {user.id} to {destination}")
+        view = TransportSelectView(session, user, destination, interaction)
+        command_log.debug("Presenting transport options for user %s to %s", user.id, destination)
         await interaction.response.send_message(
             f"Choose how to move to *{destination}*:",
             view=view,
             ephemeral=(roles[user.id]["role"] == "Mr. X")
         )
-    except Exception as e:
-        print(f"[move] Error: {e}")
+    except Exception:
+        command_log.exception("Error")
         await interaction.response.send_message("Error processing move. Please try again.", ephemeral=True)
 
 @client.tree.command(name="status", description="Check your current status in the game", guild=GUILD_ID)
 async def status(interaction: Interaction):
     try:
         user = interaction.user
+        session = sessions.for_interaction(interaction, create=False)
+        roles = session.state.roles if session else {}
 
         if user.id not in roles or not roles[user.id]["role"]:
-            print(f"[status] User {user.id} not in game or no role, roles={roles}")
+            command_log.info("User %s not in game or no role, roles=%s", user.id, roles)
             await interaction.response.send_message("You're not in the game.", ephemeral=True)
             return
 
@@ -687,22 +798,24 @@ async def status(interaction: Interaction):
             status_message += f"**Black Tickets**: {black_tickets}"
         else:
             status_message += f"**Tickets**:\n{ticket_info}\n"
-        print(f"[status] User {user.id} status: role={role}, location={location}, tickets={tickets}, black_tickets={black_tickets}")
+        command_log.info("User %s status: role=%s, location=%s, tickets=%s, black_tickets=%s", user.id, role, location, tickets, black_tickets)
         await interaction.response.send_message(status_message, ephemeral=True)
-    except Exception as e:
-        print(f"[status] Error: {e}")
+    except Exception:
+        command_log.exception("Error")
         await interaction.response.send_message("Error fetching status. Please try again.", ephemeral=True)
 
 @client.tree.command(name="endgame", description="End the current game and reset", guild=GUILD_ID)
 async def endgame(interaction: discord.Interaction):
     try:
-        if not roles:
-            print(f"[endgame] No game in progress, roles={roles}")
+        session = sessions.for_interaction(interaction, create=False)
+        if not session or not session.state.roles:
+            command_log.info("No game in progress in channel %s", interaction.channel_id)
             await interaction.response.send_message("No game in progress.", ephemeral=True)
             return
 
-        reset_game_state()
-        print(f"[endgame] Game ended and state reset")
+        reset_game_state(session.state, session.key)
+        sessions.remove(interaction.guild_id, interaction.channel_id)
+        command_log.info("Game ended and state reset")
         
         # Create embed for game ended message
         embed = discord.Embed(
@@ -712,8 +825,8 @@ async def endgame(interaction: discord.Interaction):
         )
         await interaction.response.send_message(embed=embed, ephemeral=False)
         
-    except Exception as e:
-        print(f"[endgame] Error: {e}")
+    except Exception:
+        command_log.exception("Error")
         await interaction.response.send_message("Error ending game. Please try again.",ephemeral=True)
 
 @client.tree.command(name="moves", description="Show possible moves and tickets from your current location", guild=GUILD_ID)
@@ -721,9 +834,11 @@ async def moves(interaction: discord.Interaction):
     try:
         await interaction.response.defer(ephemeral=True)
         user_id = interaction.user.id
+        session = sessions.for_interaction(interaction, create=False)
+        roles = session.state.roles if session else {}
 
         if not roles or user_id not in roles:
-            print(f"[moves] User {user_id} not in game, roles={roles}")
+            command_log.info("User %s not in game, roles=%s", user_id, roles)
             await interaction.followup.send("You are not in the game. Join with `/join`.", ephemeral=True)
             return
 
@@ -732,18 +847,18 @@ async def moves(interaction: discord.Interaction):
         role = role_info.get("role")
 
         if not current_location or not role:
-            print(f"[moves] Invalid role or location for user {user_id}: role={role}, location={current_location}")
+            command_log.warning("Invalid role or location for user %s: role=%s, location=%s", user_id, role, current_location)
             await interaction.followup.send("Your location or role is not set. Start the game with `/begin`.", ephemeral=True)
             return
 
         if role == "Mr. X":
-            print(f"[moves] User {user_id} is Mr. X, command restricted")
+            command_log.info("User %s is Mr. X, command restricted", user_id)
             await interaction.followup.send("This command is for detectives only.", ephemeral=True)
             return
 
         possible_moves = live_map.get_possible_moves(current_location, roles, is_mr_x=False)
         if "error" in possible_moves:
-            print(f"[moves] Error for user {user_id}: {possible_moves['error']}")
+            command_log.info("Error for user %s: %s", user_id, possible_moves['error'])
             await interaction.followup.send(possible_moves["error"], ephemeral=True)
             return
 
@@ -753,23 +868,79 @@ async def moves(interaction: discord.Interaction):
             color=discord.Color.blue()
         )
 
+        # Once Mr. X has been seen, rank destinations by how close they get to him
+        suspects = session.state.suspects.candidates() if session.state.suspects.origin is not None else []
+        closeness = {dest: live_map.DISTANCES.nearest(dest, suspects)[0] for dest in possible_moves} if suspects else {}
         moves_list = []
-        for dest, tickets in sorted(possible_moves.items()):
+        for dest, tickets in sorted(possible_moves.items(), key=lambda item: (closeness.get(item[0]) is None, closeness.get(item[0]) or 0, item[0])):
             tickets_str = ", ".join(tickets)
-            moves_list.append(f"Station **{dest}**: {tickets_str}")
+            hint = f" ({closeness[dest]} from a Mr. X suspect)" if closeness.get(dest) is not None else ""
+            moves_list.append(f"Station **{dest}**: {tickets_str}{hint}")
         if not moves_list:
             embed.add_field(name="No Moves Available", value="All possible destinations are occupied or invalid.", inline=False)
         else:
             embed.add_field(name="Destinations", value="\n".join(moves_list), inline=False)
 
+        # Look further ahead, only along routes this detective's tickets can pay for
+        depth = reachability.PLAN_DEPTH
+        reach = live_map.REACHABILITY.reachable(current_location, role_info["tickets"], depth)
+        counts = [sum(1 for moves in reach.values() if moves == step) for step in range(1, depth + 1)]
+        embed.add_field(
+            name=f"Within {depth} Moves",
+            value=", ".join(f"{count} station(s) in {step}" for step, count in enumerate(counts, 1)),
+            inline=False
+        )
+        if suspects:
+            route = live_map.REACHABILITY.plan(current_location, role_info["tickets"], suspects, depth)
+            if route:
+                plan = " → ".join(f"{mode.capitalize()} to **{dest}**" for mode, dest in route)
+            else:
+                plan = f"No suspect station within {depth} moves with your tickets."
+            embed.add_field(name="Plan to the Nearest Suspect", value=plan, inline=False)
+
        
         await interaction.followup.send(embed=embed, ephemeral=False)  # Public for detectives
-        print(f"[moves] Sent public moves for detective {user_id} (role={role}, location={current_location}): {possible_moves}")
+        command_log.info("Sent public moves for detective %s (role=%s, location=%s): %s", user_id, role, current_location, possible_moves)
 
-    except Exception as e:
-        print(f"[moves] Error: {type(e).__name__}: {e}")
+    except Exception:
+        command_log.exception("Error")
         await interaction.followup.send("Error calculating possible moves. Please check bot configuration.", ephemeral=True)
 
+@client.tree.command(name="suspects", description="Show where Mr. X could be hiding", guild=GUILD_ID)
+async def suspects(interaction: discord.Interaction):
+    try:
+        await interaction.response.defer()
+        session = sessions.for_interaction(interaction, create=False)
+        if not session or not session.state.turn_order:
+            command_log.info("No game in progress in channel %s", interaction.channel_id)
+            await interaction.followup.send("No game in progress.", ephemeral=True)
+            return
+        game = session.state
+        candidates = game.suspects.candidates()
+        command_log.info("Round %s: %s candidates, origin=%s", game.round_counter, len(candidates), game.suspects.origin)
+
+        if game.suspects.origin is None:
+            source = "Mr. X has not been revealed yet."
+        else:
+            source = f"Last seen at **{game.suspects.origin}**, {game.suspects.moves_since_reveal} move(s) ago."
+        if len(candidates) <= 60:
+            listed = ", ".join(str(node) for node in candidates)
+        else:
+            listed = f"{len(candidates)} stations"
+        embed = discord.Embed(
+            title=f"🔎 Mr. X Suspects (Round {game.round_counter})",
+            description=f"{source}\nMr. X could be at: {listed or 'nowhere - check the ticket log'}",
+            color=discord.Color.orange()
+        )
+        buffer = await render_map(game, session.key, heat=game.suspects.heat())
+        if buffer is None:
+            await interaction.followup.send(embed=embed)
+            return
+        await interaction.followup.send(embed=embed, file=discord.File(buffer, live_map.map_filename('suspects')))
+    except Exception:
+        command_log.exception("Error")
+        await interaction.followup.send("Error computing suspects. Please try again.", ephemeral=True)
+
 @client.tree.command(name="help", description="Show all commands and game rules", guild=GUILD_ID)
 async def help(interaction: discord.Interaction):
     embed = discord.Embed(
@@ -788,6 +959,7 @@ async def help(interaction: discord.Interaction):
         /move <location> - Move to a numbered location (1-200)
         /status - Check your location and tickets
         /moves - List of all possible moves detective can make
+        /suspects - Where Mr. X could be, with a heatmap
         /endgame - Force stop the current game
         """,
         inline=False
@@ -825,19 +997,32 @@ async def help(interaction: discord.Interaction):
 async def sync(ctx):
     try:
         synced = await ctx.bot.tree.sync(guild=GUILD_ID)
-        print(f"[sync] Synced {len(synced)} commands")
+        command_log.info("Synced %s commands", len(synced))
         await ctx.send(f"✅ Synced {len(synced)} commands to the current guild.")
     except Exception as e:
-        print(f"[sync] Error: {e}")
+        command_log.exception("Error")
         await ctx.send(f"❌ Failed to sync commands: {e}")
 
+@client.event
+async def on_member_update(before, after):
+    sessions.member_updated(after)
+
+@client.event
+async def on_member_remove(member):
+    sessions.member_removed(member.guild.id, member.id)
+
 @client.event
 async def on_ready():
-    print(f"[on_ready] Logged in as {client.user}")
+    command_log.info("Logged in as %s", client.user)
+    startup.ready()
+    if not sessions.evictor_running:
+        client.loop.create_task(sessions.run_evictor())
     try:
         synced = await client.tree.sync(guild=GUILD_ID)
-        print(f"[on_ready] Synced commands ({len(synced)}): {[cmd.name for cmd in synced]}")
-    except Exception as e:
-        print(f"[on_ready] Error syncing commands: {e}")
+        command_log.info("Synced commands (%s): %s", len(synced), [cmd.name for cmd in synced])
+    except Exception:
+        command_log.exception("Error syncing commands")
 
-client.run("TOKEN")
+if __name__ == "__main__":
+    startup.mark("imports")
+    client.run("TOKEN")
@@ -1,8 +1,49 @@
 from collections import defaultdict, deque
 import os
 import live_map
+import graph_index
+import reachability
+from suspects import SuspectTracker
+from history import EventLog, Seated, Moved
 import discord
 
+class TrappedTracker:
+    """Caches which players have no legal move, re-checking only players whose location or tickets changed."""
+
+    def __init__(self):
+        self._state = {}
+        self.checks = 0
+
+    def is_trapped(self, player_id, location, tickets):
+        """Return True if the player cannot move from location with these tickets."""
+        # Only "has at least one ticket of each mode" matters, so spending a ticket
+        # that is not the last of its kind keeps the cached answer valid.
+        signature = (location, tuple(tickets.get(mode, 0) > 0 for mode in graph_index.MODES))
+        cached = self._state.get(player_id)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        self.checks += 1
+        trapped = not live_map.GRAPH.has_move(location, tickets)
+        self._state[player_id] = (signature, trapped)
+        return trapped
+
+    def doomed_within(self, location, tickets, turns):
+        """Return the moves left if every route from location runs out of tickets within turns, else None."""
+        if turns <= 0:
+            return None
+        moves_left = live_map.REACHABILITY.moves_left(location, tickets, turns)
+        return moves_left if moves_left < turns else None
+
+    def trapped_players(self):
+        """Return the ids of players last seen trapped."""
+        return {player_id for player_id, (_, trapped) in self._state.items() if trapped}
+
+    def forget(self, player_id):
+        self._state.pop(player_id, None)
+
+    def reset(self):
+        self._state = {}
+
 class GameState:
     def __init__(self):
         self.joined_players = []
@@ -20,6 +61,10 @@ class GameState:
         self.BASE_DIR = os.path.dirname(os.path.abspath(__file__))
         self.player_tickets = defaultdict(lambda: {"taxi": 12, "bus": 8, "metro": 4, "black": 5})
         self.player_locations = {}
+        self.trapped = TrappedTracker()
+        self.suspects = SuspectTracker()
+        self.trap_warnings = {}  # detective id -> moves left before they are stuck
+        self.history = EventLog()
 
     def reset(self):
         """Fully reset all game state variables."""
@@ -33,6 +78,98 @@ class GameState:
         self.mr_x_id = None
         self.player_tickets = defaultdict(lambda: {"taxi": 12, "bus": 8, "metro": 4, "black": 5})
         self.player_locations = {}
+        self.trapped.reset()
+        self.suspects.reset()
+        self.trap_warnings = {}
+        self.history = EventLog()
+
+    def fold(self, event):
+        """Apply one history event to the state; returns the end message if a move ended the game."""
+        if isinstance(event, Seated):
+            self.roles = dict(event.roles)
+            self.joined_players = [player_id for player_id, _ in event.roles]
+            self.mr_x_id = event.mr_x_id
+            self.player_locations = dict(event.locations)
+            self.turn_order = list(event.turn_order)
+            self.current_turn_index = 0
+            for player_id in self.turn_order:
+                self.player_tickets[player_id]  # hand out the starting tickets
+            self.suspects.start(self.detective_locations())
+            return None
+        self.execute_move(event.player, event.dest, event.ticket)
+        end_message = self.check_end_conditions()
+        if not end_message:
+            self.advance_turn()
+        return end_message
+
+    def apply(self, event):
+        """Fold event into the game and record it in the history."""
+        end_message = self.fold(event)
+        self.history.record(event, self)
+        return end_message
+
+    def undo(self):
+        """Take back the last move; returns the Moved event undone, or None if there is none."""
+        if not self.history.events or not isinstance(self.history.events[-1], Moved):
+            return None
+        history = self.history
+        event = history.pop()
+        previous = history.state_at(len(history), type(self))
+        # Keep this object (sessions, views and map caches refer to it) and take the rebuilt fields
+        self.__dict__.update(previous.__dict__)
+        self.history = history
+        return event
+
+    def to_dict(self, history=True):
+        """Return a copy of the game as JSON-safe data; dicts keyed by player id become [id, value] pairs."""
+        data = {
+            "joined_players": list(self.joined_players),
+            "roles": list(self.roles.items()),
+            "turn_order": list(self.turn_order),
+            "current_turn_index": self.current_turn_index,
+            "mr_x_ticket_log": list(self.mr_x_ticket_log),
+            "mr_x_move_history": list(self.mr_x_move_history),
+            "round_counter": self.round_counter,
+            "mr_x_id": self.mr_x_id,
+            "player_tickets": [(player_id, dict(tickets)) for player_id, tickets in self.player_tickets.items()],
+            "player_locations": list(self.player_locations.items()),
+            "suspects": self.suspects.to_dict(),
+            "trap_warnings": list(self.trap_warnings.items()),
+        }
+        if history:
+            data["history"] = self.history.to_list()
+        return data
+
+    @classmethod
+    def from_dict(cls, data, history=True):
+        """Rebuild a game saved with to_dict."""
+        game = cls()
+        if history and "history" in data:
+            game.history = EventLog.from_list(data["history"])
+        game.joined_players = list(data["joined_players"])
+        game.roles = dict(data["roles"])
+        game.turn_order = list(data["turn_order"])
+        game.current_turn_index = data["current_turn_index"]
+        game.mr_x_ticket_log.extend(data["mr_x_ticket_log"])
+        game.mr_x_move_history = list(data["mr_x_move_history"])
+        game.round_counter = data["round_counter"]
+        game.mr_x_id = data["mr_x_id"]
+        game.player_tickets.update((player_id, dict(tickets)) for player_id, tickets in data["player_tickets"])
+        game.player_locations = dict(data["player_locations"])
+        game.suspects.restore(data["suspects"])
+        game.trap_warnings = dict(data["trap_warnings"])
+        return game
+
+    def get_map_roles(self):
+        """Return {player_id: {"role", "location"}} in the shape live_map.generate_map expects."""
+        return {
+            player_id: {"role": self.roles.get(player_id), "location": location}
+            for player_id, location in self.player_locations.items()
+        }
+
+    def detective_locations(self):
+        """Return the locations of every player except Mr. X."""
+        return [location for player_id, location in self.player_locations.items() if player_id != self.mr_x_id]
 
     def load_map_from_file(self, filename):
         """Load map data from a file."""
@@ -42,24 +179,16 @@ class GameState:
 
     def get_available_transports(self, user_id, current, dest):
         """Get available transport options between two locations."""
-        available = []
+        transports = live_map.GRAPH.modes_between(current, dest)
         if user_id == self.mr_x_id:
-            # Mr. X can use any transport
-            if live_map.is_connected(current, dest, "taxi"):
-                available.append("taxi")
-            if live_map.is_connected(current, dest, "bus"):
-                available.append("bus")
-            if live_map.is_connected(current, dest, "metro"):
-                available.append("metro")
-        else:
-            # Detectives can only use available tickets
-            if live_map.is_connected(current, dest, "taxi") and self.player_tickets[user_id]["taxi"] > 0:
-                available.append("taxi")
-            if live_map.is_connected(current, dest, "bus") and self.player_tickets[user_id]["bus"] > 0:
-                available.append("bus")
-            if live_map.is_connected(current, dest, "metro") and self.player_tickets[user_id]["metro"] > 0:
-                available.append("metro")
-        return available
+            # Mr. X can use any transport, or a black ticket to hide which one
+            options = list(transports)
+            if options and self.player_tickets[user_id]["black"] > 0:
+                options.append("black")
+            return options
+        # Detectives can only use available tickets
+        tickets = self.player_tickets[user_id]
+        return [transport for transport in transports if tickets[transport] > 0]
 
     def get_current_player(self):
         """Get the player whose turn it is."""
@@ -72,6 +201,8 @@ class GameState:
         self.current_turn_index = (self.current_turn_index + 1) % len(self.turn_order)
         if self.current_turn_index == 0:
             self.round_counter += 1
+            if self.round_counter in live_map.REVEAL_ROUNDS and self.mr_x_id in self.player_locations:
+                self.suspects.reveal(self.player_locations[self.mr_x_id])
 
     def check_end_conditions(self):
         """Check if the game has ended."""
@@ -89,16 +220,21 @@ class GameState:
                 if player_id != self.mr_x_id and self.player_locations.get(player_id) == mr_x_location:
                     return "Detectives win! They caught Mr. X."
         else:
-            # Check if detective has any valid moves
+            # Check if the detective landed on Mr. X, then if they have any valid moves
             current_location = self.player_locations.get(current_player)
+            if current_location and current_location == self.player_locations.get(self.mr_x_id):
+                return "Detectives win! They caught Mr. X."
             if current_location:
-                has_valid_moves = False
-                for dest in live_map.get_connected_nodes(current_location):
-                    if self.get_available_transports(current_player, current_location, dest):
-                        has_valid_moves = True
-                        break
-                if not has_valid_moves:
+                tickets = self.player_tickets[current_player]
+                if self.trapped.is_trapped(current_player, current_location, tickets):
                     return "Mr. X wins! A detective is trapped with no valid moves."
+                # Not stuck yet, but maybe every route runs dry before the game ends
+                turns = min(reachability.TRAP_WARNING_TURNS, self.MAX_ROUNDS - self.round_counter + 1)
+                moves_left = self.trapped.doomed_within(current_location, tickets, turns)
+                if moves_left is None:
+                    self.trap_warnings.pop(current_player, None)
+                else:
+                    self.trap_warnings[current_player] = moves_left
         
         return None
 
@@ -130,7 +266,13 @@ class GameState:
         if not live_map.is_connected(current_location, destination, transport):
             return False, "Invalid move: No connection between locations with that transport."
         
-        if user_id != self.mr_x_id:
+        if transport == "black":
+            # Black tickets hide the transport used; only Mr. X has them
+            if user_id != self.mr_x_id:
+                return False, "Only Mr. X can use black tickets."
+            if self.player_tickets[user_id]["black"] <= 0:
+                return False, "You don't have any black tickets left."
+        elif user_id != self.mr_x_id:
             if self.player_tickets[user_id][transport] <= 0:
                 return False, f"You don't have any {transport} tickets left."
         
@@ -141,7 +283,14 @@ class GameState:
         self.player_locations[user_id] = destination
         if user_id != self.mr_x_id:
             self.player_tickets[user_id][transport] -= 1
+            self.suspects.detectives_at([destination])
         else:
+            if transport == "black":
+                self.player_tickets[user_id]["black"] -= 1
+            if self.round_counter in live_map.REVEAL_ROUNDS:
+                self.suspects.reveal(destination)
+            else:
+                self.suspects.mr_x_moved(transport, self.detective_locations())
             self.mr_x_ticket_log.append(transport)
             if len(self.mr_x_move_history) < self.round_counter:
                 self.mr_x_move_history.append(f"Used {transport} to {destination}")
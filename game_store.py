@@ -0,0 +1,226 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import compact_state
+from history import Moved
+from logs import get_logger
+
+log = get_logger("store")
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SYNC_MODES = ("off", "normal", "full")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (key TEXT PRIMARY KEY, seq INTEGER NOT NULL, state BLOB NOT NULL);
+CREATE TABLE IF NOT EXISTS log (key TEXT NOT NULL, seq INTEGER NOT NULL, entry TEXT NOT NULL, PRIMARY KEY (key, seq));
+"""
+
+_STOP = object()
+
+
+def encode_key(key):
+    """Session keys are (guild_id, channel_id) tuples; store them as JSON text."""
+    return json.dumps(list(key))
+
+
+def decode_key(text):
+    return tuple(json.loads(text))
+
+
+def encode_state(game_state):
+    """Return a snapshot payload: compact_state bytes, or to_dict JSON text for games it cannot pack."""
+    try:
+        return compact_state.pack(game_state)
+    except ValueError:
+        return json.dumps(game_state.to_dict(), separators=(",", ":"))
+
+
+def decode_state(payload, factory):
+    """Return a new factory() game from an encode_state payload (stores written before compact snapshots hold JSON)."""
+    if isinstance(payload, bytes):
+        return compact_state.unpack(payload, factory)
+    return factory.from_dict(json.loads(payload))
+
+
+def apply_move(game_state, entry):
+    """Replay one logged move into the game and its history, the way bot.py plays a turn."""
+    game_state.apply(Moved(entry["player"], entry["dest"], entry["ticket"]))
+
+
+class GameStore:
+    """Durable game storage: a SQLite write-ahead log of moves plus periodic snapshots.
+
+    Every move appends one small log row; every snapshot_every moves (and on
+    joins, /begin and other non-move changes) the whole game is written as a
+    compact snapshot and its older log rows are deleted. Writes are queued to a single
+    writer thread that commits whatever has queued up in one transaction, so
+    no command waits on SQLite or fsync. A crash loses at most the writes
+    still in the queue, typically the last few milliseconds.
+    """
+
+    def __init__(self, path, snapshot_every=20, sync="normal"):
+        if sync not in SYNC_MODES:
+            raise ValueError(f"Unknown store sync mode {sync!r}")
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.sync = sync
+        self._seq = {}              # key -> seq of the last queued log entry
+        self._snapshot_seq = {}     # key -> seq of the last queued snapshot
+        self._queue = queue.Queue()
+        self._thread = None
+        self.moves = 0
+        self.snapshots = 0
+        self.drops = 0
+        self.batches = 0
+        self.errors = 0
+        self.move_bytes = 0
+        self.snapshot_bytes = 0
+
+    @classmethod
+    def from_env(cls):
+        """Build a store from GAME_STORE (empty disables it), GAME_SNAPSHOT_EVERY and GAME_STORE_SYNC."""
+        path = os.getenv("GAME_STORE", os.path.join(BASE_DIR, "cache", "games.sqlite3"))
+        if not path:
+            return None
+        return cls(
+            path,
+            snapshot_every=int(os.getenv("GAME_SNAPSHOT_EVERY", "20")),
+            sync=os.getenv("GAME_STORE_SYNC", "normal"),
+        )
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(f"PRAGMA synchronous={self.sync.upper()}")
+        connection.executescript(_SCHEMA)
+        return connection
+
+    # ---------- Recovery ----------
+    def load(self):
+        """Return {session key: (snapshot payload, [log entries after it, in order])}.
+
+        Rebuild a game with decode_state(payload, GameState), then apply_move each entry.
+
+        Call before the first write; it also seeds the sequence counters.
+        """
+        connection = self._connect()
+        try:
+            games = {}
+            for key, seq, state in connection.execute("SELECT key, seq, state FROM snapshots"):
+                games[key] = (state, [])
+                self._seq[key] = self._snapshot_seq[key] = seq
+            rows = connection.execute(
+                "SELECT log.key, log.seq, log.entry FROM log JOIN snapshots ON log.key = snapshots.key "
+                "WHERE log.seq > snapshots.seq ORDER BY log.key, log.seq")
+            for key, seq, entry in rows:
+                games[key][1].append(json.loads(entry))
+                self._seq[key] = seq
+        finally:
+            connection.close()
+        return {decode_key(key): game for key, game in games.items()}
+
+    # ---------- Writes (called from the event loop, never block) ----------
+    def _put(self, item):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._writer, name="game-store", daemon=True)
+            self._thread.start()
+        self._queue.put(item)
+
+    def save(self, key, game_state):
+        """Queue a snapshot of the whole game."""
+        key = encode_key(key)
+        seq = self._seq.get(key, 0)
+        state = encode_state(game_state)
+        self._snapshot_seq[key] = seq
+        self.snapshots += 1
+        self.snapshot_bytes += len(state)
+        self._put(("snapshot", key, seq, state))
+
+    def record_move(self, key, game_state, player_id, dest, ticket):
+        """Queue a logged move; also snapshots the game every snapshot_every moves."""
+        encoded = encode_key(key)
+        seq = self._seq.get(encoded, 0) + 1
+        self._seq[encoded] = seq
+        entry = json.dumps({"player": player_id, "dest": dest, "ticket": ticket}, separators=(",", ":"))
+        self.moves += 1
+        self.move_bytes += len(entry)
+        self._put(("log", encoded, seq, entry))
+        if seq - self._snapshot_seq.get(encoded, 0) >= self.snapshot_every:
+            self.save(key, game_state)
+
+    def drop(self, key):
+        """Queue deletion of a finished or abandoned game."""
+        key = encode_key(key)
+        self._seq.pop(key, None)
+        self._snapshot_seq.pop(key, None)
+        self.drops += 1
+        self._put(("drop", key, None, None))
+
+    # ---------- Writer thread ----------
+    def _write(self, connection, op, key, seq, payload):
+        if op == "log":
+            connection.execute("INSERT OR REPLACE INTO log (key, seq, entry) VALUES (?, ?, ?)", (key, seq, payload))
+        elif op == "snapshot":
+            connection.execute("INSERT OR REPLACE INTO snapshots (key, seq, state) VALUES (?, ?, ?)",
+                               (key, seq, payload))
+            connection.execute("DELETE FROM log WHERE key = ? AND seq <= ?", (key, seq))
+        else:
+            connection.execute("DELETE FROM snapshots WHERE key = ?", (key,))
+            connection.execute("DELETE FROM log WHERE key = ?", (key,))
+
+    def _writer(self):
+        connection = self._connect()
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with connection:
+                    for item in batch:
+                        if item is _STOP:
+                            stopping = True
+                        else:
+                            self._write(connection, *item)
+                self.batches += 1
+            except sqlite3.Error as e:
+                self.errors += 1
+                log.error("Failed to write %s change(s): %s", len(batch), e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        connection.close()
+
+    def flush(self):
+        """Block until every queued write is committed (tests, benchmarks and shutdown)."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        """Commit what is queued and stop the writer thread."""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        logical = self.move_bytes
+        return {
+            "moves": self.moves,
+            "snapshots": self.snapshots,
+            "drops": self.drops,
+            "batches": self.batches,
+            "errors": self.errors,
+            "pending": self._queue.qsize(),
+            "move_bytes": self.move_bytes,
+            "snapshot_bytes": self.snapshot_bytes,
+            # Bytes handed to SQLite per byte of move data
+            "write_amplification": (self.move_bytes + self.snapshot_bytes) / logical if logical else 0.0,
+        }
+
@@ -0,0 +1,169 @@
+import os
+from logs import get_logger
+
+log = get_logger("maps")
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, 'text_files')
+
+# Canonical transport modes; connections.txt calls the metro "underground"
+MODES = ("taxi", "bus", "metro")
+MODE_ALIASES = {"underground": "metro"}
+MODE_FILES = {"taxi": "taxi_map.txt", "bus": "bus_map.txt", "metro": "metro_map.txt"}
+
+
+def normalize_mode(mode):
+    """Map a ticket/transport name ("Taxi", "underground", ...) to its canonical mode."""
+    mode = mode.lower()
+    return MODE_ALIASES.get(mode, mode)
+
+
+class GraphIndex:
+    """Compiled, read-only adjacency index over the board with O(1) edge lookups.
+
+    Each node has one integer bitmask per mode (bit b set = edge to node b), so
+    "is (a, b) connected via m" is a shift and a mask. Sorted neighbour tuples and
+    the mode tuple of every edge are precomputed as well.
+    """
+
+    def __init__(self, edges):
+        masks = {mode: {} for mode in MODES}
+        for a, b, mode in edges:
+            mode = normalize_mode(mode)
+            if mode not in masks:
+                raise ValueError(f"Unknown transport mode {mode!r}")
+            masks[mode][a] = masks[mode].get(a, 0) | (1 << b)
+            masks[mode][b] = masks[mode].get(b, 0) | (1 << a)
+
+        self.masks = masks
+        self.any_mask = {}
+        for mode_masks in masks.values():
+            for node, mask in mode_masks.items():
+                self.any_mask[node] = self.any_mask.get(node, 0) | mask
+        self.nodes = tuple(sorted(self.any_mask))
+
+        self._exit_modes = {
+            node: tuple(mode for mode in MODES if masks[mode].get(node, 0)) for node in self.nodes
+        }
+        self._neighbors = {}
+        self._pair_modes = {}
+        self._edges = {}
+        for node in self.nodes:
+            self._neighbors[node, None] = _bits(self.any_mask[node])
+            for mode in MODES:
+                self._neighbors[node, mode] = _bits(masks[mode].get(node, 0))
+            for dest in self._neighbors[node, None]:
+                self._pair_modes[node, dest] = tuple(
+                    mode for mode in MODES if masks[mode].get(node, 0) >> dest & 1
+                )
+            self._edges[node] = tuple(
+                (dest, self._pair_modes[node, dest]) for dest in self._neighbors[node, None]
+            )
+        self._expand_tables = {}
+
+    def is_connected(self, a, b, mode=None):
+        """True if a and b share an edge via mode (any mode if None or "black")."""
+        if mode is None or mode == "black":
+            return bool(self.any_mask.get(a, 0) >> b & 1)
+        mode_masks = self.masks.get(normalize_mode(mode))
+        if mode_masks is None:
+            return False
+        return bool(mode_masks.get(a, 0) >> b & 1)
+
+    def modes_between(self, a, b):
+        """Return the modes connecting a and b, in MODES order."""
+        return self._pair_modes.get((a, b), ())
+
+    def neighbors(self, node, mode=None):
+        """Return the sorted neighbours of node via mode (any mode if None)."""
+        if mode is not None:
+            mode = normalize_mode(mode)
+        return self._neighbors.get((node, mode), ())
+
+    def edges(self, node):
+        """Return ((dest, modes), ...) for every neighbour of node, sorted by dest."""
+        return self._edges.get(node, ())
+
+    def exit_modes(self, node):
+        """Return the modes that leave node along at least one edge."""
+        return self._exit_modes.get(node, ())
+
+    def has_move(self, node, tickets):
+        """True if some edge out of node uses a mode the ticket counts still allow."""
+        for mode in self._exit_modes.get(node, ()):
+            if tickets.get(mode, 0) > 0:
+                return True
+        return False
+
+    def neighbor_mask(self, node, mode=None):
+        """Return the raw neighbour bitmask of node via mode (any mode if None)."""
+        if mode is None or mode == "black":
+            return self.any_mask.get(node, 0)
+        return self.masks[normalize_mode(mode)].get(node, 0)
+
+    def all_mask(self):
+        """Return the bitmask with every node on the board set."""
+        mask = 0
+        for node in self.nodes:
+            mask |= 1 << node
+        return mask
+
+    def _expand_table(self, mode):
+        """Per-byte lookup tables: table[i][v] = neighbours of the nodes set in byte i of a mask being v."""
+        table = self._expand_tables.get(mode)
+        if table is None:
+            table = []
+            for chunk in range(max(self.nodes) // 8 + 1):
+                row = [0] * 256
+                for value in range(1, 256):
+                    low = value & -value
+                    row[value] = row[value ^ low] | self.neighbor_mask(chunk * 8 + low.bit_length() - 1, mode)
+                table.append(row)
+            self._expand_tables[mode] = table
+        return table
+
+    def expand(self, mask, mode=None):
+        """Return the mask of every node one mode edge away from a node in mask (any mode if None or "black")."""
+        if mode is not None and mode != "black":
+            mode = normalize_mode(mode)
+        else:
+            mode = None
+        table = self._expand_table(mode)
+        result = 0
+        for row in table:
+            if not mask:
+                break
+            byte = mask & 0xFF
+            if byte:
+                result |= row[byte]
+            mask >>= 8
+        return result
+
+    def __contains__(self, node):
+        return node in self.any_mask
+
+
+def _bits(mask):
+    """Return the indexes of the set bits of mask in ascending order."""
+    nodes = []
+    while mask:
+        low = mask & -mask
+        nodes.append(low.bit_length() - 1)
+        mask ^= low
+    return tuple(nodes)
+
+
+def source_files(data_dir=DATA_DIR):
+    """Return [(path, mode)] of the edge files the map package is compiled from (mode None = connections.txt format)."""
+    sources = [(os.path.join(data_dir, 'connections.txt'), None)]
+    sources += [(os.path.join(data_dir, filename), mode) for mode, filename in MODE_FILES.items()]
+    return sources
+
+
+def load_graph_index(path=None):
+    """Build the index from the compiled map package (map_data.MAP_DATA_PATH by default)."""
+    import map_data  # map_data imports this module for the modes and the source files
+    edges = map_data.load(path).edges
+    index = GraphIndex(edges)
+    log.info("Indexed %s edges over %s nodes", len(edges), len(index.nodes))
+    return index
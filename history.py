@@ -0,0 +1,113 @@
+import os
+from typing import NamedTuple
+
+# Events between cached checkpoints; rebuilding any past state folds at most this many
+CHECKPOINT_EVERY = int(os.getenv("HISTORY_CHECKPOINT_EVERY", "16"))
+
+
+class Seated(NamedTuple):
+    """/begin placed everyone: roles and locations as (player_id, value) pairs, plus the turn order."""
+    roles: tuple
+    mr_x_id: int
+    locations: tuple
+    turn_order: tuple
+
+
+class Moved(NamedTuple):
+    """A player moved to dest with ticket ("taxi", "bus", "metro" or "black")."""
+    player: int
+    dest: int
+    ticket: str
+
+
+EVENT_TYPES = {"seated": Seated, "moved": Moved}
+_EVENT_NAMES = {cls: name for name, cls in EVENT_TYPES.items()}
+
+
+def encode_event(event):
+    """Return an event as a compact JSON-safe list: [type, field, ...]."""
+    return [_EVENT_NAMES[type(event)], *event]
+
+
+def decode_event(data):
+    name, *fields = data
+    if name == "seated":
+        roles, mr_x_id, locations, turn_order = fields
+        return Seated(tuple(map(tuple, roles)), mr_x_id, tuple(map(tuple, locations)), tuple(turn_order))
+    return EVENT_TYPES[name](*fields)
+
+
+class EventLog:
+    """The immutable events a game was built from, with cached checkpoints.
+
+    A checkpoint is GameState.to_dict() after every CHECKPOINT_EVERY-th event,
+    so state_at(n) starts from the nearest checkpoint at or before n and folds
+    fewer than CHECKPOINT_EVERY events. Checkpoints are only kept in memory;
+    a log loaded from storage recreates them as state_at passes them.
+    """
+
+    def __init__(self, events=(), checkpoint_every=None):
+        self.events = list(events)
+        self.checkpoint_every = checkpoint_every or CHECKPOINT_EVERY
+        self._checkpoints = {}
+        self.folds = 0
+
+    def __len__(self):
+        return len(self.events)
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def record(self, event, state):
+        """Append an event that state has just applied."""
+        self.events.append(event)
+        if len(self.events) % self.checkpoint_every == 0:
+            self._checkpoints[len(self.events)] = state.to_dict(history=False)
+
+    def pop(self):
+        """Remove and return the last event (None if empty), forgetting checkpoints past the new end."""
+        if not self.events:
+            return None
+        event = self.events.pop()
+        self._checkpoints.pop(len(self.events) + 1, None)
+        return event
+
+    def state_at(self, index, factory):
+        """Return a new factory() state as it was after the first index events (without history)."""
+        index = max(0, min(index, len(self.events)))
+        start = index - index % self.checkpoint_every
+        while start and start not in self._checkpoints:
+            start -= self.checkpoint_every
+        state = factory.from_dict(self._checkpoints[start], history=False) if start else factory()
+        for position in range(start, index):
+            state.fold(self.events[position])
+            self.folds += 1
+            if (position + 1) % self.checkpoint_every == 0:
+                self._checkpoints.setdefault(position + 1, state.to_dict(history=False))
+        return state
+
+    def round_start(self, round_number):
+        """Return the number of events before round_number began (None if it has not begun)."""
+        if round_number == 1:
+            return 1 if self.events else None
+        # Each full round is one Moved event per player in the turn order
+        seated = self.events[0] if self.events else None
+        if not isinstance(seated, Seated):
+            return None
+        index = 1 + (round_number - 1) * len(seated.turn_order)
+        return index if index <= len(self.events) else None
+
+    def moves_in_round(self, round_number):
+        """Return the Moved events of one round."""
+        start = self.round_start(round_number)
+        if start is None:
+            return []
+        end = self.round_start(round_number + 1) or len(self.events)
+        return self.events[start:end]
+
+    def to_list(self):
+        return [encode_event(event) for event in self.events]
+
+    @classmethod
+    def from_list(cls, data, checkpoint_every=None):
+        return cls([decode_event(item) for item in data], checkpoint_every)
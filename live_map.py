@@ -1,14 +1,23 @@
-import io
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 import os
+import threading
+import time
+from map_assets import MapAssetCache
+from map_tiles import ZoomTileCache
+from map_encoding import MapEncoder
+from map_sprites import SpriteCache
+import map_data
+import reachability
+from logs import get_logger
+
+log = get_logger("maps")
 
 # Define the map dimensions and position coordinates
-MAP_WIDTH = 1280
-MAP_HEIGHT = 959
+MAP_WIDTH = map_data.MAP_WIDTH
+MAP_HEIGHT = map_data.MAP_HEIGHT
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-MAP_IMAGE_PATH = os.path.join(BASE_DIR, 'map.png')
-NODES_PATH = os.path.join(BASE_DIR, 'nodes.txt')
-CONNECTIONS_PATH = os.path.join(BASE_DIR, 'connections.txt')
+MAP_IMAGE_PATH = os.path.join(BASE_DIR, 'images', 'map.png')
+NODES_PATH = map_data.NODES_PATH
 
 # Store player positions and appearance information
 PLAYER_COLOURS = {
@@ -27,77 +36,99 @@ COLOUR_RGBA = {
     "white": (255, 255, 255, 128)
 }
 
-# Store node coordinates and connections
+# Store node coordinates and connections, loaded from the compiled map package (see map_data.py)
 POSITION_COORDS = {}
 CONNECTIONS = {}
+GRAPH = None  # graph_index.GraphIndex shared by the game, the map and the bot commands
+MAP_CHECKSUM = None  # hash of the text sources the package was compiled from
+# Built on first use through the module's __getattr__ (or all at once by warm_up):
+#   TILE_CACHE     map_tiles.ZoomTileCache of pre-cropped zoom backgrounds
+#   DISTANCES      distances.DistanceTables: all-pairs move counts and next hops per mode
+#   REACHABILITY   reachability.ReachabilityEngine: ticket-aware reachable sets and plans
+
+# Cached distance tables, rebuilt whenever the connection files change (empty disables the cache)
+DISTANCE_CACHE = os.getenv("DISTANCE_CACHE", os.path.join(BASE_DIR, 'cache', 'distances.npz'))
 
 # Mr. X reveal rounds
 REVEAL_ROUNDS = [3, 8, 13, 18, 24]
 
-def load_node_coordinates(filename='nodes.txt'):
-    """Load node coordinates from nodes.txt."""
-    coords = {}
-    try:
-        with open(NODES_PATH, 'r') as f:
-            for line in f:
-                parts = line.strip().split(',')
-                if len(parts) == 3:
-                    node, x, y = map(int, parts)
-                    if 0 <= x <= MAP_WIDTH and 0 <= y <= MAP_HEIGHT:
-                        coords[node] = (x, y)
-                    else:
-                        print(f"Warning: Node {node} coordinates ({x}, {y}) out of bounds")
-        if not coords:
-            raise Exception("No valid coordinates loaded from nodes.txt")
-        print(f"Loaded {len(coords)} coordinates from {filename}")
-        return coords
-    except FileNotFoundError:
-        raise Exception("nodes.txt not found")
-    except ValueError as e:
-        raise Exception("Invalid format in nodes.txt")
-
-def load_connections(filename='connections.txt'):
-    """Load station connections from connections.txt (comma-separated)."""
-    connections = {}
-    try:
-        with open(CONNECTIONS_PATH, 'r') as f:
-            for line in f:
-                parts = line.strip().split(',')
-                if len(parts) == 3:
-                    station1, station2, transport = int(parts[0]), int(parts[1]), parts[2]
-                    if transport not in ['taxi', 'bus', 'underground']:
-                        print(f"Warning: Invalid transport type {transport} in connections.txt")
-                        continue
-                    if station1 not in connections:
-                        connections[station1] = []
-                    if station2 not in connections:
-                        connections[station2] = []
-                    connections[station1].append((station2, transport))
-                    connections[station2].append((station1, transport))
-        if not connections:
-            raise Exception("No valid connections loaded from connections.txt")
-        print(f"Loaded connections for {len(connections)} stations from {filename}")
-        return connections
-    except FileNotFoundError:
-        raise Exception(f"connections.txt not found at {CONNECTIONS_PATH}")
-    except ValueError as e:
-        raise Exception("Invalid format in connections.txt")
+# Decoded base map and fonts, shared by every render in the process
+ASSET_CACHE = MapAssetCache(MAP_IMAGE_PATH, (MAP_WIDTH, MAP_HEIGHT))
+
+def _build_distances():
+    import distances  # pulls in numpy, so only once the tables are first needed
+    return distances.load_distance_tables(GRAPH, MAP_CHECKSUM, DISTANCE_CACHE or None)
+
+def _build_reachability():
+    return reachability.ReachabilityEngine(GRAPH)
+
+def _build_tile_cache():
+    zoom_size = round(ZOOM_VIEWPORT * ZOOM_SCALE)
+    return ZoomTileCache(
+        ASSET_CACHE, get_viewport, tuple(sorted(POSITION_COORDS)), (zoom_size, zoom_size),
+        [MAP_IMAGE_PATH, NODES_PATH], mode=MAP_TILE_MODE, cache_dir=MAP_TILE_DIR or None
+    )
+
+_LAZY_ASSETS = {"DISTANCES": _build_distances, "REACHABILITY": _build_reachability, "TILE_CACHE": _build_tile_cache}
+_lazy_lock = threading.Lock()
+
+def lazy(name):
+    """Return the module-level asset name, building it on first use; safe to call from any thread."""
+    value = globals().get(name)
+    if value is None:
+        with _lazy_lock:
+            value = globals().get(name)
+            if value is None:
+                value = globals()[name] = _LAZY_ASSETS[name]()
+    return value
+
+def __getattr__(name):
+    # Only called for names not yet set, so a built asset is a plain module attribute
+    if name in _LAZY_ASSETS:
+        return lazy(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def warm_up():
+    """Build every lazy asset, decode the base map and fonts and draw the token sprites now; returns {step: seconds}."""
+    timings = {}
+    steps = [(name, lambda name=name: lazy(name)) for name in _LAZY_ASSETS]
+    steps += [("base map", ASSET_CACHE.get_base_map), ("fonts", ASSET_CACHE.get_fonts), ("sprites", _warm_sprites)]
+    for step, build in steps:
+        start = time.perf_counter()
+        build()
+        timings[step] = time.perf_counter() - start
+    return timings
 
 def init_map():
-    """Initialize the map with default settings"""
-    global POSITION_COORDS, CONNECTIONS
+    """Load the map's nodes and connections; distance tables, reachability and zoom tiles wait for first use."""
+    global POSITION_COORDS, CONNECTIONS, GRAPH, MAP_CHECKSUM
     try:
-        POSITION_COORDS = load_node_coordinates()
-        CONNECTIONS = load_connections()
-    except Exception as e:
-        print(f"Failed to initialize map: {e}")
+        data = map_data.load()
+        POSITION_COORDS, CONNECTIONS, GRAPH, MAP_CHECKSUM = data.coords, data.connections(), data.graph(), data.checksum
+        log.info("Loaded %s nodes and %s edges from the map package", len(POSITION_COORDS), len(data.edges))
+        if MAP_TILE_MODE == "eager":
+            lazy("TILE_CACHE").warm_in_background()
+    except Exception:
+        log.exception("Failed to initialize map")
     if not os.path.exists(MAP_IMAGE_PATH):
         raise Exception(f"Map image not found at {MAP_IMAGE_PATH}")
 
+def is_connected(current, dest, transport=None):
+    """Return True if current and dest are linked by transport (any transport if None)."""
+    return GRAPH.is_connected(current, dest, transport)
+
+def get_connected_nodes(current):
+    """Return the sorted nodes reachable from current in one move."""
+    return GRAPH.neighbors(current)
+
+def get_all_nodes():
+    """Return every node that has coordinates on the map."""
+    return sorted(POSITION_COORDS)
+
 def get_possible_moves(current_location, roles, is_mr_x=False, mr_x_id = None):
     """Return possible moves and required tickets from the current location."""
     try:
-        if current_location not in CONNECTIONS:
+        if current_location not in GRAPH:
             return {"error": f"No connections found for station {current_location}"}
         if current_location not in POSITION_COORDS:
             return {"error": f"Station {current_location} not found in nodes.txt"}
@@ -106,24 +137,19 @@ def get_possible_moves(current_location, roles, is_mr_x=False, mr_x_id = None):
         occupied = {r["location"] for uid, r in roles.items() if r.get("location") and uid != mr_x_id}
 
         moves = {}
-        for dest, transport in CONNECTIONS[current_location]:
+        for dest, transports in GRAPH.edges(current_location):
             if dest in occupied:
                 continue  # Skip occupied stations
-            if dest not in moves:
-                moves[dest] = []
-            moves[dest].append(transport)
+            tickets = list(transports)
             if is_mr_x:
-                moves[dest].append("black")  # Mr. X can use black tickets for any move
-
-        # Remove duplicates and sort tickets
-        for dest in moves:
-            moves[dest] = sorted(list(set(moves[dest])))
+                tickets.append("black")  # Mr. X can use black tickets for any move
+            moves[dest] = sorted(tickets)
 
         if not moves:
             return {"error": f"No valid moves from station {current_location} (all destinations occupied)"}
         return moves
     except Exception as e:
-        print(f"[get_possible_moves] Error: {type(e).__name__}: {e}")
+        log.exception("Error calculating moves from %s", current_location)
         return {"error": f"Error calculating moves: {str(e)}"}
 
 def update_player_location(player_id, location, roles):
@@ -134,104 +160,217 @@ def update_player_location(player_id, location, roles):
         if location not in POSITION_COORDS:
             return f"Invalid node {location}."
         roles[player_id]['location'] = location
-        print(f"Updated location for player {player_id}: {location}")
+        log.debug("Updated location for player %s: %s", player_id, location)
         return f"Moved to location {location}!"
     except Exception as e:
-        print(f"Error in update_player_location: {type(e).__name__}: {e}")
+        log.exception("Error updating location for player %s", player_id)
         return f"Error updating location: {str(e)}"
 
-def generate_map(player_locations, current_round, zoom_player=None, mr_x_id=None):
-    """Generate the game map with all players' positions"""
-    try:
-        # Load the base map image
-        base_map = Image.open(MAP_IMAGE_PATH).convert("RGBA")
-        if base_map.size != (MAP_WIDTH, MAP_HEIGHT):
-            base_map = base_map.resize((MAP_WIDTH, MAP_HEIGHT), Image.Resampling.LANCZOS)
-        draw = ImageDraw.Draw(base_map)
-        
-        # Try to load a font, fall back to default if not available
-        try:
-            font = ImageFont.truetype("arial.ttf", 16)
-            small_font = ImageFont.truetype("arial.ttf", 12)
-        except IOError:
-            font = ImageFont.load_default()
-            small_font = ImageFont.load_default()
-                
-        token_radius = 15
-        glow_radius = 20
-        
-        detective_count = 0        
-        for player_id, role_info in player_locations.items():
-            location = role_info.get("location")
-            role = role_info.get("role")
-            
-            # Skip if the location is not defined
-            if not location or not role or location not in POSITION_COORDS:
+def get_visible_tokens(player_locations, current_round, zoom_player=None, mr_x_id=None):
+    """Return (location, role, color_key) for every token drawn from this perspective."""
+    tokens = []
+    detective_count = 0
+    for player_id, role_info in player_locations.items():
+        location = role_info.get("location")
+        role = role_info.get("role")
+
+        # Skip if the location is not defined
+        if not location or not role or location not in POSITION_COORDS:
+            continue
+
+        # Hide Mr. X's token for non-Mr. X perspectives outside reveal rounds
+        if role == "Mr. X" and player_id == mr_x_id:
+            if zoom_player != mr_x_id and current_round not in REVEAL_ROUNDS:
                 continue
-                
-            # Hide Mr. X's token for non-Mr. X perspectives outside reveal rounds
-            if role == "Mr. X" and player_id == mr_x_id:
-                if zoom_player != mr_x_id and current_round not in REVEAL_ROUNDS:
-                    continue
-                
-            x, y = POSITION_COORDS[location]
-            if role == "Detective":
-                detective_count += 1
-                color_key = f"Detective_{min(detective_count, 3)}"
-            else:
-                color_key = role
-            color = PLAYER_COLOURS.get(color_key, "white")
-            glow_color = COLOUR_RGBA.get(color, COLOUR_RGBA["white"])
-                
-            # added glow token effect
-            draw.ellipse(
-                (x-glow_radius, y-glow_radius, x+glow_radius, y+glow_radius), 
-                fill=glow_color, outline=None
-            )
-
-            draw.ellipse(
-                (x-token_radius, y-token_radius, x+token_radius, y+token_radius), 
-                fill=color, outline="white", width=2
-            )
-                
-            # Add player label (X or D)
-            label = "X" if role == "Mr. X" else "D"
-            text_bbox = draw.textbbox((0, 0), label, font=small_font)
-            text_width = text_bbox[2] - text_bbox[0]
-            text_height = text_bbox[3] - text_bbox[1]
-            draw.text(
-                (x - text_width // 2, (y - text_height // 2) - 2),
-                label, fill="white", font=small_font, stroke_width=1, stroke_fill="black"
-            )  
-
-        # Zoom in if zoom_player is specified
-        if zoom_player and zoom_player in player_locations:
-            location = player_locations[zoom_player].get("location")
-            if location in POSITION_COORDS:
-                x, y = POSITION_COORDS[location]
-                left = max(0, x - 150)
-                top = max(0, y - 150)
-                right = min(MAP_WIDTH, x + 150)
-                bottom = min(MAP_HEIGHT, y + 150)
-                base_map = base_map.crop((left, top, right, bottom))
-                base_map = base_map.resize((300, 300), Image.Resampling.LANCZOS)
-
-        # Convert the image to bytes to send to Discord
-        img_byte_arr = io.BytesIO()
-        base_map.save(img_byte_arr, format='PNG')
-        img_byte_arr.seek(0)
-
-        # Check file size (Discord limit: ~8MB)
-        if img_byte_arr.getbuffer().nbytes > 7.5 * 1024 * 1024:
-            base_map = base_map.resize((MAP_WIDTH // 2, MAP_HEIGHT // 2), Image.Resampling.LANCZOS)
-            img_byte_arr = io.BytesIO()
-            base_map.save(img_byte_arr, format='PNG')
-            img_byte_arr.seek(0)
-
-        return img_byte_arr
-        
-    except Exception as e:
-        print(f"Error generating map: {type(e).__name__}: {e}")
+
+        if role == "Detective":
+            detective_count += 1
+            color_key = f"Detective_{min(detective_count, 3)}"
+        else:
+            color_key = role
+        tokens.append((location, role, color_key))
+    return tokens
+
+def get_zoom_location(player_locations, zoom_player):
+    """Return the node the zoomed map is centred on, or None for the full map."""
+    if zoom_player and zoom_player in player_locations:
+        location = player_locations[zoom_player].get("location")
+        if location in POSITION_COORDS:
+            return location
+    return None
+
+def render_key(player_locations, current_round, zoom_player=None, mr_x_id=None, heat=None):
+    """Return a hashable key that identifies the image generate_map would produce."""
+    tokens = tuple(get_visible_tokens(player_locations, current_round, zoom_player, mr_x_id))
+    heat_key = tuple(sorted(heat.items())) if heat else None
+    return (tokens, current_round, current_round in REVEAL_ROUNDS, get_zoom_location(player_locations, zoom_player), heat_key)
+
+# Token geometry shared by every renderer
+TOKEN_RADIUS = 15
+GLOW_RADIUS = 20
+
+# Zoomed turn maps: a ZOOM_VIEWPORT-pixel window of the base map around the
+# player, output at ZOOM_SCALE output pixels per map pixel (2 = high-DPI)
+ZOOM_VIEWPORT = int(os.getenv("MAP_ZOOM_SIZE", "300"))
+ZOOM_SCALE = float(os.getenv("MAP_ZOOM_SCALE", "1"))
+
+# Pre-rendered zoom backgrounds per node: "off", "lazy" (on first use) or
+# "eager" (all nodes at startup, optionally persisted under MAP_TILE_DIR)
+MAP_TILE_MODE = os.getenv("MAP_TILES", "lazy")
+MAP_TILE_DIR = os.getenv("MAP_TILE_DIR", "")
+
+# Suspect heatmap: one translucent disc per node Mr. X could be on, more
+# opaque where he is more likely to be
+HEAT_RADIUS = 14
+HEAT_COLOUR = (255, 80, 0)
+
+# Output encoding: MAP_FORMAT png | png8 | webp | jpeg, kept under MAP_MAX_KB
+ENCODER = MapEncoder.from_env()
+
+def token_bbox(location):
+    """Return the (left, top, right, bottom) box a token at location can touch."""
+    x, y = POSITION_COORDS[location]
+    pad = GLOW_RADIUS + 1
+    return (max(0, x - pad), max(0, y - pad), min(MAP_WIDTH, x + pad + 1), min(MAP_HEIGHT, y + pad + 1))
+
+def draw_token_at(draw, x, y, role, color_key, small_font, scale=1):
+    """Draw one player token (glow, disc and X/D label) centred on pixel (x, y)."""
+    color = PLAYER_COLOURS.get(color_key, "white")
+    glow_color = COLOUR_RGBA.get(color, COLOUR_RGBA["white"])
+    glow_radius = round(GLOW_RADIUS * scale)
+    token_radius = round(TOKEN_RADIUS * scale)
+
+    # added glow token effect
+    draw.ellipse(
+        (x-glow_radius, y-glow_radius, x+glow_radius, y+glow_radius),
+        fill=glow_color, outline=None
+    )
+
+    draw.ellipse(
+        (x-token_radius, y-token_radius, x+token_radius, y+token_radius),
+        fill=color, outline="white", width=max(1, round(2 * scale))
+    )
+
+    # Add player label (X or D)
+    label = "X" if role == "Mr. X" else "D"
+    text_bbox = draw.textbbox((0, 0), label, font=small_font)
+    text_width = text_bbox[2] - text_bbox[0]
+    text_height = text_bbox[3] - text_bbox[1]
+    draw.text(
+        (x - text_width // 2, (y - text_height // 2) - round(2 * scale)),
+        label, fill="white", font=small_font, stroke_width=max(1, round(scale)), stroke_fill="black"
+    )
+
+def _token_sprite(key):
+    """Draw one token with draw_token_at on a transparent sprite; key is (is Mr. X, colour key, scale)."""
+    is_mr_x, color_key, scale = key
+    radius = round(GLOW_RADIUS * scale)
+    sprite = Image.new("RGBA", (2 * radius + 1, 2 * radius + 1), (0, 0, 0, 0))
+    small_font = ASSET_CACHE.get_font(round(ASSET_CACHE.small_font_size * scale))
+    draw_token_at(ImageDraw.Draw(sprite), radius, radius, "Mr. X" if is_mr_x else "Detective", color_key, small_font, scale)
+    return sprite, (radius, radius)
+
+def _heat_sprite(alpha):
+    """One heat marker disc at the given opacity."""
+    sprite = Image.new("RGBA", (2 * HEAT_RADIUS + 1, 2 * HEAT_RADIUS + 1), (0, 0, 0, 0))
+    ImageDraw.Draw(sprite).ellipse((0, 0, 2 * HEAT_RADIUS, 2 * HEAT_RADIUS), fill=HEAT_COLOUR + (alpha,))
+    return sprite, (HEAT_RADIUS, HEAT_RADIUS)
+
+# Tokens and heat markers are drawn once per look and then only composited,
+# so a map with many markers costs one small blend per marker
+TOKEN_SPRITES = SpriteCache(_token_sprite)
+HEAT_SPRITES = SpriteCache(_heat_sprite)
+
+def _warm_sprites():
+    for color_key in PLAYER_COLOURS:
+        for scale in {1, ZOOM_SCALE}:
+            TOKEN_SPRITES.get((color_key == "Mr. X", color_key, scale))
+
+def paste_token(image, x, y, role, color_key, scale=1):
+    """Composite one player token centred on pixel (x, y) of an RGBA image, from its cached sprite."""
+    TOKEN_SPRITES.paste(image, (role == "Mr. X", color_key, scale), x, y)
+
+def draw_token(image, location, role, color_key):
+    """Composite one player token centred on location on a full-size map."""
+    x, y = POSITION_COORDS[location]
+    paste_token(image, x, y, role, color_key)
+
+def encode_map(image):
+    """Encode a drawn map with ENCODER (format and size budget come from the environment)."""
+    return ENCODER.encode(image)
+
+def map_filename(stem):
+    """Return the attachment name for an encoded map, e.g. map_filename('map') -> 'map.webp'."""
+    return f"{stem}.{ENCODER.extension}"
+
+def get_viewport(location, viewport=None):
+    """Return the base-map box shown by a zoomed map centred on location."""
+    half = (viewport or ZOOM_VIEWPORT) // 2
+    x, y = POSITION_COORDS[location]
+    return (max(0, x - half), max(0, y - half), min(MAP_WIDTH, x + half), min(MAP_HEIGHT, y + half))
+
+def render_viewport(tokens, location, viewport=None, scale=None):
+    """Draw a zoomed map around location without touching the full-size canvas.
+
+    The cached base map is cropped first (or the node's pre-rendered tile is
+    used), resampled only if the crop does not already match the output size
+    (map edges or scale != 1), and only tokens whose box falls inside the
+    viewport are drawn, at output resolution.
+    """
+    viewport = viewport or ZOOM_VIEWPORT
+    scale = scale or ZOOM_SCALE
+    left, top, right, bottom = box = get_viewport(location, viewport)
+    output_size = (round(viewport * scale), round(viewport * scale))
+
+    tiles = lazy("TILE_CACHE")
+    if tiles.enabled and viewport == ZOOM_VIEWPORT and scale == ZOOM_SCALE:
+        image = tiles.get(location).copy()
+    else:
+        image = ASSET_CACHE.get_base_map().crop(box)
+        if image.size != output_size:
+            image = image.resize(output_size, Image.Resampling.LANCZOS)
+    scale_x = output_size[0] / (right - left)
+    scale_y = output_size[1] / (bottom - top)
+
+    for token_location, role, color_key in tokens:
+        token_left, token_top, token_right, token_bottom = token_bbox(token_location)
+        if token_right <= left or token_left >= right or token_bottom <= top or token_top >= bottom:
+            continue
+        x, y = POSITION_COORDS[token_location]
+        paste_token(image, round((x - left) * scale_x), round((y - top) * scale_y), role, color_key, scale)
+    return image
+
+def draw_heatmap(image, heat):
+    """Blend a heat marker under every node of heat ({node: probability}) into image, in place; returns image."""
+    peak = max(heat.values())
+    for node, weight in heat.items():
+        if node not in POSITION_COORDS:
+            continue
+        x, y = POSITION_COORDS[node]
+        HEAT_SPRITES.paste(image, 60 + round(160 * weight / peak), x, y)
+    return image
+
+def generate_map(player_locations, current_round, zoom_player=None, mr_x_id=None, heat=None):
+    """Generate the game map with all players' positions, optionally over a suspect heatmap (full map only)"""
+    try:
+        tokens = get_visible_tokens(player_locations, current_round, zoom_player, mr_x_id)
+
+        # Zoomed turn maps only ever need a small window of the map
+        location = get_zoom_location(player_locations, zoom_player)
+        if location is not None:
+            return encode_map(render_viewport(tokens, location))
+
+        # Start from a copy of the cached, already decoded base map
+        base_map = ASSET_CACHE.copy_base_map()
+        if heat:
+            base_map = draw_heatmap(base_map, heat)
+        for location, role, color_key in tokens:
+            draw_token(base_map, location, role, color_key)
+
+        return encode_map(base_map)
+
+    except Exception:
+        log.exception("Error generating map")
         return None
 
 # Initialize the map on module import
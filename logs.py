@@ -0,0 +1,191 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+
+ROOT = "scott"
+FORMATS = ("text", "json")
+TEXT_FORMAT = "%(asctime)s %(levelname)-7s %(name)s [%(funcName)s] %(message)s"
+
+# Attributes every LogRecord has; anything else on a record came from extra={...}
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+_lock = threading.Lock()
+
+
+class SubsystemLogger(logging.Logger):
+    """A Logger that can keep one in every sample_every records below WARNING, per message template.
+
+    The decision is made before a LogRecord is built, so a sampled-out call
+    costs about as little as a disabled one. Counting per template (the
+    unformatted message) thins out a chatty hot-path message without hiding
+    rarer messages from the same logger; warnings and errors always pass.
+    Kept records carry sampled=sample_every so readers can scale counts back up.
+    """
+
+    def __init__(self, name, level=logging.NOTSET):
+        super().__init__(name, level)
+        self.sample_every = 1
+        self.sampled_out = 0
+        self._sample_counts = {}
+
+    def _log(self, level, msg, args, exc_info=None, extra=None, stack_info=False, stacklevel=1):
+        if self.sample_every > 1 and level < logging.WARNING:
+            count = self._sample_counts.get(msg, 0)
+            self._sample_counts[msg] = count + 1
+            if count % self.sample_every:
+                self.sampled_out += 1
+                return
+            extra = {**(extra or {}), "sampled": self.sample_every}
+        # One more frame (this one) between the caller and logging's own
+        super()._log(level, msg, args, exc_info, extra, stack_info, stacklevel + 1)
+
+
+def get_logger(subsystem):
+    """Return the logger for one subsystem ("game", "views", "commands", ...).
+
+    Log with %-style arguments, e.g. log.debug("moved to %s", dest): the
+    message is only formatted if a handler will write it, so a disabled
+    debug call costs a level check.
+    """
+    name = f"{ROOT}.{subsystem}"
+    manager = logging.Logger.manager
+    with _lock:
+        # Only this package's loggers use SubsystemLogger; other libraries keep the default class
+        default, manager.loggerClass = manager.loggerClass, SubsystemLogger
+        try:
+            return logging.getLogger(name)
+        finally:
+            manager.loggerClass = default
+
+
+def _parse_pairs(text, convert):
+    """Parse "game=DEBUG,views=WARNING" into {"game": convert("DEBUG"), ...}."""
+    pairs = {}
+    for item in filter(None, (part.strip() for part in (text or "").split(","))):
+        name, _, value = item.partition("=")
+        pairs[name.strip()] = convert(value.strip())
+    return pairs
+
+
+def _level(name):
+    level = logging.getLevelName(name.upper())
+    if not isinstance(level, int):
+        raise ValueError(f"Unknown log level {name!r}")
+    return level
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, function, message and any extra={...} fields."""
+
+    def format(self, record):
+        data = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "func": record.funcName,
+            "msg": record.getMessage(),
+        }
+        data.update((key, value) for key, value in vars(record).items() if key not in _RECORD_FIELDS)
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """A QueueHandler that never blocks the caller: when the queue is full the record is dropped and counted."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Merge the arguments now, while they still hold the values being logged, and
+        # leave formatting (time, level, function) to the listener thread
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogConfig:
+    """Levels, sampling and output for every get_logger() logger.
+
+    Records go through a bounded queue to a listener thread that does the
+    writing, so a slow stdout never stalls the event loop; when the queue is
+    full, records are dropped (and counted) rather than waited on. queue_size=0
+    writes synchronously instead.
+    """
+
+    def __init__(self, level="INFO", levels=None, sample=None, fmt="text", queue_size=10000, stream=None):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown log format {fmt!r}")
+        self.level = _level(level)
+        self.levels = {name: _level(value) for name, value in (levels or {}).items()}
+        self.sample = dict(sample or {})
+        self.fmt = fmt
+        self.queue_size = queue_size
+        self.stream = stream
+        self._handler = None
+        self._listener = None
+
+    @classmethod
+    def from_env(cls):
+        """Build a config from LOG_LEVEL, LOG_LEVELS, LOG_SAMPLE, LOG_FORMAT and LOG_QUEUE."""
+        return cls(
+            level=os.getenv("LOG_LEVEL", "INFO"),
+            levels=_parse_pairs(os.getenv("LOG_LEVELS"), str),
+            sample=_parse_pairs(os.getenv("LOG_SAMPLE"), int),
+            fmt=os.getenv("LOG_FORMAT", "text"),
+            queue_size=int(os.getenv("LOG_QUEUE", "10000")),
+        )
+
+    def install(self):
+        """Attach the handler and levels to the loggers; call once at startup. Returns self."""
+        root = logging.getLogger(ROOT)
+        self.uninstall()
+        root.setLevel(self.level)
+        root.propagate = False
+        for name, level in self.levels.items():
+            get_logger(name).setLevel(level)
+        for name, every in self.sample.items():
+            get_logger(name).sample_every = max(int(every), 1)
+
+        output = logging.StreamHandler(self.stream or sys.stdout)
+        if self.fmt == "json":
+            output.setFormatter(JsonFormatter())
+        else:
+            output.setFormatter(logging.Formatter(TEXT_FORMAT))
+        if self.queue_size:
+            self._handler = _DroppingQueueHandler(queue.Queue(self.queue_size))
+            self._listener = logging.handlers.QueueListener(self._handler.queue, output)
+            self._listener.start()
+        else:
+            self._handler = output
+        root.addHandler(self._handler)
+        return self
+
+    def uninstall(self):
+        """Write out what is queued and detach from the loggers."""
+        if self._listener:
+            self._listener.stop()
+            self._listener = None
+        if self._handler:
+            logging.getLogger(ROOT).removeHandler(self._handler)
+            self._handler = None
+        for name in self.sample:
+            get_logger(name).sample_every = 1
+
+    def stats(self):
+        return {
+            "dropped_full": getattr(self._handler, "dropped", 0),
+            "dropped_sampled": sum(get_logger(name).sampled_out for name in self.sample),
+            "queued": self._handler.queue.qsize() if self._listener else 0,
+        }
@@ -0,0 +1,115 @@
+import os
+import threading
+from PIL import Image, ImageFont
+from logs import get_logger
+
+log = get_logger("maps")
+
+
+class MapAssetCache:
+    """Process-wide cache of the decoded base map and fonts used by generate_map."""
+
+    def __init__(self, image_path, size, font_name="arial.ttf", font_size=16, small_font_size=12):
+        self.image_path = image_path
+        self.size = size
+        self.font_name = font_name
+        self.font_size = font_size
+        self.small_font_size = small_font_size
+        self._lock = threading.Lock()
+        self._base_map = None
+        self._signature = None
+        self._fonts = None
+        self._sized_fonts = {}
+        self.loads = 0
+
+    def _file_signature(self):
+        """Return (mtime, size) of the map image so edits on disk trigger a reload."""
+        stat = os.stat(self.image_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load_base_map(self):
+        """Decode the map image and normalize it to RGBA at the configured size."""
+        with Image.open(self.image_path) as image:
+            base_map = image.convert("RGBA")
+        if base_map.size != self.size:
+            base_map = base_map.resize(self.size, Image.Resampling.LANCZOS)
+        base_map.load()
+        return base_map
+
+    def _load_fonts(self):
+        """Load the label fonts, falling back to Pillow's default font."""
+        try:
+            font = ImageFont.truetype(self.font_name, self.font_size)
+            small_font = ImageFont.truetype(self.font_name, self.small_font_size)
+        except IOError:
+            font = ImageFont.load_default()
+            small_font = ImageFont.load_default()
+        return font, small_font
+
+    def get_base_map(self):
+        """Return the shared decoded base map. Callers must not draw on it."""
+        signature = self._file_signature()
+        base_map = self._base_map
+        if base_map is not None and signature == self._signature:
+            return base_map
+        with self._lock:
+            if self._base_map is None or signature != self._signature:
+                if self._base_map is not None:
+                    log.warning("%s changed on disk, reloading", self.image_path)
+                self._base_map = self._load_base_map()
+                self._signature = signature
+                self.loads += 1
+            return self._base_map
+
+    def copy_base_map(self):
+        """Return a private copy of the base map that is safe to draw on."""
+        return self.get_base_map().copy()
+
+    def get_font(self, size):
+        """Return the label font at an arbitrary size (used for scaled zoom maps)."""
+        if size == self.small_font_size:
+            return self.get_fonts()[1]
+        font = self._sized_fonts.get(size)
+        if font is None:
+            try:
+                font = ImageFont.truetype(self.font_name, size)
+            except IOError:
+                try:
+                    font = ImageFont.load_default(size)
+                except TypeError:
+                    font = ImageFont.load_default()
+            self._sized_fonts[size] = font
+        return font
+
+    def get_fonts(self):
+        """Return (font, small_font), loading them on first use."""
+        if self._fonts is None:
+            with self._lock:
+                if self._fonts is None:
+                    self._fonts = self._load_fonts()
+        return self._fonts
+
+    def invalidate(self):
+        """Drop every cached asset so the next request reloads from disk."""
+        with self._lock:
+            self._base_map = None
+            self._signature = None
+            self._fonts = None
+            self._sized_fonts = {}
+
+    def memory_usage(self):
+        """Return the number of bytes held by the cached base map pixels."""
+        base_map = self._base_map
+        if base_map is None:
+            return 0
+        width, height = base_map.size
+        return width * height * len(base_map.getbands())
+
+    def stats(self):
+        """Return a summary of the cache state for diagnostics."""
+        return {
+            "loaded": self._base_map is not None,
+            "loads": self.loads,
+            "memory_bytes": self.memory_usage(),
+            "fonts_loaded": self._fonts is not None,
+        }
@@ -0,0 +1,299 @@
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import zlib
+from typing import NamedTuple
+import graph_index
+from logs import get_logger
+
+MAP_WIDTH = 1280
+MAP_HEIGHT = 959
+NODES_PATH = os.path.join(graph_index.DATA_DIR, 'nodes.txt')
+# The compiled package every module loads; rebuild it with `python map_data.py` after editing text_files/
+MAP_DATA_PATH = os.getenv("MAP_DATA", os.path.join(graph_index.DATA_DIR, 'map.bin'))
+
+MAGIC = b"SYMD"
+VERSION = 1
+# magic, format version, map width and height, node and edge counts, sha256 of the text sources, crc32 of the tables
+_HEADER = struct.Struct("<4sHHHHH32sI")
+_NODE = struct.Struct("<HHH")  # node, x, y
+_EDGE = struct.Struct("<HHB")  # a < b, index of the mode in graph_index.MODES
+MAX_NODE = 0xFFFF
+
+log = get_logger("maps")
+
+
+class MapDataError(ValueError):
+    """The text sources failed validation, or a compiled package is damaged or from another format version."""
+
+
+class MapData(NamedTuple):
+    """The board: node coordinates and undirected edges, as compiled from text_files/.
+
+    Edges are stored once each as (a, b, mode) with a < b and a canonical
+    mode, sorted, so the graph built from them is symmetric by construction.
+    checksum is the sha256 of the text sources, which caches derived from
+    the board (distance tables, ...) use as their key.
+    """
+    coords: dict
+    edges: tuple
+    checksum: str
+    size: tuple = (MAP_WIDTH, MAP_HEIGHT)
+
+    def graph(self):
+        return graph_index.GraphIndex(self.edges)
+
+    def connections(self):
+        """Return {node: [(dest, mode), ...]} listing every edge from both ends."""
+        connections = {}
+        for a, b, mode in self.edges:
+            connections.setdefault(a, []).append((b, mode))
+            connections.setdefault(b, []).append((a, mode))
+        return connections
+
+
+def source_paths(data_dir=graph_index.DATA_DIR):
+    """Return the text files a package is compiled from: nodes.txt, then the graph's source files."""
+    return [os.path.join(data_dir, 'nodes.txt')] + [path for path, _ in graph_index.source_files(data_dir)]
+
+
+def source_checksum(data_dir=graph_index.DATA_DIR):
+    """Hash the text sources, so a package or cache built from other data is detected."""
+    digest = hashlib.sha256()
+    for path in source_paths(data_dir):
+        digest.update(os.path.basename(path).encode())
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _rows(path):
+    """Yield (line number, fields) for every non-blank line of a comma-separated file."""
+    with open(path, 'r') as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if line:
+                yield lineno, [part.strip() for part in line.split(',')]
+
+
+def compile_sources(data_dir=graph_index.DATA_DIR, size=(MAP_WIDTH, MAP_HEIGHT)):
+    """Parse and check the text sources; returns (MapData, warnings).
+
+    Raises MapDataError listing every error: malformed lines, unknown modes,
+    self-loops, node numbers that do not fit the format, nodes listed twice
+    in nodes.txt and coordinates outside the map. Problems the board can be
+    played with are warnings: an edge listed twice (in either direction), an
+    edge in connections.txt that its mode's map file lacks or the other way
+    round, nodes with edges but no coordinates (they cannot be drawn), and
+    nodes with coordinates but no edges. The package keeps every edge found
+    in any of the files, as the text loaders did.
+    """
+    errors, warnings = [], []
+    width, height = size
+
+    coords = {}
+    nodes_path = os.path.join(data_dir, 'nodes.txt')
+    if not os.path.exists(nodes_path):
+        errors.append(f"{nodes_path} not found")
+    else:
+        for lineno, parts in _rows(nodes_path):
+            where = f"nodes.txt:{lineno}"
+            try:
+                node, x, y = map(int, parts)
+            except ValueError:
+                errors.append(f"{where}: expected node,x,y, got {','.join(parts)!r}")
+                continue
+            if not 0 < node <= MAX_NODE:
+                errors.append(f"{where}: node {node} out of range")
+            elif node in coords:
+                errors.append(f"{where}: node {node} listed again")
+            elif not (0 <= x <= width and 0 <= y <= height):
+                errors.append(f"{where}: node {node} at ({x}, {y}) is outside the {width}x{height} map")
+            else:
+                coords[node] = (x, y)
+
+    # Edges per source file, and which file each came from, to compare connections.txt with the map files
+    found = {}
+    for path, file_mode in graph_index.source_files(data_dir):
+        name = os.path.basename(path)
+        if not os.path.exists(path):
+            errors.append(f"{path} not found")
+            continue
+        edges = found[name] = set()
+        for lineno, parts in _rows(path):
+            where = f"{name}:{lineno}"
+            if len(parts) != (3 if file_mode is None else 2):
+                errors.append(f"{where}: expected {'a,b,mode' if file_mode is None else 'a,b'}, got {','.join(parts)!r}")
+                continue
+            mode = graph_index.normalize_mode(parts[2]) if file_mode is None else file_mode
+            if mode not in graph_index.MODES:
+                errors.append(f"{where}: unknown transport mode {parts[2]!r}")
+                continue
+            try:
+                a, b = int(parts[0]), int(parts[1])
+            except ValueError:
+                errors.append(f"{where}: expected node numbers, got {','.join(parts[:2])!r}")
+                continue
+            if not (0 < a <= MAX_NODE and 0 < b <= MAX_NODE):
+                errors.append(f"{where}: node out of range in {a},{b}")
+            elif a == b:
+                errors.append(f"{where}: node {a} connected to itself")
+            else:
+                edge = (min(a, b), max(a, b), mode)
+                if edge in edges:
+                    warnings.append(f"{where}: {mode} edge {edge[0]}-{edge[1]} listed again")
+                edges.add(edge)
+
+    if errors:
+        raise MapDataError(f"{len(errors)} error(s) in {data_dir}:\n  " + "\n  ".join(errors))
+
+    listed = found.pop('connections.txt', set())
+    for mode, filename in graph_index.MODE_FILES.items():
+        mode_edges = found.get(filename, set())
+        listed_edges = {edge for edge in listed if edge[2] == mode}
+        for a, b, _ in sorted(listed_edges - mode_edges):
+            warnings.append(f"{mode} edge {a}-{b} is in connections.txt but not {filename}")
+        for a, b, _ in sorted(mode_edges - listed_edges):
+            warnings.append(f"{mode} edge {a}-{b} is in {filename} but not connections.txt")
+    edges = listed.union(*found.values())
+    if not edges:
+        raise MapDataError(f"No connections found in {data_dir}")
+
+    connected = {node for a, b, _ in edges for node in (a, b)}
+    for node in sorted(connected - set(coords)):
+        warnings.append(f"node {node} has edges but no coordinates in nodes.txt")
+    for node in sorted(set(coords) - connected):
+        warnings.append(f"node {node} has coordinates but no edges")
+
+    return MapData(coords, tuple(sorted(edges)), source_checksum(data_dir), size), warnings
+
+
+def encode(data):
+    """Serialise data as a package: a header, then the coordinate and edge tables."""
+    mode_index = {mode: i for i, mode in enumerate(graph_index.MODES)}
+    body = bytearray()
+    for node in sorted(data.coords):
+        body += _NODE.pack(node, *data.coords[node])
+    for a, b, mode in data.edges:
+        body += _EDGE.pack(a, b, mode_index[mode])
+    header = _HEADER.pack(MAGIC, VERSION, *data.size, len(data.coords), len(data.edges),
+                          bytes.fromhex(data.checksum), zlib.crc32(body))
+    return header + bytes(body)
+
+
+def decode(buffer):
+    """Read a package from any buffer (bytes, mmap, ...); raises MapDataError if it is not a valid one."""
+    if len(buffer) < _HEADER.size:
+        raise MapDataError("truncated header")
+    magic, version, width, height, node_count, edge_count, digest, crc = _HEADER.unpack_from(buffer)
+    if magic != MAGIC:
+        raise MapDataError("not a map data package")
+    if version != VERSION:
+        raise MapDataError(f"format version {version}, expected {VERSION}")
+    edges_start = _HEADER.size + node_count * _NODE.size
+    end = edges_start + edge_count * _EDGE.size
+    if len(buffer) != end:
+        raise MapDataError(f"{len(buffer)} bytes, expected {end}")
+    with memoryview(buffer) as view:
+        if zlib.crc32(view[_HEADER.size:]) != crc:
+            raise MapDataError("checksum mismatch")
+        coords = {node: (x, y) for node, x, y in _NODE.iter_unpack(view[_HEADER.size:edges_start])}
+        edges = tuple((a, b, graph_index.MODES[mode]) for a, b, mode in _EDGE.iter_unpack(view[edges_start:end]))
+    return MapData(coords, edges, digest.hex(), (width, height))
+
+
+def _sources_changed(path, data, data_dir):
+    """True if a text source was edited after path was compiled (the mtimes say so and the hash differs)."""
+    built = os.path.getmtime(path)
+    if all(not os.path.exists(source) or os.path.getmtime(source) <= built for source in source_paths(data_dir)):
+        return False
+    # A checkout can leave sources newer than the package without changing them
+    return source_checksum(data_dir) != data.checksum
+
+
+def load(path=None, data_dir=graph_index.DATA_DIR):
+    """Return the MapData in the compiled package at path (MAP_DATA_PATH by default).
+
+    The package is memory-mapped and read in one pass. If it is missing,
+    damaged or older than the text sources, they are compiled in memory
+    instead, with a warning to rebuild it.
+    """
+    path = path or MAP_DATA_PATH
+    try:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            data = decode(buffer)
+        if not _sources_changed(path, data, data_dir):
+            return data
+        reason = "older than the text sources"
+    except (OSError, ValueError) as e:  # ValueError includes MapDataError and mmap of an empty file
+        reason = str(e)
+    log.warning("Compiling the map from %s: %s is unusable (%s); run `python map_data.py` to rebuild it",
+                data_dir, path, reason)
+    data, _ = compile_sources(data_dir)
+    return data
+
+
+def build(path=None, data_dir=graph_index.DATA_DIR, strict=False):
+    """Compile the text sources into the package at path; returns (MapData, warnings).
+
+    With strict, warnings fail the build like errors do.
+    """
+    path = path or MAP_DATA_PATH
+    data, warnings = compile_sources(data_dir)
+    if strict and warnings:
+        raise MapDataError(f"{len(warnings)} warning(s) in {data_dir} (strict):\n  " + "\n  ".join(warnings))
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    partial = path + ".tmp"
+    with open(partial, 'wb') as f:
+        f.write(encode(data))
+    os.replace(partial, path)
+    return data, warnings
+
+
+def main(argv):
+    """python map_data.py [--check] [--strict] [package path]
+
+    Builds the package from text_files/ and prints every warning. --check
+    only validates, and fails if the package is missing or out of date;
+    --strict fails on warnings as well.
+    """
+    flags = {arg for arg in argv if arg.startswith("--")}
+    paths = [arg for arg in argv if not arg.startswith("--")]
+    unknown = flags - {"--check", "--strict"}
+    if unknown or len(paths) > 1:
+        print(main.__doc__)
+        return 2
+    path = paths[0] if paths else MAP_DATA_PATH
+    try:
+        if "--check" in flags:
+            data, warnings = compile_sources()
+            if "--strict" in flags and warnings:
+                raise MapDataError(f"{len(warnings)} warning(s) (strict)")
+        else:
+            data, warnings = build(path, strict="--strict" in flags)
+    except MapDataError as e:
+        print(f"[map_data] {e}")
+        return 1
+    for warning in warnings:
+        print(f"[map_data] Warning: {warning}")
+    print(f"[map_data] {len(data.coords)} nodes, {len(data.edges)} edges, {len(warnings)} warning(s)")
+    if "--check" in flags:
+        try:
+            with open(path, 'rb') as f:
+                current = decode(f.read())
+        except (OSError, MapDataError) as e:
+            print(f"[map_data] {path} is unusable: {e}")
+            return 1
+        if current != data:
+            print(f"[map_data] {path} is out of date; run `python map_data.py`")
+            return 1
+    else:
+        print(f"[map_data] Wrote {path} ({os.path.getsize(path)} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
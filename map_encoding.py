@@ -0,0 +1,151 @@
+import io
+import math
+import os
+import threading
+import time
+from PIL import Image
+
+# format name -> (Pillow format, file extension)
+FORMATS = {
+    "png": ("PNG", "png"),      # lossless RGBA, as before
+    "png8": ("PNG", "png"),     # 256-colour palette PNG
+    "webp": ("WEBP", "webp"),
+    "jpeg": ("JPEG", "jpg"),
+}
+LOSSY_FORMATS = ("webp", "jpeg")
+
+# Discord's upload limit is 8 MiB; keep some headroom
+DEFAULT_MAX_BYTES = int(7.5 * 1024 * 1024)
+
+
+class MapEncoder:
+    """Encodes rendered maps in a configurable format under a byte budget.
+
+    Every encode records its bytes per pixel, so the next encode can predict
+    its size and pick a quality (lossy formats) or a downscale (lossless
+    formats) that fits the budget on the first attempt. Only a bad prediction
+    costs a re-encode.
+    """
+
+    def __init__(self, fmt="png", quality=85, min_quality=40, max_bytes=DEFAULT_MAX_BYTES, compress_level=6):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown map format {fmt!r}, expected one of {', '.join(FORMATS)}")
+        self.fmt = fmt
+        self.quality = quality
+        self.min_quality = min_quality
+        self.max_bytes = max_bytes
+        self.compress_level = compress_level
+        self._bytes_per_pixel = {}
+        self._lock = threading.Lock()
+        self.renders = 0
+        self.encodes = 0
+        self.total_seconds = 0.0
+        self.total_bytes = 0
+        self.last = None
+
+    @classmethod
+    def from_env(cls):
+        """Build an encoder from MAP_FORMAT, MAP_QUALITY, MAP_MIN_QUALITY, MAP_MAX_KB and MAP_PNG_LEVEL."""
+        max_kb = os.getenv("MAP_MAX_KB")
+        return cls(
+            fmt=os.getenv("MAP_FORMAT", "png").lower(),
+            quality=int(os.getenv("MAP_QUALITY", "85")),
+            min_quality=int(os.getenv("MAP_MIN_QUALITY", "40")),
+            max_bytes=int(max_kb) * 1024 if max_kb else DEFAULT_MAX_BYTES,
+            compress_level=int(os.getenv("MAP_PNG_LEVEL", "6")),
+        )
+
+    @property
+    def extension(self):
+        return FORMATS[self.fmt][1]
+
+    @property
+    def lossy(self):
+        return self.fmt in LOSSY_FORMATS
+
+    def _save(self, image, quality):
+        """Encode image once and return the bytes."""
+        buffer = io.BytesIO()
+        if self.fmt == "png":
+            image.save(buffer, format="PNG", compress_level=self.compress_level)
+        elif self.fmt == "png8":
+            image.quantize(256, method=Image.Quantize.FASTOCTREE).save(
+                buffer, format="PNG", compress_level=self.compress_level)
+        elif self.fmt == "webp":
+            image.save(buffer, format="WEBP", quality=quality, method=0)
+        else:
+            if image.mode != "RGB":
+                # JPEG has no alpha; flatten translucent token glows onto white
+                background = Image.new("RGBA", image.size, (255, 255, 255, 255))
+                image = Image.alpha_composite(background, image.convert("RGBA")).convert("RGB")
+            image.save(buffer, format="JPEG", quality=quality, optimize=False)
+        return buffer.getvalue()
+
+    def _predict(self, pixels, quality):
+        """Predict the encoded size from earlier encodes, or None if there is no history."""
+        if not self._bytes_per_pixel:
+            return None
+        if quality in self._bytes_per_pixel:
+            return self._bytes_per_pixel[quality] * pixels
+        # Size grows roughly linearly with quality in the range we use
+        nearest = min(self._bytes_per_pixel, key=lambda q: abs(q - quality))
+        return self._bytes_per_pixel[nearest] * pixels * quality / max(nearest, 1)
+
+    def _plan(self, image):
+        """Pick (quality, scale) expected to fit the budget on the first encode."""
+        pixels = image.width * image.height
+        quality = self.quality
+        if self.lossy:
+            while quality > self.min_quality:
+                predicted = self._predict(pixels, quality)
+                if predicted is None or predicted <= self.max_bytes:
+                    break
+                quality = max(self.min_quality, quality - 5)
+        predicted = self._predict(pixels, quality)
+        scale = 1.0
+        if predicted and predicted > self.max_bytes:
+            scale = math.sqrt(self.max_bytes / predicted) * 0.95
+        return quality, scale
+
+    def encode(self, image):
+        """Encode image under max_bytes and return a BytesIO positioned at 0."""
+        start = time.perf_counter()
+        quality, scale = self._plan(image)
+        attempts = 0
+        while True:
+            target = image
+            if scale < 1.0:
+                target = image.resize((max(1, int(image.width * scale)), max(1, int(image.height * scale))),
+                                      Image.Resampling.LANCZOS)
+            data = self._save(target, quality)
+            attempts += 1
+            with self._lock:
+                self._bytes_per_pixel[quality] = len(data) / (target.width * target.height)
+            if len(data) <= self.max_bytes:
+                break
+            # Prediction was off: lower the quality first, then shrink
+            if self.lossy and quality > self.min_quality:
+                quality = max(self.min_quality, quality - 10)
+            else:
+                scale *= math.sqrt(self.max_bytes / len(data)) * 0.95
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.renders += 1
+            self.encodes += attempts
+            self.total_seconds += elapsed
+            self.total_bytes += len(data)
+            self.last = {"format": self.fmt, "quality": quality, "scale": scale, "attempts": attempts,
+                         "bytes": len(data), "encode_ms": elapsed * 1000}
+        return io.BytesIO(data)
+
+    def stats(self):
+        """Return per-render encode time and size."""
+        return {
+            "format": self.fmt,
+            "renders": self.renders,
+            "encodes": self.encodes,
+            "avg_encode_ms": self.total_seconds / self.renders * 1000 if self.renders else 0.0,
+            "avg_bytes": self.total_bytes / self.renders if self.renders else 0.0,
+            "last": self.last,
+        }
@@ -0,0 +1,131 @@
+import os
+import threading
+from collections import OrderedDict
+import live_map
+from logs import get_logger
+
+log = get_logger("maps")
+
+
+def _overlaps(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+class LayeredMapRenderer:
+    """Keeps one game's full-size map with its tokens already drawn.
+
+    Each render diffs the visible tokens against the ones on the canvas,
+    restores the base pixels under tokens that left or moved, and draws only
+    the tokens that changed (plus any neighbour whose box overlaps a restored
+    area), so the cost follows the number of changed tokens, not the map size.
+    """
+
+    def __init__(self, assets=None):
+        self.assets = assets or live_map.ASSET_CACHE
+        self._lock = threading.Lock()
+        self._canvas = None
+        self._base = None
+        self._drawn = []
+        self.full_draws = 0
+        self.tokens_drawn = 0
+
+    def _redraw_plan(self, tokens):
+        """Return (boxes to restore, indexes of tokens to draw) for the new token list."""
+        old, new = set(self._drawn), set(tokens)
+        dirty = [live_map.token_bbox(token[0]) for token in old ^ new]
+        redraw = {i for i, token in enumerate(tokens) if token not in old}
+        # Grow the dirty area until every token touching it is redrawn in full
+        changed = True
+        while changed:
+            changed = False
+            for i, token in enumerate(tokens):
+                if i in redraw:
+                    continue
+                box = live_map.token_bbox(token[0])
+                if any(_overlaps(box, area) for area in dirty):
+                    redraw.add(i)
+                    dirty.append(box)
+                    changed = True
+        return dirty, sorted(redraw)
+
+    def draw(self, tokens):
+        """Bring the canvas up to date with tokens and return it (caller must not modify it)."""
+        base = self.assets.get_base_map()
+        if self._canvas is None or self._base is not base:
+            # First render, or map.png changed on disk: start from a clean copy
+            self._canvas = base.copy()
+            self._base = base
+            self._drawn = []
+            self.full_draws += 1
+
+        dirty, redraw = self._redraw_plan(tokens)
+        for box in dirty:
+            self._canvas.paste(base.crop(box), box[:2])
+        for i in redraw:
+            location, role, color_key = tokens[i]
+            live_map.draw_token(self._canvas, location, role, color_key)
+        self.tokens_drawn += len(redraw)
+        self._drawn = list(tokens)
+        return self._canvas
+
+    def render(self, player_locations, current_round, zoom_player=None, mr_x_id=None, heat=None):
+        """Drop-in replacement for live_map.generate_map that reuses this game's canvas."""
+        if heat:
+            # Heatmaps are one-off renders; keep them off the shared canvas
+            return live_map.generate_map(player_locations, current_round, zoom_player, mr_x_id, heat=heat)
+        try:
+            tokens = live_map.get_visible_tokens(player_locations, current_round, zoom_player, mr_x_id)
+            location = live_map.get_zoom_location(player_locations, zoom_player)
+            if location is not None:
+                # Zoomed maps are cheaper to build from the base map than from the canvas
+                return live_map.encode_map(live_map.render_viewport(tokens, location))
+            with self._lock:
+                return live_map.encode_map(self.draw(tokens))
+        except Exception:
+            log.exception("Layered map render failed")
+            return None
+
+    def memory_usage(self):
+        if self._canvas is None:
+            return 0
+        width, height = self._canvas.size
+        return width * height * len(self._canvas.getbands())
+
+
+class RendererRegistry:
+    """LRU of per-game LayeredMapRenderer canvases, capped because each holds a full-size map.
+
+    Games are keyed by their session key (guild, channel), which stays the same
+    while the GameState object is parked and rebuilt.
+    """
+
+    def __init__(self, max_games=16):
+        self.max_games = max_games
+        self._renderers = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Build a registry capped by LAYERED_RENDER_GAMES (0 disables layered rendering)."""
+        return cls(max_games=int(os.getenv("LAYERED_RENDER_GAMES", "16")))
+
+    def get(self, game_key):
+        """Return the renderer for a game, creating it (and evicting the oldest) as needed."""
+        if self.max_games <= 0:
+            return None
+        with self._lock:
+            renderer = self._renderers.get(game_key)
+            if renderer is None:
+                renderer = self._renderers[game_key] = LayeredMapRenderer()
+                while len(self._renderers) > self.max_games:
+                    self._renderers.popitem(last=False)
+            self._renderers.move_to_end(game_key)
+            return renderer
+
+    def drop(self, game_key):
+        """Forget a game's canvas, e.g. when the game resets, is evicted or is parked."""
+        with self._lock:
+            self._renderers.pop(game_key, None)
+
+    def memory_usage(self):
+        return sum(renderer.memory_usage() for renderer in list(self._renderers.values()))
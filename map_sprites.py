@@ -0,0 +1,59 @@
+import threading
+
+
+def composite(image, sprite, x, y):
+    """Alpha-composite sprite onto image (RGBA, in place) with its top-left corner at (x, y), clipped to image."""
+    left, top = max(0, -x), max(0, -y)
+    right = min(sprite.width, image.width - x)
+    bottom = min(sprite.height, image.height - y)
+    if left >= right or top >= bottom:
+        return False
+    image.alpha_composite(sprite, (x + left, y + top), (left, top, right, bottom))
+    return True
+
+
+class SpriteCache:
+    """Pre-rendered RGBA sprites, built once per key and composited wherever they are drawn.
+
+    build(key) returns (sprite, (anchor x, anchor y)); paste() puts the
+    anchor on the requested pixel. Drawing a marker then costs one small
+    alpha_composite instead of shape and text calls, and glyph metrics are
+    measured only when a sprite is built. Safe to share between render
+    threads.
+    """
+
+    def __init__(self, build):
+        self.build = build
+        self._sprites = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.pastes = 0
+
+    def get(self, key):
+        """Return (sprite, anchor) for key, building it on first use."""
+        entry = self._sprites.get(key)
+        if entry is None:
+            with self._lock:
+                entry = self._sprites.get(key)
+                if entry is None:
+                    entry = self._sprites[key] = self.build(key)
+                    self.builds += 1
+        return entry
+
+    def paste(self, image, key, x, y):
+        """Composite the sprite for key onto image with its anchor on pixel (x, y)."""
+        sprite, (anchor_x, anchor_y) = self.get(key)
+        self.pastes += 1
+        return composite(image, sprite, x - anchor_x, y - anchor_y)
+
+    def clear(self):
+        """Drop every sprite, e.g. after the fonts they were drawn with changed."""
+        with self._lock:
+            self._sprites = {}
+
+    def memory_usage(self):
+        return sum(sprite.width * sprite.height * 4 for sprite, _ in list(self._sprites.values()))
+
+    def stats(self):
+        return {"sprites": len(self._sprites), "builds": self.builds, "pastes": self.pastes,
+                "memory_bytes": self.memory_usage()}
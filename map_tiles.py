@@ -0,0 +1,150 @@
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from logs import get_logger
+
+log = get_logger("maps")
+
+
+class ZoomTileCache:
+    """Pre-rendered zoom tiles: one resampled base-map crop per node at the zoom output size.
+
+    In "lazy" mode a tile is built the first time its node is zoomed on. In
+    "eager" mode every tile is built on a thread pool (or loaded from cache_dir)
+    by warm(). On disk the tiles are one raw RGBA file named after a hash of the
+    map image, the nodes file and the tile geometry, so editing either file
+    invalidates it and loading is a single read.
+    """
+
+    def __init__(self, assets, box_for, nodes, output_size, source_paths, mode="lazy", cache_dir=None, workers=4):
+        if mode not in ("off", "lazy", "eager"):
+            raise ValueError(f"Unknown tile cache mode {mode!r}")
+        self.assets = assets
+        self.box_for = box_for
+        self.nodes = nodes
+        self.output_size = output_size
+        self.source_paths = source_paths
+        self.mode = mode
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self._tiles = {}
+        self._base = None
+        self._lock = threading.Lock()
+        self.build_seconds = 0.0
+        self.loaded_from_disk = 0
+        self.built = 0
+
+    @property
+    def enabled(self):
+        return self.mode != "off"
+
+    def source_hash(self):
+        """Hash the map image, nodes file and tile geometry."""
+        digest = hashlib.sha256(repr(self.output_size).encode())
+        for path in self.source_paths:
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        return digest.hexdigest()[:16]
+
+    def _tile_path(self):
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, f"zoom-tiles-{self.source_hash()}.rgba")
+
+    def _build_tile(self, node, base):
+        tile = base.crop(self.box_for(node))
+        if tile.size != self.output_size:
+            tile = tile.resize(self.output_size, Image.Resampling.LANCZOS)
+        tile.load()
+        return tile
+
+    def _check_base(self):
+        """Drop every tile if the base map was reloaded since they were built."""
+        base = self.assets.get_base_map()
+        if base is not self._base:
+            with self._lock:
+                if base is not self._base:
+                    self._tiles = {}
+                    self._base = base
+        return base
+
+    def get(self, node):
+        """Return the tile for node (shared; copy before drawing), or None if tiles are off."""
+        if not self.enabled:
+            return None
+        base = self._check_base()
+        tile = self._tiles.get(node)
+        if tile is None:
+            tile = self._tiles[node] = self._build_tile(node, base)
+            self.built += 1
+        return tile
+
+    def warm(self):
+        """Build or load every tile; returns the number of seconds it took."""
+        start = time.perf_counter()
+        base = self._check_base()
+        tile_path = self._tile_path()
+        if tile_path and self._load_from_disk(tile_path):
+            self.build_seconds = time.perf_counter() - start
+            log.info("Loaded %s zoom tiles from %s in %.2fs", len(self._tiles), tile_path, self.build_seconds)
+            return self.build_seconds
+
+        missing = [node for node in self.nodes if node not in self._tiles]
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="zoom-tiles") as pool:
+            for node, tile in zip(missing, pool.map(lambda node: self._build_tile(node, base), missing)):
+                self._tiles[node] = tile
+        self.built += len(missing)
+        if tile_path:
+            self._save_to_disk(tile_path)
+        self.build_seconds = time.perf_counter() - start
+        log.info("Built %s zoom tiles in %.2fs", len(missing), self.build_seconds)
+        return self.build_seconds
+
+    def warm_in_background(self):
+        """Run warm() on a daemon thread so startup is not delayed."""
+        thread = threading.Thread(target=self.warm, name="zoom-tiles-warm", daemon=True)
+        thread.start()
+        return thread
+
+    def _load_from_disk(self, tile_path):
+        tile_bytes = self.output_size[0] * self.output_size[1] * 4
+        if not os.path.exists(tile_path) or os.path.getsize(tile_path) != tile_bytes * len(self.nodes):
+            return False
+        with open(tile_path, 'rb') as f:
+            data = f.read()
+        for i, node in enumerate(self.nodes):
+            self._tiles[node] = Image.frombytes("RGBA", self.output_size, data[i * tile_bytes:(i + 1) * tile_bytes])
+        self.loaded_from_disk = len(self.nodes)
+        return True
+
+    def _save_to_disk(self, tile_path):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Tiles for an older map.png / nodes.txt are useless now
+            for entry in os.listdir(self.cache_dir):
+                if entry.startswith("zoom-tiles-") and entry != os.path.basename(tile_path):
+                    os.remove(os.path.join(self.cache_dir, entry))
+            partial = tile_path + ".tmp"
+            with open(partial, 'wb') as f:
+                for node in self.nodes:
+                    f.write(self._tiles[node].tobytes())
+            os.replace(partial, tile_path)
+        except OSError as e:
+            log.warning("Could not write zoom tiles to %s: %s", tile_path, e)
+
+    def memory_usage(self):
+        """Return the number of bytes held by tile pixels."""
+        return sum(tile.width * tile.height * len(tile.getbands()) for tile in list(self._tiles.values()))
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "tiles": len(self._tiles),
+            "built": self.built,
+            "loaded_from_disk": self.loaded_from_disk,
+            "build_seconds": self.build_seconds,
+            "memory_bytes": self.memory_usage(),
+        }
@@ -0,0 +1,77 @@
+import time
+from collections import Counter
+
+
+class MemberCache:
+    """The Discord members of one game, so turns do not call fetch_member over REST.
+
+    Filled at /join with the member who ran the command. fetch() returns a
+    cached member younger than ttl seconds; otherwise it asks the gateway's
+    member cache (guild.get_member, no request) and only then REST
+    (guild.fetch_member), keeping whatever it found. Gateway events update or
+    drop entries through put() and invalidate(). Counts go to a Counter that
+    can be shared by every game's cache: hits, refreshes (expired entries
+    looked up again), gateway and rest lookups, and the seconds spent in rest.
+    """
+
+    def __init__(self, ttl=600.0, counts=None, clock=time.monotonic):
+        self.ttl = ttl
+        self.counts = counts if counts is not None else Counter()
+        self.clock = clock
+        self._members = {}
+
+    def put(self, member):
+        """Remember a member, e.g. interaction.user at /join or one from a member update event."""
+        self._members[member.id] = (member, self.clock())
+
+    def invalidate(self, member_id):
+        """Forget a member (left the guild, was banned, ...); returns True if it was cached."""
+        return self._members.pop(member_id, None) is not None
+
+    def __contains__(self, member_id):
+        return member_id in self._members
+
+    def __len__(self):
+        return len(self._members)
+
+    def get(self, member_id):
+        """Return a cached member that has not expired, or None."""
+        entry = self._members.get(member_id)
+        if entry and self.clock() - entry[1] <= self.ttl:
+            return entry[0]
+        return None
+
+    async def fetch(self, guild, member_id):
+        """Return the member, looking it up only on a miss; raises what guild.fetch_member raises."""
+        member = self.get(member_id)
+        if member is not None:
+            self.counts["hits"] += 1
+            return member
+        if member_id in self._members:
+            self.counts["refreshes"] += 1
+        member = guild.get_member(member_id)
+        if member is not None:
+            self.counts["gateway"] += 1
+        else:
+            start = time.perf_counter()
+            try:
+                member = await guild.fetch_member(member_id)
+            finally:
+                self.counts["rest"] += 1
+                self.counts["rest_seconds"] += time.perf_counter() - start
+        self.put(member)
+        return member
+
+
+def member_stats(counts):
+    """Summarise a MemberCache Counter: lookups, hit rate and average REST latency."""
+    lookups = counts["hits"] + counts["gateway"] + counts["rest"]
+    return {
+        "lookups": lookups,
+        "hits": counts["hits"],
+        "refreshes": counts["refreshes"],
+        "gateway": counts["gateway"],
+        "rest": counts["rest"],
+        "hit_rate": round(counts["hits"] / lookups, 3) if lookups else None,
+        "rest_ms": round(counts["rest_seconds"] / counts["rest"] * 1000, 1) if counts["rest"] else None,
+    }
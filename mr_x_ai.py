@@ -0,0 +1,332 @@
+import asyncio
+import math
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+import live_map
+import graph_index
+from render_pool import process_executor
+from logs import get_logger
+
+log = get_logger("ai")
+
+# Player id used for the bot's Mr. X (Discord ids are always positive)
+AI_MR_X_ID = -1
+
+# Rollout model
+HORIZON = 3             # rounds simulated after the candidate move
+CAUGHT_PENALTY = 10.0   # a rollout where Mr. X is caught scores -CAUGHT_PENALTY + rounds survived
+DISTANCE_CAP = 5        # distances beyond this are all equally safe
+AMBIGUITY_WEIGHT = 0.8  # value per doubling of the detectives' suspect set
+BLACK_TICKET_COST = 0.6 # a black ticket spent now cannot hide a later move
+EXPLORATION = 1.4       # UCB1 exploration constant
+
+
+def snapshot(game_state, budget_ms, seed=None):
+    """Return the picklable view of a GameState that choose_move needs."""
+    mr_x_id = game_state.mr_x_id
+    return {
+        "location": game_state.player_locations[mr_x_id],
+        "tickets": dict(game_state.player_tickets[mr_x_id]),
+        "detectives": [
+            (location, dict(game_state.player_tickets[player_id]))
+            for player_id, location in game_state.player_locations.items() if player_id != mr_x_id
+        ],
+        "round": game_state.round_counter,
+        "max_rounds": game_state.MAX_ROUNDS,
+        "suspects": game_state.suspects.mask,
+        "budget_ms": budget_ms,
+        "seed": seed,
+    }
+
+
+def _popcount(mask):
+    return bin(mask).count("1")
+
+
+_capped_distances = (None, None)
+
+
+def _distance_rows(tables):
+    """Combined-graph distances as nested lists indexed by node id and capped at DISTANCE_CAP.
+
+    Rollouts do millions of scalar lookups, which are several times faster on
+    lists than through DistanceTables.lookup. Built once per tables object.
+    """
+    global _capped_distances
+    if _capped_distances[0] is not tables:
+        size = max(tables.nodes) + 1
+        rows = [[DISTANCE_CAP] * size for _ in range(size)]
+        dist = tables.dist[tables.dist.shape[0] - 1].tolist()
+        for i, a in enumerate(tables.nodes):
+            row = rows[a]
+            for j, b in enumerate(tables.nodes):
+                row[b] = min(dist[i][j], DISTANCE_CAP)
+        _capped_distances = (tables, rows)
+    return _capped_distances[1]
+
+
+class _Search:
+    """Flat Monte Carlo tree search over Mr. X's legal moves.
+
+    Each root move (destination, ticket) is an arm; UCB1 decides which arm gets
+    the next rollout until the time budget runs out. A rollout plays HORIZON
+    rounds: detectives close in on Mr. X's real position with a probability
+    that falls as their suspect set grows (they only know the set), Mr. X
+    flees greedily. Black tickets widen the suspect set like any-mode moves,
+    so their value shows up as fewer catches, minus a fixed ticket cost.
+    """
+
+    def __init__(self, state, rng):
+        self.graph = live_map.GRAPH
+        self.rows = _distance_rows(live_map.DISTANCES)
+        self.state = state
+        self.rng = rng
+        self.reveal_rounds = set(live_map.REVEAL_ROUNDS)
+        self.detectives = [location for location, _ in state["detectives"]]
+        self.detective_tickets = [
+            {mode: tickets.get(mode, 0) for mode in graph_index.MODES} for _, tickets in state["detectives"]
+        ]
+
+    def root_moves(self):
+        """Return every legal (dest, ticket) for Mr. X, black tickets included."""
+        tickets = self.state["tickets"]
+        occupied = set(self.detectives)
+        moves = []
+        for dest, modes in self.graph.edges(self.state["location"]):
+            if dest in occupied:
+                continue
+            for mode in modes:
+                if tickets.get(mode, 0) > 0:
+                    moves.append((dest, mode))
+            if tickets.get("black", 0) > 0:
+                moves.append((dest, "black"))
+        return moves
+
+    def distance(self, a, b):
+        return self.rows[a][b]
+
+    def _suspects_after(self, suspects, mode, location, detectives, round_number):
+        if round_number in self.reveal_rounds:
+            return 1 << location
+        blocked = 0
+        for detective in detectives:
+            blocked |= 1 << detective
+        return self.graph.expand(suspects, mode) & ~blocked
+
+    def _detective_step(self, location, tickets, mr_x, ambiguity, taken):
+        """Move one detective in a rollout; returns its new location (or the old one if stuck)."""
+        options = [
+            (dest, mode) for dest, modes in self.graph.edges(location) for mode in modes
+            if tickets[mode] > 0 and dest not in taken
+        ]
+        if not options:
+            return location
+        if self.rng.random() < 1.0 / math.sqrt(ambiguity):
+            row = self.rows[mr_x]
+            dest, mode = min(options, key=lambda option: (row[option[0]], self.rng.random()))
+        else:
+            dest, mode = self.rng.choice(options)
+        tickets[mode] -= 1
+        return dest
+
+    def _flee_step(self, mr_x, detectives):
+        """Greedy Mr. X in rollouts: go where the nearest detective is furthest away."""
+        occupied = set(detectives)
+        options = [dest for dest in self.graph.neighbors(mr_x) if dest not in occupied]
+        if not options:
+            return None
+        rows = self.rows
+        return max(options, key=lambda dest: (min([rows[dest][d] for d in detectives], default=DISTANCE_CAP),
+                                              self.rng.random()))
+
+    def rollout(self, dest, ticket):
+        state = self.state
+        round_number = state["round"]
+        mode = None if ticket == "black" else ticket
+        suspects = self._suspects_after(state["suspects"], mode, dest, self.detectives, round_number)
+        first_ambiguity = max(_popcount(suspects), 1)
+        detectives = list(self.detectives)
+        tickets = [dict(t) for t in self.detective_tickets]
+        mr_x = dest
+
+        for step in range(HORIZON):
+            ambiguity = max(_popcount(suspects), 1)
+            for i in range(len(detectives)):
+                taken = set(detectives[:i] + detectives[i + 1:])
+                detectives[i] = self._detective_step(detectives[i], tickets[i], mr_x, ambiguity, taken)
+                if detectives[i] == mr_x:
+                    return -CAUGHT_PENALTY + step
+                suspects &= ~(1 << detectives[i])
+            round_number += 1
+            if round_number > state["max_rounds"]:
+                break
+            following = self._flee_step(mr_x, detectives)
+            if following is None:
+                return -CAUGHT_PENALTY + step
+            mode = self.graph.modes_between(mr_x, following)[0]
+            suspects = self._suspects_after(suspects, mode, following, detectives, round_number)
+            mr_x = following
+
+        safety = min(self.distance(mr_x, d) for d in detectives) if detectives else DISTANCE_CAP
+        value = safety + AMBIGUITY_WEIGHT * math.log2(first_ambiguity)
+        if ticket == "black":
+            value -= BLACK_TICKET_COST
+        return value
+
+    def run(self, deadline, max_rollouts=None):
+        """Return (best move, {move: (rollouts, mean value)})."""
+        moves = self.root_moves()
+        if not moves:
+            return None, {}
+        counts = [0] * len(moves)
+        totals = [0.0] * len(moves)
+        done = 0
+        while True:
+            if done >= len(moves) and (time.perf_counter() >= deadline or (max_rollouts and done >= max_rollouts)):
+                break
+            if done < len(moves):
+                arm = done
+            else:
+                log_total = math.log(done)
+                arm = max(range(len(moves)), key=lambda i: totals[i] / counts[i]
+                          + EXPLORATION * math.sqrt(log_total / counts[i]))
+            totals[arm] += self.rollout(*moves[arm])
+            counts[arm] += 1
+            done += 1
+        best = max(range(len(moves)), key=lambda i: (totals[i] / counts[i], counts[i]))
+        return moves[best], {move: (counts[i], totals[i] / counts[i]) for i, move in enumerate(moves)}
+
+
+def choose_move(state, max_rollouts=None):
+    """Pick Mr. X's move for a snapshot() within state["budget_ms"]; returns (dest, ticket) or None.
+
+    Runs in a worker process: live_map (and with it GRAPH and DISTANCES) is
+    initialised when the worker imports this module.
+    """
+    deadline = time.perf_counter() + state["budget_ms"] / 1000
+    search = _Search(state, random.Random(state.get("seed")))
+    move, _ = search.run(deadline, max_rollouts)
+    return move
+
+
+def fallback_move(state):
+    """Cheap move used when the search fails or times out: flee from the nearest detective."""
+    search = _Search(state, random.Random(state.get("seed")))
+    moves = [move for move in search.root_moves() if move[1] != "black"] or search.root_moves()
+    if not moves:
+        return None
+    detectives = search.detectives
+    return max(moves, key=lambda move: min((search.distance(move[0], d) for d in detectives), default=0))
+
+
+def warm_worker():
+    """Load what a search needs (the distance tables) in the calling worker; returns its pid."""
+    live_map.lazy("DISTANCES")
+    return os.getpid()
+
+
+class PooledAgent:
+    """Runs a bot player's search on a thread or process pool, off the event loop.
+
+    Subclasses set ENV_PREFIX (for from_env) and implement choose(); the
+    search function must be a picklable module-level function so process
+    pools can run it.
+    """
+
+    ENV_PREFIX = None
+
+    def __init__(self, mode="process", workers=1, budget_ms=1000):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown AI pool mode {mode!r}")
+        self.mode = mode
+        self.workers = workers
+        self.budget_ms = budget_ms
+        self._executor = None
+        self.moves = 0
+        self.fallbacks = 0
+        self.total_seconds = 0.0
+        self.warmup_seconds = None
+
+    @classmethod
+    def from_env(cls, default_budget_ms=1000):
+        """Build an agent from <ENV_PREFIX>_MODE, <ENV_PREFIX>_WORKERS and <ENV_PREFIX>_BUDGET_MS."""
+        prefix = cls.ENV_PREFIX
+        return cls(
+            mode=os.getenv(f"{prefix}_MODE", "process"),
+            workers=int(os.getenv(f"{prefix}_WORKERS", "1")),
+            budget_ms=int(os.getenv(f"{prefix}_BUDGET_MS", str(default_budget_ms))),
+        )
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.mode == "process":
+                self._executor = process_executor(self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=type(self).__name__)
+        return self._executor
+
+    async def warm_up(self):
+        """Start every pool worker and load its distance tables now, e.g. from on_ready; returns the seconds taken.
+
+        Spawned workers import the bot and build the map before their first
+        task, which would otherwise land on the first AI move.
+        """
+        if self.warmup_seconds is not None:
+            return self.warmup_seconds  # on_ready runs again after every reconnect
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        start = time.perf_counter()
+        try:
+            # One task per worker: a process pool starts a new worker while none is idle
+            pids = await asyncio.gather(*(loop.run_in_executor(executor, warm_worker) for _ in range(self.workers)))
+        except Exception:
+            log.exception("Warming up the %s pool failed; workers will start on the first move", type(self).__name__)
+            return None
+        self.warmup_seconds = time.perf_counter() - start
+        log.info("%s %s pool ready in %.2fs (%s worker(s))", type(self).__name__, self.mode,
+                 self.warmup_seconds, len(set(pids)))
+        return self.warmup_seconds
+
+    async def _search(self, search, fallback, state):
+        """Run search(state) on the pool; on error or timeout return fallback(state) instead."""
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            move = await asyncio.wait_for(
+                loop.run_in_executor(self._get_executor(), search, state),
+                self.budget_ms / 1000 + 5.0,
+            )
+        except Exception as e:
+            log.warning("%s search failed (%s: %s), using fallback move", type(self).__name__, type(e).__name__, e)
+            self.fallbacks += 1
+            move = fallback(state)
+        self.moves += 1
+        self.total_seconds += time.perf_counter() - start
+        return move
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "budget_ms": self.budget_ms,
+            "moves": self.moves,
+            "fallbacks": self.fallbacks,
+            "warmup_seconds": self.warmup_seconds,
+            "avg_move_ms": self.total_seconds / self.moves * 1000 if self.moves else 0.0,
+        }
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+class MrXAgent(PooledAgent):
+    """Chooses the bot's Mr. X moves with choose_move (MRX_AI_* settings)."""
+
+    ENV_PREFIX = "MRX_AI"
+
+    async def choose(self, game_state):
+        """Return (dest, ticket) for the game's Mr. X, or None if he has no legal move."""
+        return await self._search(choose_move, fallback_move, snapshot(game_state, self.budget_ms))
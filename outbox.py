@@ -0,0 +1,210 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from logs import get_logger
+
+# Discord's per-message limits
+MAX_CONTENT = 2000
+MAX_FILES = 10
+MAX_EMBEDS = 10
+
+log = get_logger("outbox")
+
+
+class SendBucket:
+    """Token bucket for one rate-limit bucket: at most `rate` sends per `per` seconds, with bursts of `rate`."""
+
+    def __init__(self, rate, per):
+        self.rate = rate
+        self.per = per
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait for a token; returns the seconds spent waiting."""
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate / self.per)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) * self.per / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+
+class SendLimiter:
+    """Paces outgoing messages per channel so bursts wait here instead of drawing 429s from Discord.
+
+    Discord allows about 5 messages per 5 seconds per channel. discord.py
+    only learns a bucket is empty from the responses, so a burst of sends
+    still draws 429s, and each rejected request is a wasted round trip that
+    counts against the global limit too. Shared by every game in the
+    process; buckets idle long enough to be full again are dropped.
+    """
+
+    def __init__(self, rate=5, per=5.0, max_buckets=1024):
+        self.rate = rate
+        self.per = per
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()
+        self.sends = 0
+        self.waits = 0
+        self.waited_seconds = 0.0
+
+    @classmethod
+    def from_env(cls):
+        """Build a limiter from DISCORD_SEND_RATE messages per DISCORD_SEND_PER seconds."""
+        return cls(
+            rate=int(os.getenv("DISCORD_SEND_RATE", "5")),
+            per=float(os.getenv("DISCORD_SEND_PER", "5")),
+        )
+
+    def bucket(self, key):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = SendBucket(self.rate, self.per)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    async def acquire(self, key):
+        waited = await self.bucket(key).acquire()
+        self.sends += 1
+        if waited:
+            self.waits += 1
+            self.waited_seconds += waited
+
+    def stats(self):
+        return {
+            "buckets": len(self._buckets),
+            "sends": self.sends,
+            "waits": self.waits,
+            "waited_seconds": round(self.waited_seconds, 3),
+        }
+
+
+def _same_target(a, b):
+    # Interaction.followup builds a new Webhook on every access; followups of one interaction share its token
+    return a is b or (getattr(a, "token", None) is not None and a.token == getattr(b, "token", None))
+
+
+class _Message:
+    __slots__ = ("target", "lane", "ephemeral", "content", "files", "embeds", "on_error")
+
+    def __init__(self, target, lane, ephemeral):
+        self.target = target
+        self.lane = lane
+        self.ephemeral = ephemeral
+        self.content = []
+        self.files = []
+        self.embeds = []
+        self.on_error = []
+
+    def fits(self, content, file, embed):
+        length = sum(len(text) + 1 for text in self.content) + (len(content) if content else -1)
+        return (length <= MAX_CONTENT
+                and len(self.files) + (file is not None) <= MAX_FILES
+                and len(self.embeds) + (embed is not None) <= MAX_EMBEDS)
+
+    def add(self, content, file, embed, on_error):
+        if content:
+            self.content.append(content)
+        if file is not None:
+            self.files.append(file)
+        if embed is not None:
+            self.embeds.append(embed)
+        if on_error is not None:
+            self.on_error.append(on_error)
+
+    def kwargs(self):
+        kwargs = {}
+        if self.content:
+            kwargs["content"] = "\n".join(self.content)
+        if self.files:
+            kwargs["files"] = self.files
+        if self.embeds:
+            kwargs["embeds"] = self.embeds
+        if self.ephemeral:
+            kwargs["ephemeral"] = True
+        return kwargs
+
+
+class Outbox:
+    """The messages one turn sends, delivered in as few Discord calls as possible.
+
+    send() only queues. flush() merges each run of messages to the same
+    target into one message (texts joined by newlines, files and embeds
+    attached) within Discord's limits, then delivers every lane in order
+    while different lanes run concurrently. A lane is where the messages
+    show up: by default the target itself, so the game channel and a DM to
+    Mr. X go out side by side, but an interaction followup can name its
+    channel as lane to stay in order with plain channel messages. Each call
+    first takes a token from the limiter's bucket for its lane.
+
+    merge=False sends each queued message on its own, in the same order.
+    """
+
+    def __init__(self, limiter=None, merge=True):
+        self.limiter = limiter
+        self.merge = merge
+        self._messages = []
+        self.queued = 0
+        self.calls = 0
+        self.failures = 0
+
+    def send(self, target, content=None, *, file=None, embed=None, ephemeral=False, lane=None, on_error=None):
+        """Queue a message for target (a channel, member, user or interaction followup).
+
+        on_error is an async callable given the exception if the message that
+        carries this one fails; without it the failure is logged.
+        """
+        lane = lane if lane is not None else getattr(target, "id", id(target))
+        last = self._messages[-1] if self._messages else None
+        if not (self.merge and last is not None and _same_target(last.target, target) and last.lane == lane
+                and last.ephemeral == ephemeral and last.fits(content, file, embed)):
+            # Only the last message of a lane may grow, so nothing jumps ahead of earlier sends
+            last = _Message(target, lane, ephemeral)
+            self._messages.append(last)
+        last.add(content, file, embed, on_error)
+        self.queued += 1
+
+    def __len__(self):
+        return len(self._messages)
+
+    async def _deliver(self, message):
+        if self.limiter:
+            await self.limiter.acquire(message.lane)
+        self.calls += 1
+        try:
+            await message.target.send(**message.kwargs())
+        except Exception as e:
+            self.failures += 1
+            if not message.on_error:
+                log.exception("Failed to send a message to %s", message.lane)
+            for handler in message.on_error:
+                try:
+                    await handler(e)
+                except Exception:
+                    log.exception("Error handler for a message to %s failed", message.lane)
+
+    async def _deliver_lane(self, messages):
+        for message in messages:
+            await self._deliver(message)
+
+    async def flush(self):
+        """Send everything queued; returns the number of API calls made."""
+        messages, self._messages = self._messages, []
+        lanes = {}
+        for message in messages:
+            lanes.setdefault(message.lane, []).append(message)
+        calls = self.calls
+        await asyncio.gather(*(self._deliver_lane(lane) for lane in lanes.values()))
+        return self.calls - calls
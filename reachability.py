@@ -0,0 +1,159 @@
+import os
+import threading
+from collections import OrderedDict
+import graph_index
+
+MODE_INDEX = {mode: i for i, mode in enumerate(graph_index.MODES)}
+
+# Detectives get a warning when they will run out of usable tickets within this many turns
+TRAP_WARNING_TURNS = int(os.getenv("TRAP_WARNING_TURNS", "3"))
+# How many moves ahead /moves looks for reachable stations and plans
+PLAN_DEPTH = int(os.getenv("MOVE_PLAN_DEPTH", "4"))
+
+
+def ticket_vector(tickets, cap):
+    """(taxi, bus, metro) counts from a tickets dict, capped at cap since more than cap can never be spent."""
+    return tuple(min(max(tickets.get(mode, 0), 0), cap) for mode in graph_index.MODES)
+
+
+def _dominated(seen, tickets):
+    """True if some vector in seen has at least as many of every ticket."""
+    for other in seen:
+        if all(a >= b for a, b in zip(other, tickets)):
+            return True
+    return False
+
+
+class ReachabilityEngine:
+    """Where a detective can get to with the tickets they actually hold.
+
+    Searches states (node, remaining tickets) rather than nodes, so routes that
+    need a ticket the player has run out of are never suggested. Ticket counts
+    are capped at the search depth and a state is pruned when the same node was
+    already reached with at least as many of every ticket. Answers are memoized
+    (LRU) on (node, capped tickets, depth), so repeated turns cost a dict lookup.
+    The memo is shared by the event loop and the detective worker threads, so
+    it is only touched under a lock; searches themselves run outside it.
+    """
+
+    def __init__(self, graph, max_entries=4096):
+        self.graph = graph
+        self.max_entries = max_entries
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._memo[key] = value
+            while len(self._memo) > self.max_entries:
+                self._memo.popitem(last=False)
+        return value
+
+    def _lookup(self, key):
+        with self._lock:
+            value = self._memo.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._memo.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def _successors(self, node, tickets):
+        """Yield (dest, mode, tickets after the move) for every affordable edge out of node."""
+        for dest, modes in self.graph.edges(node):
+            for mode in modes:
+                i = MODE_INDEX[mode]
+                if tickets[i] > 0:
+                    yield dest, mode, tickets[:i] + (tickets[i] - 1,) + tickets[i + 1:]
+
+    def reachable(self, node, tickets, k):
+        """Return {dest: fewest moves} for every node reachable in 1..k moves with tickets."""
+        capped = ticket_vector(tickets, k)
+        key = ("reach", node, capped, k)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        first = {}
+        seen = {node: [capped]}
+        frontier = [(node, capped)]
+        for depth in range(1, k + 1):
+            following = []
+            for current, remaining in frontier:
+                for dest, _, after in self._successors(current, remaining):
+                    if _dominated(seen.get(dest, ()), after):
+                        continue
+                    seen.setdefault(dest, []).append(after)
+                    first.setdefault(dest, depth)
+                    following.append((dest, after))
+            frontier = following
+        first.pop(node, None)
+        return self._remember(key, first)
+
+    def moves_left(self, node, tickets, horizon):
+        """Return the longest run of legal moves from node, counting at most horizon."""
+        return self._moves_left(node, ticket_vector(tickets, horizon), horizon)
+
+    def _moves_left(self, node, tickets, horizon):
+        if horizon == 0:
+            return 0
+        key = ("left", node, tickets, horizon)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        best = 0
+        for dest, _, after in self._successors(node, tickets):
+            best = max(best, 1 + self._moves_left(dest, tuple(min(t, horizon - 1) for t in after), horizon - 1))
+            if best == horizon:
+                break
+        return self._remember(key, best)
+
+    def trapped_within(self, node, tickets, turns):
+        """True if every sequence of moves from node runs out of tickets before turns moves."""
+        return self.moves_left(node, tickets, turns) < turns
+
+    def plan(self, node, tickets, targets, k):
+        """Return the fewest-move affordable route [(mode, dest), ...] to any of targets within k moves, or None."""
+        targets = frozenset(targets)
+        capped = ticket_vector(tickets, k)
+        key = ("plan", node, capped, targets, k)
+        cached = self._lookup(key)
+        if cached is not None:
+            # Routes are stored as tuples, with () for "no route", so callers get their own list
+            return list(cached) if cached else None
+
+        seen = {node: [capped]}
+        parents = {(node, capped): None}
+        frontier = [(node, capped)]
+        for _ in range(k):
+            following = []
+            for state in frontier:
+                for dest, mode, after in self._successors(*state):
+                    if _dominated(seen.get(dest, ()), after):
+                        continue
+                    seen.setdefault(dest, []).append(after)
+                    parents[dest, after] = (state, mode)
+                    if dest in targets:
+                        route = []
+                        step = (dest, after)
+                        while parents[step] is not None:
+                            previous, used = parents[step]
+                            route.append((used, step[0]))
+                            step = previous
+                        return list(self._remember(key, tuple(route[::-1])))
+                    following.append((dest, after))
+            frontier = following
+        self._remember(key, ())
+        return None
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._memo),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,94 @@
+import io
+import os
+from collections import OrderedDict
+
+
+class RenderCache:
+    """Bounded LRU of encoded map images keyed by what the image actually shows.
+
+    Keys come from live_map.render_key (visible tokens, round, reveal flag, zoom
+    node), so an identical request in the same game reuses the earlier bytes.
+    Entries are grouped per game under its session key (guild, channel), so a
+    reset, eviction or park drops that game's images.
+    """
+
+    def __init__(self, max_entries=64, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls):
+        """Build a cache sized by RENDER_CACHE_SIZE entries and RENDER_CACHE_MB (0 disables caching)."""
+        return cls(
+            max_entries=int(os.getenv("RENDER_CACHE_SIZE", "64")),
+            max_bytes=int(float(os.getenv("RENDER_CACHE_MB", "64")) * 1024 * 1024),
+        )
+
+    def get(self, game_key, key):
+        """Return a fresh BytesIO for a cached image, or None on a miss."""
+        data = self._entries.get((game_key, key))
+        if data is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end((game_key, key))
+        self.hits += 1
+        return io.BytesIO(data)
+
+    def put(self, game_key, key, data):
+        """Store encoded image bytes, evicting the least recently used entries."""
+        if self.max_entries <= 0 or len(data) > self.max_bytes:
+            return
+        old = self._entries.pop((game_key, key), None)
+        if old is not None:
+            self._bytes -= len(old)
+        self._entries[game_key, key] = data
+        self._bytes += len(data)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+
+    async def get_or_render(self, game_key, key, render):
+        """Return the cached image for key, or await render() and cache its result."""
+        cached = self.get(game_key, key)
+        if cached is not None:
+            return cached
+        buffer = await render()
+        if buffer is not None:
+            self.put(game_key, key, buffer.getvalue())
+        return buffer
+
+    def evict_game(self, game_key):
+        """Drop every cached image that belongs to one game."""
+        stale = [entry for entry in self._entries if entry[0] == game_key]
+        for entry in stale:
+            self._bytes -= len(self._entries.pop(entry))
+        self.evictions += len(stale)
+        return len(stale)
+
+    def clear(self):
+        self.evictions += len(self._entries)
+        self._entries.clear()
+        self._bytes = 0
+
+    def memory_usage(self):
+        """Return the number of bytes of encoded images held."""
+        return self._bytes
+
+    def stats(self):
+        """Return hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "memory_bytes": self.memory_usage(),
+        }
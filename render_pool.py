@@ -0,0 +1,154 @@
+import asyncio
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import live_map
+
+
+class RenderQueueFull(Exception):
+    """Raised when a render is rejected because the pool is at its queue depth."""
+
+
+def _render_to_bytes(args, kwargs, renderer=None):
+    """Run generate_map (or renderer.render) in a worker and return the encoded PNG bytes."""
+    render = renderer.render if renderer is not None else live_map.generate_map
+    buffer = render(*args, **kwargs)
+    if buffer is None:
+        return None
+    return buffer.getvalue()
+
+
+def process_executor(max_workers):
+    """Return a ProcessPoolExecutor whose workers are started with spawn on every platform.
+
+    By the time a pool is first used the bot runs several threads (event
+    loop, log listener, store writer), and a forked child can deadlock on a
+    lock one of them held. Spawned workers start a fresh interpreter and
+    import the main module as __mp_main__, which is why the entry points keep
+    client.run() under a __main__ guard. Workers start on the first submit;
+    warm the pool up after startup so no move pays for that.
+    """
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+class MapRenderPool:
+    """Runs live_map.generate_map off the event loop on a bounded thread or process pool."""
+
+    def __init__(self, mode="thread", max_workers=2, max_queue=8, timeout=15.0, reject_when_full=False):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown render pool mode {mode!r}")
+        self.mode = mode
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.reject_when_full = reject_when_full
+        self._executor = None
+        self._slots = None
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.finished = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.total_wait = 0.0
+        self.total_render = 0.0
+
+    @classmethod
+    def from_env(cls):
+        """Build a pool from RENDER_POOL_* environment variables."""
+        return cls(
+            mode=os.getenv("RENDER_POOL_MODE", "thread"),
+            max_workers=int(os.getenv("RENDER_POOL_WORKERS", "2")),
+            max_queue=int(os.getenv("RENDER_POOL_QUEUE", "8")),
+            timeout=float(os.getenv("RENDER_POOL_TIMEOUT", "15")),
+            reject_when_full=os.getenv("RENDER_POOL_REJECT", "0") == "1",
+        )
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.mode == "process":
+                self._executor = process_executor(self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="map-render")
+        return self._executor
+
+    def _release(self, started):
+        self.in_flight -= 1
+        self.finished += 1
+        self.total_render += time.perf_counter() - started
+        self._slots.release()
+
+    async def render(self, *args, renderer=None, **kwargs):
+        """Render a map in the pool and return it as a BytesIO (None if rendering failed).
+
+        renderer is an optional object with a generate_map-compatible render(),
+        e.g. a map_layers.LayeredMapRenderer. It keeps its canvas in this process,
+        so it is only used in thread mode.
+        """
+        loop = asyncio.get_running_loop()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_queue)
+        if self.reject_when_full and self._slots.locked():
+            self.rejected += 1
+            raise RenderQueueFull(f"Map render queue is full ({self.max_queue} pending)")
+
+        queued = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise RenderQueueFull(f"Timed out waiting for a free render slot ({self.max_queue} pending)")
+        started = time.perf_counter()
+        self.total_wait += started - queued
+        self.submitted += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+        # The slot is released when the worker really finishes, not when we stop waiting,
+        # so timed-out renders still count against the queue depth.
+        if self.mode != "thread":
+            renderer = None
+        future = self._get_executor().submit(_render_to_bytes, args, kwargs, renderer)
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release, started))
+        try:
+            data = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self.timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            self.timed_out += 1
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+
+        self.completed += 1
+        if data is None:
+            self.failed += 1
+            return None
+        return io.BytesIO(data)
+
+    def stats(self):
+        """Return throughput and backpressure counters for the pool."""
+        return {
+            "mode": self.mode,
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "avg_wait_ms": self.total_wait / self.submitted * 1000 if self.submitted else 0.0,
+            "avg_render_ms": self.total_render / self.finished * 1000 if self.finished else 0.0,
+        }
+
+    def shutdown(self, wait=True):
+        """Stop the worker pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
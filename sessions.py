@@ -0,0 +1,274 @@
+import asyncio
+import os
+import statistics
+import time
+from collections import Counter, deque
+import compact_state
+from game import GameState
+from game_store import decode_state
+from members import MemberCache, member_stats
+from logs import get_logger
+
+log = get_logger("sessions")
+
+
+class SessionLimitReached(Exception):
+    """Raised when a new game would exceed the configured number of concurrent games."""
+
+
+class GameSession:
+    """A single game bound to one guild channel."""
+
+    def __init__(self, key, state, store=None, members=None):
+        self.key = key
+        self._state = state
+        self._packed = None   # compact_state bytes while the game is parked
+        self._factory = type(state)
+        self.store = store
+        self.finished = None  # EventLog of the last game that ended here, for /replay
+        self.members = members if members is not None else MemberCache()
+        self.lock = asyncio.Lock()
+        self.created_at = time.monotonic()
+        self.last_active = self.created_at
+
+    @property
+    def state(self):
+        """The live GameState, unpacked on first use after the session was parked."""
+        if self._state is None:
+            self._state = compact_state.unpack(self._packed, self._factory)
+            self._packed = None
+        return self._state
+
+    @state.setter
+    def state(self, state):
+        self._state = state
+        self._packed = None
+
+    @property
+    def parked(self):
+        return self._state is None
+
+    def park(self):
+        """Swap the game for its compact bytes until it is next used; returns False if it cannot be packed."""
+        if self._state is None:
+            return True
+        try:
+            self._packed = compact_state.pack(self._state)
+        except ValueError:
+            return False
+        self._factory = type(self._state)
+        self._state = None
+        return True
+
+    def touch(self):
+        """Mark the session as used now."""
+        self.last_active = time.monotonic()
+
+    def idle_for(self, now=None):
+        """Return how many seconds the session has been idle."""
+        return (now if now is not None else time.monotonic()) - self.last_active
+
+    def save(self):
+        """Snapshot the game to the store after a change that is not a move (joins, /begin, ...)."""
+        if self.store:
+            self.store.save(self.key, self.state)
+
+    def record_move(self, player_id, dest, ticket):
+        """Append a move that was just played to the store's log."""
+        if self.store:
+            self.store.record_move(self.key, self.state, player_id, dest, ticket)
+
+    def forget(self):
+        """Delete the game from the store once it is over."""
+        if self.store:
+            self.store.drop(self.key)
+
+
+class SessionRegistry:
+    """Holds one GameState per (guild, channel) so several games can run in one process.
+
+    on_evict(key) is called for every session that is removed, evicted or
+    parked, so caches kept per session key can drop its entries.
+    """
+
+    def __init__(self, factory=GameState, max_sessions=100, idle_timeout=3600.0, store=None, park_after=600.0,
+                 member_ttl=600.0, turn_samples=1000, on_evict=None):
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.store = store
+        self.on_evict = on_evict
+        self.park_after = park_after
+        self.member_ttl = member_ttl
+        self.member_counts = Counter()  # shared by every session's MemberCache
+        self.turn_times = deque(maxlen=turn_samples)
+        self._sessions = {}
+        self.created = 0
+        self.evicted = 0
+        self.parks = 0
+        self.rejected = 0
+        self.evictor_running = False
+
+    @classmethod
+    def from_env(cls, factory=GameState, store=None, on_evict=None):
+        """Build a registry from MAX_GAMES, GAME_IDLE_TIMEOUT, GAME_PARK_AFTER and MEMBER_CACHE_TTL environment variables."""
+        return cls(
+            factory=factory,
+            max_sessions=int(os.getenv("MAX_GAMES", "100")),
+            idle_timeout=float(os.getenv("GAME_IDLE_TIMEOUT", "3600")),
+            store=store,
+            park_after=float(os.getenv("GAME_PARK_AFTER", "600")),
+            member_ttl=float(os.getenv("MEMBER_CACHE_TTL", "600")),
+            on_evict=on_evict,
+        )
+
+    def _new_session(self, key, state):
+        return GameSession(key, state, self.store, MemberCache(self.member_ttl, self.member_counts))
+
+    @staticmethod
+    def key_for(guild_id, channel_id):
+        return (guild_id, channel_id)
+
+    def _evicted(self, key):
+        if self.on_evict:
+            self.on_evict(key)
+
+    def get(self, guild_id, channel_id):
+        """Return the session for a channel, or None if no game exists there."""
+        session = self._sessions.get(self.key_for(guild_id, channel_id))
+        if session:
+            session.touch()
+        return session
+
+    def get_or_create(self, guild_id, channel_id):
+        """Return the channel's session, creating it if needed."""
+        key = self.key_for(guild_id, channel_id)
+        session = self._sessions.get(key)
+        if session is None:
+            if len(self._sessions) >= self.max_sessions:
+                self.evict_idle()
+            if len(self._sessions) >= self.max_sessions:
+                self.rejected += 1
+                raise SessionLimitReached(f"Too many games in progress ({self.max_sessions})")
+            session = self._new_session(key, self.factory())
+            self._sessions[key] = session
+            self.created += 1
+        session.touch()
+        return session
+
+    def for_interaction(self, interaction, create=True):
+        """Look up the session for the channel an interaction came from."""
+        if create:
+            return self.get_or_create(interaction.guild_id, interaction.channel_id)
+        return self.get(interaction.guild_id, interaction.channel_id)
+
+    def remove(self, guild_id, channel_id):
+        """Drop a channel's session; returns True if one existed."""
+        session = self._sessions.pop(self.key_for(guild_id, channel_id), None)
+        if session:
+            session.forget()
+            self._evicted(session.key)
+        return session is not None
+
+    def recover(self, apply):
+        """Rebuild every game saved in the store: load its snapshot, then apply(state, entry) each later move.
+
+        Call once at startup, before any command is handled. Returns the number of games restored.
+        """
+        if not self.store:
+            return 0
+        start = time.perf_counter()
+        replayed = 0
+        for key, (snapshot, entries) in self.store.load().items():
+            state = decode_state(snapshot, self.factory)
+            for entry in entries:
+                apply(state, entry)
+            replayed += len(entries)
+            self._sessions[key] = self._new_session(key, state)
+        log.info("Recovered %s game(s) and %s logged move(s) in %.3fs",
+                 len(self._sessions), replayed, time.perf_counter() - start)
+        return len(self._sessions)
+
+    def evict_idle(self, now=None):
+        """Remove sessions idle longer than idle_timeout that are not mid-move."""
+        now = now if now is not None else time.monotonic()
+        stale = [key for key, session in self._sessions.items()
+                 if session.idle_for(now) > self.idle_timeout and not session.lock.locked()]
+        for key in stale:
+            self._sessions.pop(key).forget()
+            self._evicted(key)
+        self.evicted += len(stale)
+        if stale:
+            log.info("Evicted %s idle game(s), %s remaining", len(stale), len(self._sessions))
+        return len(stale)
+
+    def park_idle(self, now=None):
+        """Pack games idle longer than park_after into compact bytes; they unpack on their next command."""
+        if not self.park_after:
+            return 0
+        now = now if now is not None else time.monotonic()
+        parked = 0
+        for key, session in self._sessions.items():
+            if not session.parked and session.idle_for(now) > self.park_after and not session.lock.locked():
+                if session.park():
+                    self._evicted(key)
+                    parked += 1
+        self.parks += parked
+        return parked
+
+    async def run_evictor(self, interval=60.0):
+        """Periodically evict idle sessions and park quiet ones; start once from on_ready."""
+        if self.evictor_running:
+            return
+        self.evictor_running = True
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                self.evict_idle()
+                self.park_idle()
+        finally:
+            self.evictor_running = False
+
+    def member_updated(self, member):
+        """Gateway hook: refresh a member cached by any game in its guild (nick, avatar or roles changed)."""
+        for session in self._sessions.values():
+            if session.key[0] == member.guild.id and member.id in session.members:
+                session.members.put(member)
+
+    def member_removed(self, guild_id, member_id):
+        """Gateway hook: forget a member who left or was removed from a guild."""
+        for session in self._sessions.values():
+            if session.key[0] == guild_id:
+                session.members.invalidate(member_id)
+
+    def record_turn(self, seconds):
+        """Record how long one turn took to handle, for the turn latency in stats()."""
+        self.turn_times.append(seconds)
+
+    def sessions(self):
+        return list(self._sessions.values())
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def stats(self):
+        """Return counters describing registry usage."""
+        return {
+            "active": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "created": self.created,
+            "evicted": self.evicted,
+            "rejected": self.rejected,
+            "parks": self.parks,
+            "parked": sum(session.parked for session in self._sessions.values()),
+            "members": member_stats(self.member_counts),
+            "turn_ms": _percentiles(self.turn_times),
+        }
+
+
+def _percentiles(seconds):
+    """p50 and p95 of a sample of durations, in milliseconds."""
+    if len(seconds) < 2:
+        return None
+    cuts = statistics.quantiles(seconds, n=20, method="inclusive")
+    return {"p50": round(cuts[9] * 1000, 1), "p95": round(cuts[18] * 1000, 1), "samples": len(seconds)}
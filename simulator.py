@@ -0,0 +1,199 @@
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+import live_map
+from game import GameState
+
+# Methods of GameState whose latency is recorded, in the order a turn calls them
+TIMED_METHODS = ("reset", "validate_move", "execute_move", "check_end_conditions", "advance_turn")
+
+MR_X_ID = 1
+
+
+def legal_moves(game, player_id):
+    """Return every (dest, ticket) player_id may play, black tickets included for Mr. X."""
+    location = game.player_locations[player_id]
+    tickets = game.player_tickets[player_id]
+    is_mr_x = player_id == game.mr_x_id
+    moves = []
+    for dest, modes in live_map.GRAPH.edges(location):
+        moves.extend((dest, mode) for mode in modes if is_mr_x or tickets[mode] > 0)
+        if is_mr_x and tickets["black"] > 0:
+            moves.append((dest, "black"))
+    return moves
+
+
+class RandomPolicy:
+    """Plays a uniformly random legal move."""
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+
+    def choose(self, game, player_id):
+        moves = legal_moves(game, player_id)
+        return self.rng.choice(moves) if moves else None
+
+
+class ScriptedPolicy:
+    """Plays a fixed list of (dest, ticket) moves in turn order, then hands over to fallback (or stops)."""
+
+    def __init__(self, moves, fallback=None):
+        self.moves = list(moves)
+        self.fallback = fallback
+        self._next = 0
+
+    def choose(self, game, player_id):
+        if self._next < len(self.moves):
+            self._next += 1
+            return self.moves[self._next - 1]
+        return self.fallback.choose(game, player_id) if self.fallback else None
+
+
+class BotPolicy:
+    """Plays the built-in Mr. X and detective searches synchronously, with budget_ms per move."""
+
+    def __init__(self, seed=None, budget_ms=20):
+        self.rng = random.Random(seed)
+        self.budget_ms = budget_ms
+
+    def choose(self, game, player_id):
+        # Imported here so random and scripted runs do not pay for the search modules
+        import mr_x_ai
+        import detective_ai
+        if player_id == game.mr_x_id:
+            return mr_x_ai.choose_move(mr_x_ai.snapshot(game, self.budget_ms, seed=self.rng.random()))
+        return detective_ai.choose_move(detective_ai.snapshot(game, player_id, self.budget_ms, seed=self.rng.random()))
+
+
+POLICIES = {"random": RandomPolicy, "bots": BotPolicy}
+
+
+class MethodTimer:
+    """Collects per-call latencies (in ns) of GameState methods."""
+
+    def __init__(self):
+        self.samples = {name: [] for name in TIMED_METHODS}
+
+    def call(self, name, method, *args):
+        start = time.perf_counter_ns()
+        result = method(*args)
+        self.samples[name].append(time.perf_counter_ns() - start)
+        return result
+
+    def merge(self, other):
+        for name, samples in other.samples.items():
+            self.samples.setdefault(name, []).extend(samples)
+
+    def summary(self):
+        """Return {method: {"calls", "p50_us", "p90_us", "p99_us", "max_us"}}."""
+        report = {}
+        for name, samples in self.samples.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+
+            def percentile(q):
+                return ordered[min(int(q * len(ordered)), len(ordered) - 1)] / 1000
+
+            report[name] = {
+                "calls": len(ordered),
+                "p50_us": percentile(0.5),
+                "p90_us": percentile(0.9),
+                "p99_us": percentile(0.99),
+                "max_us": ordered[-1] / 1000,
+            }
+        return report
+
+
+def setup_game(game, players, rng, timer):
+    """Seat players (player 1 is Mr. X) the way /join and /begin do."""
+    timer.call("reset", game.reset)
+    for player_id in range(1, players + 1):
+        game.roles[player_id] = "Mr. X" if player_id == MR_X_ID else "Detective"
+        game.joined_players.append(player_id)
+    game.mr_x_id = MR_X_ID
+    for player_id in game.joined_players:
+        game.player_locations[player_id] = rng.choice(live_map.get_all_nodes())
+    game.turn_order = game.joined_players.copy()
+    rng.shuffle(game.turn_order)
+    game.suspects.start(game.detective_locations())
+
+
+def play_game(policy, seed=None, players=5, game=None, timer=None):
+    """Play one game headlessly with policy choosing every player's moves.
+
+    Returns {"result", "rounds", "moves", "invalid"}; result is the end
+    message from check_end_conditions, or a note if a player had no move.
+    """
+    rng = random.Random(seed)
+    game = game or GameState()
+    timer = timer or MethodTimer()
+    setup_game(game, players, rng, timer)
+    moves = invalid = 0
+    while True:
+        player_id = game.get_current_player()
+        move = policy.choose(game, player_id)
+        if move is None:
+            result = f"Player {player_id} had no move."
+            break
+        is_valid, _ = timer.call("validate_move", game.validate_move, player_id, *move)
+        if not is_valid:
+            invalid += 1
+            result = f"Player {player_id} chose an invalid move {move}."
+            break
+        timer.call("execute_move", game.execute_move, player_id, *move)
+        moves += 1
+        result = timer.call("check_end_conditions", game.check_end_conditions)
+        if result:
+            break
+        timer.call("advance_turn", game.advance_turn)
+    return {"result": result, "rounds": game.round_counter, "moves": moves, "invalid": invalid}
+
+
+def play_batch(policy_name, seeds, players=5, policy_kwargs=None):
+    """Play one game per seed in this process; returns (results, MethodTimer)."""
+    policy_cls = POLICIES[policy_name]
+    game = GameState()
+    timer = MethodTimer()
+    results = []
+    for seed in seeds:
+        policy = policy_cls(seed=seed, **(policy_kwargs or {}))
+        results.append(play_game(policy, seed, players, game, timer))
+    return results, timer
+
+
+def simulate(games, policy_name="random", workers=1, players=5, seed=0, batch_size=50, policy_kwargs=None):
+    """Play games across a process pool (in-process if workers <= 1) and return a report dict."""
+    seeds = list(range(seed, seed + games))
+    batches = [seeds[i:i + batch_size] for i in range(0, len(seeds), batch_size)]
+    timer = MethodTimer()
+    results = []
+    start = time.perf_counter()
+    if workers <= 1:
+        outputs = (play_batch(policy_name, batch, players, policy_kwargs) for batch in batches)
+        for batch_results, batch_timer in outputs:
+            results.extend(batch_results)
+            timer.merge(batch_timer)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(play_batch, policy_name, batch, players, policy_kwargs) for batch in batches]
+            for future in futures:
+                batch_results, batch_timer = future.result()
+                results.extend(batch_results)
+                timer.merge(batch_timer)
+    elapsed = time.perf_counter() - start
+
+    outcomes = {}
+    for result in results:
+        outcome = result["result"].split("!")[0]
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    moves = sum(result["moves"] for result in results)
+    return {
+        "games": len(results),
+        "seconds": elapsed,
+        "games_per_second": len(results) / elapsed,
+        "moves_per_second": moves / elapsed,
+        "invalid_moves": sum(result["invalid"] for result in results),
+        "outcomes": outcomes,
+        "methods": timer.summary(),
+    }
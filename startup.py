@@ -0,0 +1,81 @@
+import asyncio
+import os
+import time
+import live_map
+from logs import get_logger
+
+WARMUP_MODES = ("lazy", "ready")
+
+log = get_logger("startup")
+_imported = time.perf_counter()
+
+
+def process_age():
+    """Seconds since this process was started (so since `python bot.py`), or None off Linux."""
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22, counting from 1, is the start time in clock ticks after boot; fields after the
+            # parenthesised command name are split safely from its closing bracket
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        return time.clock_gettime(time.CLOCK_BOOTTIME) - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class Startup:
+    """Times the bot's start and decides when the map's heavy assets are built.
+
+    live_map loads only the graph and coordinates at import; distance
+    tables, reachability and the decoded base map are built when first
+    needed. With warmup="ready" they are built on a worker thread right after
+    on_ready, so the first command does not pay for them; "lazy" leaves
+    them to the first command that needs them. mark() records how long after
+    process start each phase finished.
+    """
+
+    def __init__(self, warmup="ready"):
+        if warmup not in WARMUP_MODES:
+            raise ValueError(f"Unknown warm-up mode {warmup!r}")
+        self.warmup = warmup
+        age = process_age()
+        # Without /proc, count from the first import of this module instead
+        self._origin = _imported - age if age is not None else _imported
+        self.phases = {}
+        self.warmup_seconds = None
+
+    @classmethod
+    def from_env(cls):
+        """Build from STARTUP_WARMUP: lazy or ready."""
+        return cls(warmup=os.getenv("STARTUP_WARMUP", "ready"))
+
+    def mark(self, phase):
+        """Record that phase finished now; returns the seconds since process start."""
+        elapsed = self.phases[phase] = time.perf_counter() - self._origin
+        return elapsed
+
+    def ready(self):
+        """Call from on_ready: records the ready time and, unless lazy, starts warming the map assets.
+
+        Returns the warm-up's future (None if there is none); on_ready does not need to wait for it.
+        """
+        if "ready" in self.phases:
+            return None  # on_ready runs again after every reconnect
+        self.mark("ready")
+        log.info("Ready %.2fs after start (%s)", self.phases["ready"],
+                 ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in self.phases.items()))
+        if self.warmup == "lazy":
+            return None
+        return asyncio.get_running_loop().run_in_executor(None, self._warm_up)
+
+    def _warm_up(self):
+        try:
+            timings = live_map.warm_up()
+        except Exception:
+            log.exception("Warming up map assets failed; they will be built on first use")
+            return
+        self.warmup_seconds = sum(timings.values())
+        log.info("Warmed up map assets in %.2fs (%s)", self.warmup_seconds,
+                 ", ".join(f"{step} {seconds:.2f}s" for step, seconds in timings.items()))
+
+    def stats(self):
+        return {"warmup": self.warmup, "phases": dict(self.phases), "warmup_seconds": self.warmup_seconds}
@@ -0,0 +1,127 @@
+import live_map
+import graph_index
+
+
+def _location_mask(locations):
+    mask = 0
+    for location in locations:
+        if location is not None:
+            mask |= 1 << location
+    return mask
+
+
+class SuspectTracker:
+    """The set of nodes Mr. X could be standing on, from public information only.
+
+    The set is a node bitmask. It starts as the whole board (minus detectives),
+    collapses to one node whenever Mr. X is revealed, and after each announced
+    ticket becomes every node one edge of that mode away (any edge for a black
+    ticket), minus the nodes detectives stand on. Each update is a few
+    GraphIndex.expand table lookups, so it costs microseconds.
+    """
+
+    def __init__(self, graph=None):
+        self._graph = graph
+        self.reset()
+
+    @property
+    def graph(self):
+        return self._graph or live_map.GRAPH
+
+    def reset(self):
+        self.mask = 0
+        self.origin = None      # last revealed node, None before the first reveal
+        self._blocked = 0       # detective nodes removed before the first step
+        self._steps = []        # (mode or None, detective mask) per move since origin
+        self.updates = 0
+
+    def start(self, detective_locations):
+        """Begin a game: Mr. X may be anywhere a detective is not."""
+        self._blocked = _location_mask(detective_locations)
+        self.mask = self.graph.all_mask() & ~self._blocked
+        self.origin = None
+        self._steps = []
+        self.updates += 1
+
+    def reveal(self, location):
+        """Mr. X was seen at location."""
+        self.mask = 1 << location
+        self.origin = location
+        self._blocked = 0
+        self._steps = []
+        self.updates += 1
+
+    def mr_x_moved(self, ticket, detective_locations):
+        """Mr. X used ticket ("Taxi", "bus", "Black", ...) while detectives stood on detective_locations."""
+        mode = graph_index.normalize_mode(ticket)
+        mode = None if mode == "black" else mode
+        blocked = _location_mask(detective_locations)
+        self.mask = self.graph.expand(self.mask, mode) & ~blocked
+        self._steps.append((mode, blocked))
+        self.updates += 1
+
+    def detectives_at(self, locations):
+        """A detective landed on locations without catching Mr. X, so he is not there."""
+        blocked = _location_mask(locations)
+        self.mask &= ~blocked
+        if self._steps:
+            mode, step_blocked = self._steps[-1]
+            self._steps[-1] = (mode, step_blocked | blocked)
+        elif self.origin is None:
+            self._blocked |= blocked
+        self.updates += 1
+
+    def to_dict(self):
+        """Return the tracker as JSON-safe data for GameState.to_dict."""
+        return {"mask": self.mask, "origin": self.origin, "blocked": self._blocked, "steps": list(self._steps)}
+
+    def restore(self, data):
+        """Load what to_dict returned."""
+        self.mask = data["mask"]
+        self.origin = data["origin"]
+        self._blocked = data["blocked"]
+        self._steps = [tuple(step) for step in data["steps"]]
+
+    @property
+    def moves_since_reveal(self):
+        return len(self._steps)
+
+    def candidates(self):
+        """Return the possible nodes in ascending order."""
+        mask = self.mask
+        return [node for node in self.graph.nodes if mask >> node & 1]
+
+    def __len__(self):
+        return bin(self.mask).count("1")
+
+    def __contains__(self, node):
+        return bool(self.mask >> node & 1)
+
+    def heat(self):
+        """Return {node: probability} over the candidates.
+
+        Replays the moves since the last reveal assuming Mr. X picks uniformly
+        among the edges his ticket allows, so nodes reachable along many routes
+        weigh more. Only used for drawing, so it is not on the per-move path.
+        """
+        graph = self.graph
+        if self.origin is None:
+            weights = {node: 1.0 for node in graph.nodes if not self._blocked >> node & 1}
+        else:
+            weights = {self.origin: 1.0}
+        for mode, blocked in self._steps:
+            spread = {}
+            for node, weight in weights.items():
+                dests = graph.neighbors(node, mode)
+                if not dests:
+                    continue
+                share = weight / len(dests)
+                for dest in dests:
+                    if not blocked >> dest & 1:
+                        spread[dest] = spread.get(dest, 0.0) + share
+            weights = spread
+        weights = {node: weight for node, weight in weights.items() if self.mask >> node & 1}
+        total = sum(weights.values())
+        if not total:
+            return {}
+        return {node: weight / total for node, weight in weights.items()}